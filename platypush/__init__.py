@@ -8,18 +8,19 @@ Platypush
 import argparse
 import logging
 import os
+import signal
 import sys
+import threading
 
-from .bus.redis import RedisBus
+from .bus.redis import get_redis_bus
 from .config import Config
-from .context import register_backends
-from .cron.scheduler import CronScheduler
-from .event.processor import EventProcessor
+from .context import register_backends, get_cron_scheduler, get_dispatcher, get_event_processor, reload_config
 from .logger import Logger
 from .message.event import Event
 from .message.event.application import ApplicationStartedEvent
 from .message.request import Request
 from .message.response import Response
+from .procedure import compile_procedures
 from .utils import set_thread_name
 
 
@@ -81,12 +82,12 @@ class Daemon:
         logging.basicConfig(**Config.get('logging'))
 
         redis_conf = Config.get('backend.redis') or {}
-        self.bus = RedisBus(redis_queue=self.redis_queue, on_message=self.on_message(),
-                            **redis_conf.get('redis_args', {}))
+        self.bus = get_redis_bus(redis_queue=self.redis_queue, on_message=self.on_message(),
+                                 **redis_conf.get('redis_args', {}))
 
         self.no_capture_stdout = no_capture_stdout
         self.no_capture_stderr = no_capture_stderr
-        self.event_processor = EventProcessor()
+        self.event_processor = get_event_processor()
         self.requests_to_process = requests_to_process
         self.processed_requests = 0
         self.cron_scheduler = None
@@ -140,8 +141,16 @@ class Daemon:
             """
 
             if isinstance(msg, Request):
+                future = None
                 try:
-                    msg.execute(n_tries=self.n_tries)
+                    if msg.is_async_action():
+                        # asyncio actions are awaited on the shared event loop, without holding
+                        # the worker. The bus acknowledges the message once the future completes.
+                        future = msg.execute(n_tries=self.n_tries, _async=True)
+                    else:
+                        # The message is already being processed on a dispatcher worker,
+                        # there's no need to submit the request to another one.
+                        msg.execute(n_tries=self.n_tries, _async=False)
                 except PermissionError:
                     logger.info('Dropped unauthorized request: {}'.format(msg))
 
@@ -149,6 +158,8 @@ class Daemon:
                 if self.requests_to_process \
                         and self.processed_requests >= self.requests_to_process:
                     self.stop_app()
+
+                return future
             elif isinstance(msg, Response):
                 logger.info('Received response: {}'.format(msg))
             elif isinstance(msg, Event):
@@ -167,6 +178,21 @@ class Daemon:
         if self.cron_scheduler:
             self.cron_scheduler.stop()
 
+        get_dispatcher().stop()
+
+    @staticmethod
+    def _reload_config():
+        try:
+            reload_config()
+        except Exception as e:
+            logger.warning('Could not reload the configuration: {}'.format(str(e)))
+            logger.exception(e)
+
+    def _on_sighup(self, *_):
+        # The handler runs on the main thread, between two bytecodes of the bus loop, and it
+        # must not take any lock that the loop may be holding: the reload runs on a new thread
+        threading.Thread(target=self._reload_config, name='ConfigReload', daemon=True).start()
+
     def run(self):
         """ Start the daemon """
         if not self.no_capture_stdout:
@@ -177,6 +203,9 @@ class Daemon:
         set_thread_name('platypush')
         logger.info('---- Starting platypush v.{}'.format(__version__))
 
+        # Compile the configured procedures
+        compile_procedures()
+
         # Initialize the backends and link them to the bus
         self.backends = register_backends(bus=self.bus, global_scope=True)
 
@@ -184,10 +213,15 @@ class Daemon:
         for backend in self.backends.values():
             backend.start()
 
-        # Start the cron scheduler
-        if Config.get_cronjobs():
-            self.cron_scheduler = CronScheduler(jobs=Config.get_cronjobs())
-            self.cron_scheduler.start()
+        # Start the cron scheduler. It's started even if no cronjobs are configured,
+        # so the cronjobs added when the configuration is reloaded can be scheduled
+        self.cron_scheduler = get_cron_scheduler()
+        self.cron_scheduler.start()
+
+        # Reload the event hooks, procedures and cronjobs on SIGHUP. Signal handlers can only be
+        # installed from the main thread (the daemon may run on another thread, e.g. in the tests)
+        if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, self._on_sighup)
 
         self.bus.post(ApplicationStartedEvent())
 
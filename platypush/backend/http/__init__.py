@@ -330,10 +330,12 @@ class HttpBackend(Backend):
         """ Notify all the connected web clients (over websocket) of a new event """
         import websockets
 
+        payload = str(event)
+
         async def send_event(ws):
             try:
                 self._acquire_websocket_lock(ws)
-                await ws.send(str(event))
+                await ws.send(payload)
             except Exception as e:
                 self.logger.warning('Error on websocket send_event: {}'.format(e))
             finally:
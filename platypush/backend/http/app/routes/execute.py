@@ -3,7 +3,7 @@ import json
 from flask import Blueprint, abort, request, Response
 
 from platypush.backend.http.app import template_folder
-from platypush.backend.http.app.utils import authenticate, logger, send_message
+from platypush.backend.http.app.utils import authenticate, logger, send_message, send_messages
 
 execute = Blueprint('execute', __name__, template_folder=template_folder)
 
@@ -16,7 +16,12 @@ __routes__ = [
 @execute.route('/execute', methods=['POST'])
 @authenticate()
 def execute():
-    """ Endpoint to execute commands """
+    """
+    Endpoint to execute commands. It accepts either a single request, or a list of requests
+    that are executed concurrently and whose responses are returned as a list, in the same
+    order as the requests. The requests in a list can be executed one after the other by
+    passing them as ``{"requests": [...], "sequential": true}``.
+    """
     try:
         msg = json.loads(request.data.decode('utf-8'))
     except Exception as e:
@@ -25,6 +30,9 @@ def execute():
 
     logger().info('Received message on the HTTP backend: {}'.format(msg))
 
+    if isinstance(msg, list) or (isinstance(msg, dict) and isinstance(msg.get('requests'), list)):
+        return execute_batch(msg)
+
     try:
         response = send_message(msg)
         return Response(str(response or {}), mimetype='application/json')
@@ -33,4 +41,19 @@ def execute():
         return abort(500, str(e))
 
 
+def execute_batch(msg):
+    sequential = False
+    if isinstance(msg, dict):
+        sequential = bool(msg.get('sequential', False))
+        msg = msg['requests']
+
+    try:
+        responses = send_messages(msg, sequential=sequential)
+        return Response('[' + ', '.join(str(response or {}) for response in responses) + ']',
+                        mimetype='application/json')
+    except Exception as e:
+        logger().error('Error while running HTTP actions: {}. Requests: {}'.format(str(e), msg))
+        return abort(500, str(e))
+
+
 # vim:sw=4:ts=4:et:
@@ -1,29 +1,32 @@
 import importlib
 import logging
 import os
+import time
 
 from functools import wraps
 from flask import abort, request, redirect, Response, current_app
-from redis import Redis
 
 # NOTE: The HTTP service will *only* work on top of a Redis bus. The default
 # internal bus service won't work as the web server will run in a different process.
-from platypush.bus.redis import RedisBus
+from platypush.bus.redis import get_redis_bus
+from platypush.bus.responses import ResponseDispatcher
 
 from platypush.config import Config
 from platypush.message import Message
 from platypush.message.request import Request
+from platypush.message.response import Response as PlatypushResponse
 from platypush.user import UserManager
-from platypush.utils import get_redis_queue_name_by_message, get_ip_or_hostname
+from platypush.utils import get_ip_or_hostname
 
 _bus = None
 _logger = None
+_response_dispatcher = None
 
 
 def bus():
     global _bus
     if _bus is None:
-        _bus = RedisBus(redis_queue=current_app.config.get('redis_queue'))
+        _bus = get_redis_bus(redis_queue=current_app.config.get('redis_queue'))
     return _bus
 
 
@@ -51,15 +54,37 @@ def logger():
     return _logger
 
 
-def get_message_response(msg):
-    redis = Redis(**bus().redis_args)
-    response = redis.blpop(get_redis_queue_name_by_message(msg), timeout=60)
-    if response and len(response) > 1:
-        response = Message.build(response[1])
-    else:
-        response = None
+def response_dispatcher() -> ResponseDispatcher:
+    global _response_dispatcher
+    if _response_dispatcher is None:
+        _response_dispatcher = ResponseDispatcher(redis_args=bus().redis_args)
+    return _response_dispatcher
 
-    return response
+
+def post_messages(msgs, timeout=60) -> list:
+    """
+    Post a list of messages on the bus, in a single batch, and wait for the responses to the
+    requests. The responses are received by the shared :class:`ResponseDispatcher`.
+
+    :return: One item per message - the response for the requests, or None for the other messages
+        and for the requests that got no response within the timeout.
+    """
+    dispatcher = response_dispatcher()
+    futures = {msg.id: dispatcher.expect(msg.id) for msg in msgs if isinstance(msg, Request)}
+
+    try:
+        bus().post_batch(msgs)
+    except Exception:
+        for request_id in futures.keys():
+            dispatcher.cancel(request_id)
+        raise
+
+    deadline = time.time() + timeout
+    return [
+        dispatcher.wait(msg.id, futures[msg.id], timeout=max(0., deadline - time.time()))
+        if isinstance(msg, Request) else None
+        for msg in msgs
+    ]
 
 
 # noinspection PyProtectedMember
@@ -85,14 +110,55 @@ def send_message(msg, wait_for_response=True):
     if Config.get('token'):
         msg.token = Config.get('token')
 
-    bus().post(msg)
+    if not (isinstance(msg, Request) and wait_for_response):
+        bus().post(msg)
+        return
+
+    response = post_messages([msg])[0]
+    logger().debug('Processing response on the HTTP backend: {}'.
+                   format(response))
+
+    return response
+
+
+def send_messages(msgs, sequential=False) -> list:
+    """
+    Send a list of messages to the bus.
+
+    :param msgs: Messages to be sent.
+    :param sequential: If True, each request is sent once the previous one has been processed.
+        Otherwise, the requests are all sent in a single batch and executed concurrently.
+    :return: One item per message - the response for the requests, an error response for the
+        messages that couldn't be parsed, and None for the other messages.
+    """
+    results = [None] * len(msgs)
+    parsed_msgs = []
+
+    for i, msg in enumerate(msgs):
+        try:
+            msg = Message.build(msg)
+            assert msg, 'Invalid message'
+        except Exception as e:
+            results[i] = PlatypushResponse(errors=[str(e)])
+            continue
+
+        if isinstance(msg, Request):
+            msg.origin = 'http'
+        if Config.get('token'):
+            msg.token = Config.get('token')
+        parsed_msgs.append((i, msg))
+
+    if sequential:
+        responses = [post_messages([msg])[0] for _, msg in parsed_msgs]
+    else:
+        responses = post_messages([msg for _, msg in parsed_msgs])
 
-    if isinstance(msg, Request) and wait_for_response:
-        response = get_message_response(msg)
-        logger().debug('Processing response on the HTTP backend: {}'.
-                       format(response))
+    for (i, msg), response in zip(parsed_msgs, responses):
+        if isinstance(msg, Request) and not response:
+            response = PlatypushResponse(id=msg.id, errors=['Timeout while waiting for the response'])
+        results[i] = response
 
-        return response
+    return results
 
 
 def send_request(action, wait_for_response=True, **kwargs):
@@ -19,11 +19,16 @@ class RedisBackend(Backend):
         * **redis** (``pip install redis``)
     """
 
-    def __init__(self, queue='platypush_bus_mq', redis_args=None, *args, **kwargs):
+    def __init__(self, queue='platypush_bus_mq', redis_args=None, codec=None, *args, **kwargs):
         """
         :param queue: Queue name to listen on (default: ``platypush_bus_mq``)
         :type queue: str
 
+        :param codec: Codec used to serialize the outgoing messages - ``json`` (default), ``orjson`` or
+            ``msgpack`` (see :mod:`platypush.message.codec`). Incoming messages are decoded according to
+            their format marker, regardless of this setting.
+        :type codec: str
+
         :param redis_args: Arguments that will be passed to the redis-py constructor (e.g. host, port, password), see
             http://redis-py.readthedocs.io/en/latest/
         :type redis_args: dict
@@ -34,6 +39,7 @@ class RedisBackend(Backend):
             redis_args = {}
 
         self.queue = queue
+        self.codec = codec
 
         if not redis_args:
             redis_plugin = get_plugin('redis')
@@ -44,7 +50,7 @@ class RedisBackend(Backend):
         self.redis = Redis(**self.redis_args)
 
     def send_message(self, msg, queue_name=None, **kwargs):
-        msg = str(msg)
+        msg = msg.serialize(self.codec) if isinstance(msg, Message) else str(msg)
         if queue_name:
             self.redis.rpush(queue_name, msg)
         else:
@@ -57,11 +63,12 @@ class RedisBackend(Backend):
         if data is None:
             return
 
-        msg = data[1].decode()
+        msg = data[1]
         try:
             msg = Message.build(msg)
         except Exception as e:
             self.logger.debug(str(e))
+            msg = msg.decode()
             try:
                 import ast
                 msg = Message.build(ast.literal_eval(msg))
@@ -26,7 +26,7 @@ class WebsocketBackend(Backend):
 
     def __init__(self, port=_default_websocket_port, bind_address='0.0.0.0',
                  ssl_cafile=None, ssl_capath=None, ssl_cert=None, ssl_key=None,
-                 client_timeout=_websocket_client_timeout, **kwargs):
+                 client_timeout=_websocket_client_timeout, codec=None, **kwargs):
         """
         :param port: Listen port for the websocket server (default: 8765)
         :type port: int
@@ -48,6 +48,11 @@ class WebsocketBackend(Backend):
 
         :param client_timeout: Timeout without any messages being received before closing a client connection. A zero timeout keeps the websocket open until an error occurs (default: 0, no timeout)
         :type ping_timeout: int
+
+        :param codec: Codec used to push the messages to the clients - ``json`` (default), ``orjson`` or ``msgpack``
+            (see :mod:`platypush.message.codec`). JSON messages are sent as text frames, binary messages as
+            binary frames. Incoming messages are decoded according to their format marker.
+        :type codec: str
         """
 
         super().__init__(**kwargs)
@@ -55,6 +60,7 @@ class WebsocketBackend(Backend):
         self.port = port
         self.bind_address = bind_address
         self.client_timeout = client_timeout
+        self.codec = codec
         self.active_websockets = set()
         self._loop = None
 
@@ -76,11 +82,18 @@ class WebsocketBackend(Backend):
 
         websocket.send(url=url, msg=msg, **websocket_args)
 
+    def _serialize(self, msg: Message):
+        if not self.codec or self.codec == 'json':
+            return str(msg)
+        return msg.serialize(self.codec)
+
     def notify_web_clients(self, event):
         """ Notify all the connected web clients (over websocket) of a new event """
+        payload = self._serialize(event)
+
         async def send_event(websocket):
             try:
-                await websocket.send(str(event))
+                await websocket.send(payload)
             except Exception as e:
                 self.logger.warning('Error on websocket send_event: {}'.format(e))
 
@@ -123,7 +136,7 @@ class WebsocketBackend(Backend):
                         self.logger.info('Processing response on the websocket backend: {}'.
                                          format(response))
 
-                        await websocket.send(str(response))
+                        await websocket.send(self._serialize(response))
 
             except websockets.exceptions.ConnectionClosed as e:
                 self.active_websockets.remove(websocket)
@@ -2,22 +2,38 @@ import logging
 import threading
 import time
 
-from queue import Queue, Empty
-from typing import Callable, Type
+from concurrent.futures import Future
+from queue import Empty
+from typing import Callable, Optional, Type
 
+from platypush.bus.dispatcher import Dispatcher, DispatcherFullError
+from platypush.bus.lanes import PriorityLanes
+from platypush.config import Config
 from platypush.message.event import Event
 
 logger = logging.getLogger('platypush:bus')
 
 
 class Bus(object):
-    """ Main local bus where the daemon will listen for new messages """
+    """
+    Main local bus where the daemon will listen for new messages.
+
+    Messages are queued on priority lanes (see :class:`platypush.bus.lanes.PriorityLanes`),
+    and they are picked up only when the dispatcher has room for them, so a storm of
+    low-priority events can't delay the processing of the requests.
+    """
 
     _MSG_EXPIRY_TIMEOUT = 60.0  # Consider a message on the bus as expired after one minute without being picked up
 
-    def __init__(self, on_message=None):
-        self.bus = Queue()
+    def __init__(self, on_message=None, dispatcher: Optional[Dispatcher] = None):
+        """
+        :param on_message: Message handler.
+        :param dispatcher: Dispatcher used to process the messages picked up from the bus
+            (default: the main dispatcher configured through ``main.dispatcher``).
+        """
+        self.bus = PriorityLanes.build(Config.get('main.bus'))
         self.on_message = on_message
+        self.dispatcher = dispatcher
         self.thread_id = threading.get_ident()
         self.event_handlers = {}
         self._should_stop = threading.Event()
@@ -26,6 +42,11 @@ class Bus(object):
         """ Sends a message to the bus """
         self.bus.put(msg)
 
+    def post_batch(self, msgs):
+        """ Sends a list of messages to the bus """
+        for msg in msgs:
+            self.post(msg)
+
     def get(self):
         """ Reads one message from the bus """
         try:
@@ -36,6 +57,13 @@ class Bus(object):
     def stop(self):
         self._should_stop.set()
 
+    def ack(self, msg):
+        """
+        Acknowledge that a message has been processed. Buses that support
+        redelivery of unprocessed messages should override this method.
+        """
+        pass
+
     def _msg_executor(self, msg):
         def event_handler(event: Event, handler: Callable[[Event], None]):
             logger.info('Triggering event handler {}'.format(handler.__name__))
@@ -50,19 +78,39 @@ class Bus(object):
                                   if isinstance(msg, event_type)]}
 
                 for hndl in handlers:
-                    threading.Thread(target=event_handler, args=(msg, hndl))
+                    self.dispatcher.submit(event_handler, msg, hndl)
 
             try:
-                self.on_message(msg)
+                result = self.on_message(msg)
             except Exception as e:
                 logger.error('Error on processing message {}'.format(msg))
                 logger.exception(e)
+                result = None
+
+            if isinstance(result, Future):
+                # The message is still being processed (e.g. by an asyncio action on the event
+                # loop): acknowledge it when it's done, without holding the worker
+                result.add_done_callback(lambda _: self.ack(msg))
+            else:
+                self.ack(msg)
 
         return executor
 
     def should_stop(self):
         return self._should_stop.is_set()
 
+    @staticmethod
+    def _get_dispatch_key(msg) -> Optional[str]:
+        """
+        Requests are dispatched with the name of the target plugin as a key, so the
+        per-plugin concurrency caps configured on the dispatcher apply to them.
+        """
+        from platypush.message.request import Request
+        from platypush.utils import get_module_and_method_from_action
+
+        if isinstance(msg, Request) and msg.action:
+            return get_module_and_method_from_action(msg.action)[0]
+
     def poll(self):
         """
         Reads messages from the bus until either stop event message or KeyboardInterrupt
@@ -71,7 +119,20 @@ class Bus(object):
             logger.warning('No message handlers installed, cannot poll')
             return
 
+        if not self.dispatcher:
+            from platypush.context import get_dispatcher
+            self.dispatcher = get_dispatcher()
+
+        # Leave the messages on the lanes until there's room for them on the dispatcher,
+        # so the priorities still apply when the workers are saturated.
+        max_pending = self.dispatcher.pool_size
+        if self.dispatcher.queue_size > 0:
+            max_pending = min(max_pending, self.dispatcher.queue_size)
+
         while not self.should_stop():
+            if not self.dispatcher.wait_for_slot(max_pending=max_pending, timeout=0.1):
+                continue
+
             msg = self.get()
             if msg is None:
                 continue
@@ -80,9 +141,15 @@ class Bus(object):
             if timestamp and time.time() - timestamp > self._MSG_EXPIRY_TIMEOUT:
                 logger.debug('{} seconds old message on the bus expired, ignoring it: {}'.
                              format(int(time.time()-msg.timestamp), msg))
+                self.ack(msg)
                 continue
 
-            threading.Thread(target=self._msg_executor(msg)).start()
+            try:
+                self.dispatcher.submit(self._msg_executor(msg), key=self._get_dispatch_key(msg))
+            except DispatcherFullError as e:
+                # The queue may have been filled by other submitters in the meantime
+                logger.warning('Message rejected: {}: {}'.format(str(e), msg))
+                self.ack(msg)
 
         logger.info('Bus service stoppped')
 
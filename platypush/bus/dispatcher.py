@@ -0,0 +1,318 @@
+import enum
+import logging
+import threading
+
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger('platypush:bus:dispatcher')
+
+
+class OverflowPolicy(enum.Enum):
+    """
+    What the dispatcher should do when a task is submitted and the queue is full.
+    """
+    BLOCK = 'block'               # Wait until a slot is available on the queue
+    DROP_OLDEST = 'drop_oldest'   # Discard the oldest queued task to make room for the new one
+    REJECT = 'reject'             # Discard the new task and raise DispatcherFullError
+
+
+class DispatcherFullError(RuntimeError):
+    """
+    Raised by :meth:`Dispatcher.submit` when the queue is full and the overflow policy is ``reject``.
+    """
+
+
+class _Task:
+    __slots__ = ('func', 'args', 'kwargs', 'key')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, key: Optional[str] = None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+
+
+class Dispatcher:
+    """
+    Bounded worker pool that executes the messages picked up from the bus and the
+    asynchronous requests. It replaces the previous thread-per-message model with:
+
+        - A fixed number of worker threads (``pool_size``).
+        - A bounded queue of pending tasks (``queue_size``), with a configurable ``overflow_policy``
+          (``block``, ``drop_oldest`` or ``reject``) to apply backpressure.
+        - Optional concurrency caps per dispatch key (usually a plugin name), through ``concurrency``.
+          Tasks whose key has reached its cap are parked until a running task with the same key completes,
+          without holding a worker.
+
+    It can be configured through the ``main.dispatcher`` section of the configuration file:
+
+    .. code-block:: yaml
+
+        main.dispatcher:
+            pool_size: 16
+            queue_size: 1000
+            overflow_policy: block
+            concurrency:
+                light.hue: 2
+                zwave.mqtt: 1
+
+    """
+
+    _DEFAULT_POOL_SIZE = 16
+    _DEFAULT_QUEUE_SIZE = 1000
+
+    def __init__(self, pool_size: Optional[int] = None, queue_size: Optional[int] = None,
+                 overflow_policy: Optional[str] = None, concurrency: Optional[Dict[str, int]] = None,
+                 name: str = 'Dispatcher'):
+        """
+        :param pool_size: Number of worker threads (default: 16).
+        :param queue_size: Maximum number of queued tasks, 0 for unbounded (default: 1000).
+        :param overflow_policy: Policy applied when the queue is full - ``block`` (default), ``drop_oldest``
+            or ``reject``.
+        :param concurrency: ``key -> max_running_tasks`` map, where the key is usually a plugin name
+            (e.g. ``light.hue``).
+        :param name: Name prefix for the worker threads.
+        """
+        self.pool_size = int(pool_size or self._DEFAULT_POOL_SIZE)
+        self.queue_size = int(queue_size if queue_size is not None else self._DEFAULT_QUEUE_SIZE)
+        self.overflow_policy = OverflowPolicy(overflow_policy or OverflowPolicy.BLOCK.value)
+        self.concurrency = dict(concurrency or {})
+        self.name = name
+
+        self._queue = deque()
+        self._parked: Dict[str, deque] = {}
+        self._running_by_key: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._workers = []
+        self._worker_idents = set()
+        self._should_stop = False
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._rejected = 0
+        self._run_inline = 0
+        self._active = 0
+        self._max_queue_depth = 0
+
+    @classmethod
+    def build(cls, config: Optional[dict] = None) -> 'Dispatcher':
+        """
+        Build a dispatcher from a ``main.dispatcher`` configuration section.
+        """
+        config = config or {}
+        return cls(pool_size=config.get('pool_size'), queue_size=config.get('queue_size'),
+                   overflow_policy=config.get('overflow_policy'), concurrency=config.get('concurrency'))
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+
+            self._should_stop = False
+            for i in range(self.pool_size):
+                worker = threading.Thread(target=self._worker, name='{}-{}'.format(self.name, i), daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def stop(self):
+        with self._lock:
+            self._should_stop = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            self._workers = []
+
+    def is_worker_thread(self) -> bool:
+        """
+        :return: True if the current thread is one of the workers of this dispatcher.
+        """
+        return threading.get_ident() in self._worker_idents
+
+    def _queue_full(self) -> bool:
+        return 0 < self.queue_size <= len(self._queue)
+
+    def submit(self, func: Callable, *args, key: Optional[str] = None, **kwargs) -> bool:
+        """
+        Submit a task to the dispatcher.
+
+        :param func: Function to execute.
+        :param args: Positional arguments for the function.
+        :param key: Dispatch key (usually a plugin name), used to enforce the per-key concurrency caps.
+        :param kwargs: Keyword arguments for the function.
+        :return: True if the task was queued or executed, False if it was dropped.
+        :raises DispatcherFullError: If the queue is full and the overflow policy is ``reject``.
+        """
+        if not self._workers and not self._should_stop:
+            self.start()
+
+        task = _Task(func, args, kwargs, key=key)
+        run_inline = False
+
+        with self._lock:
+            self._submitted += 1
+
+            if self._queue_full():
+                if self.overflow_policy == OverflowPolicy.REJECT:
+                    self._rejected += 1
+                    raise DispatcherFullError('{} queue is full ({} pending tasks)'.format(
+                        self.name, len(self._queue)))
+
+                if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                    self._dropped += 1
+                elif threading.get_ident() in self._worker_idents:
+                    # A worker blocking on its own full queue may deadlock the pool:
+                    # run the task on the caller's thread instead.
+                    self._run_inline += 1
+                    run_inline = True
+                else:
+                    while self._queue_full() and not self._should_stop:
+                        self._not_full.wait()
+
+            if not run_inline:
+                if self._should_stop:
+                    self._dropped += 1
+                    return False
+
+                self._queue.append(task)
+                self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+                self._not_empty.notify()
+                return True
+
+        self._run(task)
+        return True
+
+    def wait_for_slot(self, max_pending: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until less than ``max_pending`` tasks are queued.
+
+        :param max_pending: Maximum number of queued tasks.
+        :param timeout: Maximum number of seconds to wait (default: no timeout).
+        :return: True if the number of queued tasks is below ``max_pending``, False on timeout or stop.
+        """
+        with self._lock:
+            return self._not_full.wait_for(
+                lambda: self._should_stop or len(self._queue) < max_pending,
+                timeout=timeout) and not self._should_stop
+
+    def _next_task(self) -> Optional[_Task]:
+        with self._lock:
+            while not self._should_stop:
+                while self._queue:
+                    task = self._queue.popleft()
+                    self._not_full.notify()
+                    cap = self.concurrency.get(task.key) if task.key else None
+
+                    if cap and self._running_by_key.get(task.key, 0) >= cap:
+                        self._parked.setdefault(task.key, deque()).append(task)
+                        continue
+
+                    self._acquire(task)
+                    return task
+
+                self._not_empty.wait()
+
+    def _acquire(self, task: _Task):
+        self._active += 1
+        if task.key:
+            self._running_by_key[task.key] = self._running_by_key.get(task.key, 0) + 1
+
+    def _release(self, task: _Task) -> Optional[_Task]:
+        """
+        Release the slot held by a task, and return the next parked task with the same key, if any.
+        """
+        with self._lock:
+            self._active -= 1
+            if not task.key:
+                return
+
+            self._running_by_key[task.key] -= 1
+            if not self._running_by_key[task.key]:
+                del self._running_by_key[task.key]
+
+            parked = self._parked.get(task.key)
+            if not parked:
+                return
+
+            next_task = parked.popleft()
+            if not parked:
+                del self._parked[task.key]
+
+            self._acquire(next_task)
+            return next_task
+
+    def _run(self, task: _Task):
+        try:
+            task.func(*task.args, **task.kwargs)
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            logger.warning('Error while executing dispatched task {}: {}'.format(
+                getattr(task.func, '__name__', task.func), str(e)))
+            logger.exception(e)
+            with self._lock:
+                self._failed += 1
+
+    def _worker(self):
+        self._worker_idents.add(threading.get_ident())
+
+        try:
+            while True:
+                task = self._next_task()
+                if task is None:
+                    break
+
+                while task:
+                    self._run(task)
+                    task = self._release(task)
+        finally:
+            self._worker_idents.discard(threading.get_ident())
+
+    def get_stats(self) -> dict:
+        """
+        :return: The current state and counters of the dispatcher. Example:
+
+            .. code-block:: json
+
+                {
+                    "pool_size": 16,
+                    "queue_size": 1000,
+                    "overflow_policy": "block",
+                    "queue_depth": 3,
+                    "max_queue_depth": 42,
+                    "active": 16,
+                    "submitted": 12345,
+                    "completed": 12300,
+                    "failed": 2,
+                    "dropped": 0,
+                    "rejected": 0,
+                    "run_inline": 0,
+                    "running_by_key": {"light.hue": 2},
+                    "parked_by_key": {"light.hue": 5}
+                }
+
+        """
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'queue_size': self.queue_size,
+                'overflow_policy': self.overflow_policy.value,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self._max_queue_depth,
+                'active': self._active,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'dropped': self._dropped,
+                'rejected': self._rejected,
+                'run_inline': self._run_inline,
+                'running_by_key': dict(self._running_by_key),
+                'parked_by_key': {key: len(tasks) for key, tasks in self._parked.items()},
+            }
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from collections import deque
+from queue import Empty
+from typing import Dict, Optional
+
+
+class PriorityLanes:
+    """
+    Queue of bus messages split in priority lanes, with weighted fair dequeueing.
+
+    Each message is appended to the lane named after its ``priority`` attribute:
+
+        - ``request``: requests (e.g. HTTP ``/execute`` calls or voice commands).
+        - ``response``: responses to requests.
+        - ``event``: events (default for any other message).
+        - ``background``: high-frequency events, e.g. sensor data, camera frames or HTTP logs.
+
+    Messages are picked from the non-empty lanes through smooth weighted round-robin:
+    with the default weights, a storm of ``background`` events gets at most one slot
+    every 21 messages, as long as there are requests or responses waiting. Messages
+    within the same lane are always delivered in FIFO order.
+
+    The weights, and the priority of specific event types, can be configured through
+    the ``main.bus`` section of the configuration file:
+
+    .. code-block:: yaml
+
+        main.bus:
+            lane_weights:
+                request: 12
+                response: 6
+                event: 2
+                background: 1
+            priorities:
+                # Event type -> lane. Subclasses inherit the priority of their parent.
+                platypush.message.event.sensor.SensorDataChangeEvent: event
+                platypush.message.event.custom.CustomEvent: request
+
+    """
+
+    DEFAULT_LANE = 'event'
+    DEFAULT_WEIGHTS = {
+        'request': 12,
+        'response': 6,
+        'event': 2,
+        'background': 1,
+    }
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None, priorities: Optional[Dict[str, str]] = None):
+        """
+        :param weights: ``lane -> weight`` map, merged with the default weights.
+        :param priorities: ``fully qualified event type -> lane`` map, that overrides the ``priority``
+            declared by the event classes.
+        """
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        for lane, weight in self.weights.items():
+            assert int(weight) > 0, 'The weight of the lane {} should be a positive integer'.format(lane)
+            self.weights[lane] = int(weight)
+
+        self.priorities = dict(priorities or {})
+        for msg_type, lane in self.priorities.items():
+            assert lane in self.weights, 'Unknown lane for {}: {}. Available lanes: {}'.format(
+                msg_type, lane, list(self.weights.keys()))
+
+        self._lanes: Dict[str, deque] = {lane: deque() for lane in self.weights}
+        self._credits: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self._lanes_by_type = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+
+    @classmethod
+    def build(cls, config: Optional[dict] = None) -> 'PriorityLanes':
+        """
+        Build the lanes from a ``main.bus`` configuration section.
+        """
+        config = config or {}
+        return cls(weights=config.get('lane_weights'), priorities=config.get('priorities'))
+
+    def get_lane(self, msg) -> str:
+        """
+        :return: The lane of a message - the configured priority of its type or of its closest parent
+            type if any, otherwise the ``priority`` declared by its class.
+        """
+        msg_type = type(msg)
+        lane = self._lanes_by_type.get(msg_type)
+        if lane:
+            return lane
+
+        lane = getattr(msg, 'priority', None)
+        for cls in msg_type.__mro__:
+            name = '{}.{}'.format(cls.__module__, cls.__name__)
+            if name in self.priorities:
+                lane = self.priorities[name]
+                break
+
+        if lane not in self._lanes:
+            lane = self.DEFAULT_LANE
+
+        self._lanes_by_type[msg_type] = lane
+        return lane
+
+    def put(self, msg):
+        lane = self.get_lane(msg)
+        with self._lock:
+            self._lanes[lane].append(msg)
+            self._size += 1
+            self._not_empty.notify()
+
+    def _next_lane(self) -> str:
+        # Smooth weighted round-robin among the non-empty lanes
+        total = 0
+        selected = None
+
+        for lane, msgs in self._lanes.items():
+            if not msgs:
+                self._credits[lane] = 0
+                continue
+
+            self._credits[lane] += self.weights[lane]
+            total += self.weights[lane]
+            if selected is None or self._credits[lane] > self._credits[selected]:
+                selected = lane
+
+        self._credits[selected] -= total
+        return selected
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        """
+        Get the next message, with the same semantics as :meth:`queue.Queue.get`.
+        """
+        with self._lock:
+            if block:
+                deadline = time.time() + timeout if timeout is not None else None
+                while not self._size:
+                    remaining = deadline - time.time() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._not_empty.wait(remaining)
+
+            if not self._size:
+                raise Empty()
+
+            self._size -= 1
+            return self._lanes[self._next_lane()].popleft()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return not self._size
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        :return: ``lane -> number of queued messages`` map.
+        """
+        with self._lock:
+            return {lane: len(msgs) for lane, msgs in self._lanes.items()}
+
+
+# vim:sw=4:ts=4:et:
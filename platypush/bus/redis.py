@@ -1,6 +1,9 @@
 import logging
 import threading
 
+from collections import deque
+from typing import Optional
+
 from redis import Redis
 
 from platypush.bus import Bus
@@ -11,45 +14,237 @@ logger = logging.getLogger('platypush:bus:redis')
 
 
 class RedisBus(Bus):
-    """ Overrides the in-process in-memory local bus with a Redis bus """
+    """
+    Overrides the in-process in-memory local bus with a Redis bus.
+
+    The bus can be tuned through the ``main.bus`` section of the configuration file:
+
+    .. code-block:: yaml
+
+        main.bus:
+            # Maximum number of messages drained from Redis in a single round trip
+            # after a blocking pop (default: 1, i.e. one BLPOP per message)
+            batch_size: 50
+            # If set (default), messages posted while another post is in progress
+            # are coalesced into a single RPUSH
+            coalesce_posts: true
+            # If set (default), messages posted from the same process that polls
+            # the bus are delivered by reference, without being serialized
+            local_delivery: true
+            # Codec used to serialize the messages sent over Redis - json (default),
+            # orjson or msgpack. Messages carry a format marker, so nodes configured
+            # with different codecs can still read each other's messages.
+            codec: msgpack
+
+    The process that polls the bus (i.e. the daemon) reads the Redis queue on a
+    separate thread, that moves the messages to the local priority lanes (see
+    :class:`platypush.bus.lanes.PriorityLanes`). When ``local_delivery`` is enabled,
+    the messages posted by its own backends and plugins skip Redis altogether: a
+    frozen shallow copy of each message (see :meth:`platypush.message.Message.local_copy`)
+    is shared with the consumers. Processes that don't poll the bus (e.g. the web server) still
+    serialize their messages over Redis.
+    """
     _DEFAULT_REDIS_QUEUE = 'platypush/bus'
 
-    def __init__(self, on_message=None, redis_queue=None, *args, **kwargs):
-        super().__init__(on_message=on_message)
+    # Stop reading from Redis when this number of messages is waiting to be
+    # processed on the local queue.
+    _MAX_LOCAL_BACKLOG = 1000
+
+    # Maximum number of messages waiting to be pushed while Redis is unreachable
+    _MAX_POST_BUFFER = 10000
+
+    def __init__(self, on_message=None, redis_queue=None, dispatcher=None, batch_size: Optional[int] = None,
+                 coalesce_posts: Optional[bool] = None, local_delivery: Optional[bool] = None,
+                 codec: Optional[str] = None, *args, **kwargs):
+        super().__init__(on_message=on_message, dispatcher=dispatcher)
 
         if not args and not kwargs:
             kwargs = (Config.get('backend.redis') or {}).get('redis_args', {})
 
+        bus_conf = Config.get('main.bus') or {}
         self.redis = Redis(*args, **kwargs)
         self.redis_args = kwargs
         self.redis_queue = redis_queue or self._DEFAULT_REDIS_QUEUE
         self.on_message = on_message
         self.thread_id = threading.get_ident()
+        self.batch_size = max(1, int(batch_size or bus_conf.get('batch_size', 1)))
+        self.coalesce_posts = bus_conf.get('coalesce_posts', True) if coalesce_posts is None else coalesce_posts
+        self.local_delivery = bus_conf.get('local_delivery', True) if local_delivery is None else local_delivery
+        self.codec = codec or bus_conf.get('codec')
+        self._local_consumer = False
+        self._reader = None
+
+        self._recv_buffer = deque()
+        self._post_buffer = []
+        self._post_lock = threading.Lock()
+        self._posting = False
+
+    def _drain(self, first_msg: bytes) -> list:
+        """
+        Drain up to ``batch_size - 1`` more messages available on the queue after a
+        blocking pop, in a single round trip.
+        """
+        msgs = [first_msg]
+        if self.batch_size <= 1:
+            return msgs
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrange(self.redis_queue, 0, self.batch_size - 2)
+        pipe.ltrim(self.redis_queue, self.batch_size - 1, -1)
+        msgs.extend(pipe.execute()[0])
+        return msgs
 
     def get(self, parse: bool = True):
+        """ Reads one message from the bus """
+        if self._reader:
+            return super().get()
+        return self._read(parse=parse)
+
+    def _read(self, parse: bool = True):
         """ Reads one message from the Redis queue """
         try:
             if self.should_stop():
                 return
 
-            msg = self.redis.blpop(self.redis_queue, timeout=1)
-            if not msg or msg[1] is None:
-                return
+            if not self._recv_buffer:
+                msg = self.redis.blpop(self.redis_queue, timeout=1)
+                if not msg or msg[1] is None:
+                    return
+
+                self._recv_buffer.extend(self._drain(msg[1]))
 
-            msg = msg[1].decode('utf-8')
+            msg = self._recv_buffer.popleft()
             if parse:
                 return Message.build(msg)
-            return msg
+            return msg if msg.startswith(b'\x00') else msg.decode('utf-8')
         except Exception as e:
             logger.exception(e)
 
     def post(self, msg):
-        """ Sends a message to the Redis queue """
-        return self.redis.rpush(self.redis_queue, str(msg))
+        """
+        Sends a message to the bus. If the bus is polled by the current process
+        and ``local_delivery`` is enabled, a frozen shallow copy of the message is
+        delivered by reference. Otherwise it's serialized and pushed to the Redis queue.
+
+        If another thread is already pushing messages to Redis, the message is
+        appended to the pending batch and it will be pushed by that thread
+        together with the other messages posted in the meantime, in a single
+        ``RPUSH``. Therefore a message posted on an idle bus is sent immediately.
+        """
+        if self._local_consumer and isinstance(msg, Message):
+            self.bus.put(msg.local_copy())
+            return
+
+        msg = msg.serialize(self.codec) if isinstance(msg, Message) else str(msg)
+        if not self.coalesce_posts:
+            return self.redis.rpush(self.redis_queue, msg)
+
+        with self._post_lock:
+            self._post_buffer.append(msg)
+            if self._posting:
+                return
+
+            self._posting = True
+
+        self._flush_posts()
+
+    def post_batch(self, msgs):
+        """
+        Sends a list of messages to the bus. Messages sent to Redis are pushed in a single
+        round trip, unless ``coalesce_posts`` is disabled.
+        """
+        if self._local_consumer or not self.coalesce_posts:
+            for msg in msgs:
+                self.post(msg)
+            return
+
+        with self._post_lock:
+            self._post_buffer.extend(
+                msg.serialize(self.codec) if isinstance(msg, Message) else str(msg)
+                for msg in msgs
+            )
+
+            if self._posting:
+                return
+
+            self._posting = True
+
+        self._flush_posts()
+
+    def _push(self, msgs: list):
+        """ Pushes a batch of serialized messages to Redis in a single round trip """
+        self.redis.rpush(self.redis_queue, *msgs)
+
+    def _flush_posts(self):
+        while True:
+            with self._post_lock:
+                msgs = self._post_buffer
+                if not msgs:
+                    self._posting = False
+                    return
+
+                self._post_buffer = []
+
+            try:
+                self._push(msgs)
+            except Exception as e:
+                logger.warning('Could not push {} messages to the bus: {}'.format(len(msgs), str(e)))
+                self._requeue_posts(msgs)
+                return
+
+    def _requeue_posts(self, msgs: list):
+        """
+        Puts a batch that couldn't be pushed back at the head of the pending batch, so it's
+        pushed again by the next post. The messages posted by other threads in the meantime
+        are kept, as their ``post`` has already returned. If Redis stays unreachable, the
+        oldest messages beyond ``_MAX_POST_BUFFER`` are dropped.
+        """
+        with self._post_lock:
+            self._post_buffer = msgs + self._post_buffer
+            dropped = self._post_buffer[:-self._MAX_POST_BUFFER]
+            if dropped:
+                self._post_buffer = self._post_buffer[len(dropped):]
+            self._posting = False
+
+        for msg in dropped:
+            logger.warning('Bus unreachable, message dropped: {}'.format(msg))
+
+    def _read_loop(self):
+        while not self.should_stop():
+            if self.bus.qsize() >= self._MAX_LOCAL_BACKLOG:
+                self._should_stop.wait(0.05)
+                continue
+
+            msg = self._read()
+            if msg is not None:
+                self.bus.put(msg)
+
+    def poll(self):
+        if self.on_message:
+            self._local_consumer = self.local_delivery
+            self._reader = threading.Thread(target=self._read_loop, name='RedisBusReader', daemon=True)
+            self._reader.start()
+
+        super().poll()
 
     def stop(self):
         super().stop()
         self.redis.close()
 
 
+def get_redis_bus(*args, **kwargs) -> RedisBus:
+    """
+    Build the Redis bus configured through the ``type`` attribute of the ``main.bus``
+    configuration section - ``list`` (default, :class:`RedisBus`) or ``stream``
+    (:class:`platypush.bus.redis_stream.RedisStreamBus`).
+    """
+    bus_type = (Config.get('main.bus') or {}).get('type', 'list')
+    if bus_type == 'stream':
+        from platypush.bus.redis_stream import RedisStreamBus
+        return RedisStreamBus(*args, **kwargs)
+
+    assert bus_type == 'list', 'Unsupported bus type: {}. Supported types: list, stream'.format(bus_type)
+    return RedisBus(*args, **kwargs)
+
+
 # vim:sw=4:ts=4:et:
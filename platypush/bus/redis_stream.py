@@ -0,0 +1,216 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from collections import deque
+from typing import Optional
+
+from redis.exceptions import ResponseError
+
+from platypush.bus.redis import RedisBus
+from platypush.config import Config
+from platypush.message import Message
+
+logger = logging.getLogger('platypush:bus:redis_stream')
+
+
+class RedisStreamBus(RedisBus):
+    """
+    Bus implementation based on `Redis Streams <https://redis.io/topics/streams-intro>`_ and
+    consumer groups. Unlike :class:`platypush.bus.redis.RedisBus`, that is drained by a single
+    process, several platypush processes (on the same host or on different hosts) can join the
+    same consumer group and share the execution of the messages posted on the stream.
+
+        - Each message is delivered to exactly one consumer of the group.
+        - A message is acknowledged (``XACK``) only after it has been processed. Messages that are
+          still unacknowledged after ``claim_timeout`` seconds (e.g. because the consumer that picked
+          them up crashed) are claimed and processed by another consumer (at-least-once delivery).
+        - The length of the stream is capped to approximately ``max_len`` entries.
+        - Messages that can't be parsed are acknowledged and moved to the ``<stream>/dead`` stream.
+
+    Messages are always serialized on the stream, as any consumer of the group may process them.
+    It requires Redis >= 6.2. Enable it through the ``main.bus`` configuration:
+
+    .. code-block:: yaml
+
+        main.bus:
+            type: stream
+            # Name of the consumer group (default: platypush)
+            group: platypush
+            # Name of this consumer (default: <device_id>-<pid>)
+            consumer: worker-1
+            # Approximate maximum number of entries kept on the stream (default: 10000)
+            max_len: 10000
+            # Seconds after which unacknowledged messages are redelivered (default: 30)
+            claim_timeout: 30
+            # Maximum number of unacknowledged messages claimed in a single round trip (default: 100)
+            claim_count: 100
+
+    """
+
+    _DEFAULT_GROUP = 'platypush'
+    _DEFAULT_MAX_LEN = 10000
+    _DEFAULT_CLAIM_TIMEOUT = 30.0
+    _DEFAULT_CLAIM_COUNT = 100
+    _CLAIM_START = '0-0'
+
+    # Keep the local backlog short, so the messages read from the stream are processed
+    # (and acknowledged) well before they can be claimed by other consumers.
+    _MAX_LOCAL_BACKLOG = 100
+
+    def __init__(self, *args, stream: Optional[str] = None, group: Optional[str] = None,
+                 consumer: Optional[str] = None, max_len: Optional[int] = None,
+                 claim_timeout: Optional[float] = None, claim_count: Optional[int] = None, **kwargs):
+        """
+        :param stream: Name of the stream (default: ``<redis_queue>/stream``).
+        :param group: Name of the consumer group (default: ``platypush``).
+        :param consumer: Name of this consumer (default: ``<device_id>-<pid>``).
+        :param max_len: Approximate maximum number of entries kept on the stream (default: 10000).
+        :param claim_timeout: Seconds after which unacknowledged messages are claimed by another
+            consumer (default: 30).
+        :param claim_count: Maximum number of unacknowledged messages claimed in a single round
+            trip (default: 100).
+        """
+        super().__init__(*args, local_delivery=False, **kwargs)
+        bus_conf = Config.get('main.bus') or {}
+
+        self.stream = stream or bus_conf.get('stream') or '{}/stream'.format(self.redis_queue)
+        self.group = group or bus_conf.get('group') or self._DEFAULT_GROUP
+        self.consumer = consumer or bus_conf.get('consumer') or '{}-{}'.format(
+            Config.get('device_id') or socket.gethostname(), os.getpid())
+        self.max_len = int(max_len or bus_conf.get('max_len') or self._DEFAULT_MAX_LEN)
+        self.claim_timeout = float(claim_timeout or bus_conf.get('claim_timeout') or self._DEFAULT_CLAIM_TIMEOUT)
+        self.claim_count = int(claim_count or bus_conf.get('claim_count') or self._DEFAULT_CLAIM_COUNT)
+        self.dead_stream = '{}/dead'.format(self.stream)
+
+        self._entries = deque()
+        self._pending_acks = {}
+        self._acks_lock = threading.Lock()
+        self._group_created = False
+        self._last_claim = 0
+        self._claim_cursor = self._CLAIM_START
+
+    def _create_group(self):
+        if self._group_created:
+            return
+
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            # The group already exists
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+        self._group_created = True
+
+    def _claim(self) -> list:
+        """
+        Claim the messages that have been pending on other consumers for longer than ``claim_timeout``.
+        A sweep of the pending entries is started every ``claim_timeout / 2`` seconds. It follows the
+        cursor returned by ``XAUTOCLAIM`` until it has scanned the whole list, and it's resumed on the
+        next read whenever a page of claimed messages is returned.
+        """
+        if self._claim_cursor == self._CLAIM_START:
+            if time.time() - self._last_claim < self.claim_timeout / 2:
+                return []
+            self._last_claim = time.time()
+
+        entries = []
+        while not entries:
+            ret = self.redis.xautoclaim(self.stream, self.group, self.consumer,
+                                        min_idle_time=int(self.claim_timeout * 1000),
+                                        start_id=self._claim_cursor, count=self.claim_count)
+
+            cursor = ret[0].decode() if isinstance(ret[0], bytes) else ret[0]
+            self._claim_cursor = cursor or self._CLAIM_START
+            entries = [entry for entry in ret[1] if entry and entry[1]]
+            if self._claim_cursor == self._CLAIM_START:
+                break
+
+        if entries:
+            logger.info('Claimed {} unacknowledged messages from the stream {}'.format(len(entries), self.stream))
+        return entries
+
+    def _read_entries(self) -> list:
+        entries = self._claim()
+        if entries:
+            return entries
+
+        ret = self.redis.xreadgroup(self.group, self.consumer, {self.stream: '>'},
+                                    count=self.batch_size, block=1000)
+        return [entry for _, stream_entries in (ret or []) for entry in stream_entries]
+
+    def _read(self, parse: bool = True):
+        """ Reads one message from the stream """
+        try:
+            if self.should_stop():
+                return
+
+            self._create_group()
+            if not self._entries:
+                self._entries.extend(self._read_entries())
+                if not self._entries:
+                    return
+
+            entry_id, fields = self._entries.popleft()
+            data = fields.get(b'msg')
+            if data is None:
+                self.redis.xack(self.stream, self.group, entry_id)
+                return
+
+            if not parse:
+                return data
+
+            try:
+                msg = Message.build(data)
+            except Exception as e:
+                self._dead_letter(entry_id, data, e)
+                return
+
+            with self._acks_lock:
+                self._pending_acks[id(msg)] = entry_id
+            return msg
+        except Exception as e:
+            logger.exception(e)
+
+    def _dead_letter(self, entry_id, data: bytes, error: Exception):
+        """
+        Move a message that can't be parsed to the ``<stream>/dead`` stream and acknowledge it,
+        so it's not claimed and redelivered to the consumers of the group over and over.
+        """
+        logger.warning('Invalid message {} on the stream {}, moved to {}: {}'.format(
+            entry_id, self.stream, self.dead_stream, str(error) or type(error).__name__))
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.dead_stream, {'msg': data, 'entry_id': entry_id}, maxlen=self.max_len, approximate=True)
+        pipe.xack(self.stream, self.group, entry_id)
+        pipe.execute()
+
+    def ack(self, msg):
+        with self._acks_lock:
+            entry_id = self._pending_acks.pop(id(msg), None)
+
+        if entry_id:
+            try:
+                self.redis.xack(self.stream, self.group, entry_id)
+            except Exception as e:
+                logger.warning('Could not acknowledge message {} on {}: {}'.format(entry_id, self.stream, str(e)))
+
+    def _push(self, msgs: list):
+        pipe = self.redis.pipeline(transaction=False)
+        for msg in msgs:
+            pipe.xadd(self.stream, {'msg': msg}, maxlen=self.max_len, approximate=True)
+        pipe.execute()
+
+    def post(self, msg):
+        """ Adds a message to the stream """
+        if not self.coalesce_posts:
+            msg = msg.serialize(self.codec) if isinstance(msg, Message) else str(msg)
+            return self.redis.xadd(self.stream, {'msg': msg}, maxlen=self.max_len, approximate=True)
+
+        return super().post(msg)
+
+
+# vim:sw=4:ts=4:et:
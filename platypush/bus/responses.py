@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+
+from concurrent.futures import CancelledError, Future, TimeoutError
+from typing import Dict, Optional
+
+from redis import Redis
+
+from platypush.message import Message
+from platypush.message.response import Response
+from platypush.utils import get_redis_queue_name_by_id
+
+logger = logging.getLogger('platypush:bus:responses')
+
+# Redis channel where the daemon publishes the responses to the requests sent by the web server
+RESPONSES_CHANNEL = 'platypush/responses'
+
+
+
+class ResponseDispatcher:
+    """
+    Receives all the responses published on the shared responses channel over a single,
+    long-lived subscription, and resolves the futures of the requests waiting for them.
+    Waiting for a response doesn't require a dedicated Redis connection nor a blocking
+    ``BLPOP``.
+
+    The subscriber thread is started on the first request, so each process (e.g. each web
+    server worker) gets its own subscription.
+
+    Pub/sub messages are not buffered, so the daemon also pushes the responses to the queue
+    of each request. The responses published while the subscriber is reconnecting, or that
+    are not received within the timeout, are recovered from those queues. The queues of the
+    responses received on the channel are deleted.
+    """
+
+    def __init__(self, redis_args: Optional[dict] = None, channel: str = RESPONSES_CHANNEL):
+        self.redis_args = redis_args or {}
+        self.channel = channel
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._thread = None
+        self._redis = None
+
+    def expect(self, request_id: str) -> Future:
+        """
+        Register a request that is waiting for a response. It should be called before the
+        request is sent, so the response can't be published before the future is registered.
+        """
+        self._start()
+        future = Future()
+        with self._lock:
+            self._futures[request_id] = future
+        return future
+
+    def cancel(self, request_id: str):
+        """
+        Stop waiting for the response to a request.
+        """
+        with self._lock:
+            future = self._futures.pop(request_id, None)
+        if future:
+            future.cancel()
+
+    def wait(self, request_id: str, future: Future, timeout: Optional[float] = None) -> Optional[Response]:
+        """
+        Wait for the response to a request registered through :meth:`expect`.
+
+        :return: The response, or None if it wasn't received within the timeout or the wait was cancelled.
+        """
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            return self._pop_response(request_id)
+        except CancelledError:
+            return None
+        finally:
+            with self._lock:
+                self._futures.pop(request_id, None)
+
+    def _start(self):
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='ResponseDispatcher', daemon=True)
+                self._thread.start()
+
+        if not self._subscribed.wait(timeout=5):
+            logger.warning('Not subscribed to {} yet: responses may be lost'.format(self.channel))
+
+    def _get_redis(self) -> Redis:
+        # The client is shared, as it manages a pool of connections
+        if not self._redis:
+            self._redis = Redis(**self.redis_args)
+        return self._redis
+
+    def _pop_response(self, request_id: str) -> Optional[Response]:
+        try:
+            data = self._get_redis().lpop(get_redis_queue_name_by_id(request_id))
+            return Message.build(data) if data else None
+        except Exception as e:
+            logger.warning('Could not read the response to {}: {}'.format(request_id, str(e)))
+
+    def _recover(self):
+        """
+        Collect from the request queues the responses that may have been published while
+        the subscriber was not connected.
+        """
+        with self._lock:
+            request_ids = list(self._futures.keys())
+
+        if not request_ids:
+            return
+
+        pipe = self._get_redis().pipeline(transaction=False)
+        for request_id in request_ids:
+            pipe.lpop(get_redis_queue_name_by_id(request_id))
+
+        for data in pipe.execute():
+            if data:
+                self._on_response(data)
+
+    def _on_response(self, data):
+        try:
+            response = Message.build(data)
+        except Exception as e:
+            logger.warning('Invalid response received on {}: {}'.format(self.channel, str(e)))
+            return
+
+        with self._lock:
+            future = self._futures.pop(getattr(response, 'id', None), None)
+
+        if not future:
+            return
+
+        if not future.done():
+            future.set_result(response)
+
+        try:
+            # The response won't be read from its queue anymore
+            self._get_redis().delete(get_redis_queue_name_by_id(response.id))
+        except Exception as e:
+            logger.warning('Could not delete the response queue of {}: {}'.format(response.id, str(e)))
+
+    def _run(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = Redis(**self.redis_args).pubsub()
+                pubsub.subscribe(self.channel)
+
+                # Wait for the subscription to be confirmed
+                while not self._subscribed.is_set():
+                    msg = pubsub.get_message(timeout=1)
+                    if msg and msg['type'] == 'subscribe':
+                        self._subscribed.set()
+
+                self._recover()
+
+                for msg in pubsub.listen():
+                    if msg['type'] == 'message':
+                        self._on_response(msg['data'])
+            except Exception as e:
+                logger.warning('Error on the {} subscription: {}'.format(self.channel, str(e)))
+                self._subscribed.clear()
+                time.sleep(1)
+            finally:
+                if pubsub:
+                    pubsub.close()
+
+
+# vim:sw=4:ts=4:et:
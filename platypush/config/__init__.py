@@ -1,3 +1,4 @@
+import copy
 import datetime
 import importlib
 import inspect
@@ -8,15 +9,19 @@ import pkgutil
 import re
 import socket
 import sys
-from typing import Optional
+from typing import Dict, Optional
 
 import yaml
 
+from platypush.config.cache import ConfigFileCache
 from platypush.utils import get_hash, is_functional_procedure, is_functional_hook, is_functional_cron
 
 """ Config singleton instance """
 _default_config_instance = None
 
+# Use the libyaml bindings, if available
+_yaml_loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class Config(object):
     """
@@ -48,13 +53,25 @@ class Config(object):
     _workdir_location = os.path.join(os.path.expanduser('~'), '.local', 'share', 'platypush')
     _included_files = set()
 
-    def __init__(self, cfgfile=None):
+    # Snapshot of the parsed configuration files, shared by the processes that load the configuration
+    _file_cache_location = os.path.join(_workdir_location, 'config.cache')
+    _file_cache = None
+
+    # Sections that can be reloaded without restarting the application
+    _reloadable_sections = ('event_hooks', 'procedures', 'cronjobs')
+
+    # Modification times of the imported scripts, used to reload the modified ones
+    _scripts_mtimes: Dict[str, float] = {}
+
+    def __init__(self, cfgfile=None, reload_scripts=False):
         """
         Constructor. Always use the class as a singleton (i.e. through
         Config.init), you won't probably need to call the constructor directly
         Params:
             cfgfile -- Config file path (default: retrieve the first
                        available location in _cfgfile_locations)
+            reload_scripts -- Reload the modules in scripts_dir that have been
+                       modified since they were imported (default: False)
         """
 
         if cfgfile is None:
@@ -64,8 +81,12 @@ class Config(object):
             raise RuntimeError('No config file specified and nothing found in {}'
                                .format(self._cfgfile_locations))
 
+        if Config._file_cache is None:
+            Config._file_cache = ConfigFileCache(self._file_cache_location)
+
         self._cfgfile = os.path.abspath(os.path.expanduser(cfgfile))
         self._config = self._read_config_file(self._cfgfile)
+        self._file_cache.save()
 
         if 'token' in self._config:
             self._config['token'] = self._config['token']
@@ -142,14 +163,21 @@ class Config(object):
         self.cronjobs = {}
         self.dashboards = {}
 
+        self._reload_scripts = reload_scripts
         self._init_constants()
         self._load_scripts()
         self._init_components()
         self._init_dashboards(self._config['dashboards_dir'])
 
+        # Pristine copy of the reloadable sections, as their entries may be modified when they are compiled
+        self._snapshot = copy.deepcopy({
+            section: getattr(self, section)
+            for section in self._reloadable_sections
+        })
+
     @staticmethod
     def _is_special_token(token):
-        return token == 'main.db' or \
+        return token.startswith('main.') or \
                token == 'token' or \
                token == 'token_hash' or \
                token == 'logging' or \
@@ -158,13 +186,12 @@ class Config(object):
                token == 'environment'
 
     def _read_config_file(self, cfgfile):
-        cfgfile_dir = os.path.dirname(os.path.abspath(
-            os.path.expanduser(cfgfile)))
-
+        cfgfile = os.path.abspath(os.path.expanduser(cfgfile))
+        cfgfile_dir = os.path.dirname(cfgfile)
         config = {}
 
-        with open(cfgfile, 'r') as fp:
-            file_config = yaml.safe_load(fp)
+        # Only the files that have changed since the last load are parsed again
+        file_config = self._file_cache.load(cfgfile, self._parse_config_file)
 
         if not file_config:
             return config
@@ -192,9 +219,27 @@ class Config(object):
 
         return config
 
+    @staticmethod
+    def _parse_config_file(content: bytes):
+        return yaml.load(content, Loader=_yaml_loader)
+
+    def _import_module(self, modname: str):
+        module = sys.modules.get(modname)
+        if module and self._reload_scripts and getattr(module, '__file__', None):
+            mtime = os.path.getmtime(module.__file__)
+            if mtime != self._scripts_mtimes.get(modname, mtime):
+                module = importlib.reload(module)
+        else:
+            module = importlib.import_module(modname)
+
+        if getattr(module, '__file__', None):
+            self._scripts_mtimes[modname] = os.path.getmtime(module.__file__)
+
+        return module
+
     def _load_module(self, modname: str, prefix: Optional[str] = None):
         try:
-            module = importlib.import_module(modname)
+            module = self._import_module(modname)
         except Exception as e:
             print('Unhandled exception while importing module {}: {}'.format(modname, str(e)))
             return
@@ -244,6 +289,7 @@ class Config(object):
             elif key.startswith('procedure.'):
                 tokens = key.split('.')
                 _async = True if len(tokens) > 2 and tokens[1] == 'async' else False
+                dag = True if len(tokens) > 2 and tokens[1] == 'dag' else False
                 procedure_name = '.'.join(tokens[2:] if len(tokens) > 2 else tokens[1:])
                 args = []
                 m = re.match(r'^([^(]+)\(([^)]+)\)\s*', procedure_name)
@@ -258,6 +304,7 @@ class Config(object):
 
                 self.procedures[procedure_name] = {
                     '_async': _async,
+                    'dag': dag,
                     'actions': self._config[key],
                     'args': args,
                 }
@@ -376,6 +423,42 @@ class Config(object):
         global _default_config_instance
         _default_config_instance = Config(cfgfile)
 
+    @staticmethod
+    def reload() -> Dict[str, dict]:
+        """
+        Reload the configuration file, and the modified scripts.
+
+        The unchanged procedures keep their current configuration objects, so their compiled
+        versions are reused.
+
+        :return: ``section -> {"changed": {name: config}, "removed": [names]}`` map of the changes
+            to the event hooks, procedures and cronjobs, where ``changed`` also includes the new entries.
+        """
+        global _default_config_instance
+        old_config = _default_config_instance
+        new_config = Config(old_config._cfgfile if old_config else None, reload_scripts=True)
+        changes = {}
+
+        for section in Config._reloadable_sections:
+            old_entries = old_config._snapshot[section] if old_config else {}
+            new_entries = new_config._snapshot[section]
+            changes[section] = {
+                'changed': {
+                    name: getattr(new_config, section)[name]
+                    for name, entry in new_entries.items()
+                    if name not in old_entries or old_entries[name] != entry
+                },
+                'removed': [name for name in old_entries if name not in new_entries],
+            }
+
+        if old_config:
+            for name in new_config.procedures:
+                if name not in changes['procedures']['changed']:
+                    new_config.procedures[name] = old_config.procedures[name]
+
+        _default_config_instance = new_config
+        return changes
+
     @staticmethod
     def get(key: Optional[str] = None):
         """
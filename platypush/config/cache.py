@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('platypush:config:cache')
+
+
+class _CacheEntry:
+    __slots__ = ('mtime_ns', 'size', 'digest', 'checked_at_ns', 'data')
+
+    def __init__(self, mtime_ns: int, size: int, digest: str, checked_at_ns: int, data: bytes):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.checked_at_ns = checked_at_ns
+        self.data = data
+
+
+class ConfigFileCache:
+    """
+    Cache of the parsed configuration files, shared by the processes that load the same
+    configuration (daemon, web server workers...) through a snapshot file.
+
+    Files are validated through their modification time and size, and their content hash is only
+    checked if those have changed (or if the file was modified too close to the last check to rely
+    on its modification time). Only the files that have actually changed are parsed again.
+
+    Parsed files are stored serialized, so each load returns a new copy that can be safely
+    modified by the caller.
+    """
+
+    _version = 1
+
+    # Files modified less than this number of nanoseconds before they were last checked are
+    # always validated through their hash, as they may have been modified again within the
+    # granularity of the file system timestamps
+    _racy_window_ns = 2 * 10 ** 9
+
+    def __init__(self, cache_file: Optional[str] = None):
+        """
+        :param cache_file: Path of the snapshot file (default: no persistence across processes).
+        """
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._snapshot_loaded = False
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _load_snapshot(self):
+        self._snapshot_loaded = True
+        if not (self.cache_file and os.path.isfile(self.cache_file)):
+            return
+
+        try:
+            with open(self.cache_file, 'rb') as f:
+                snapshot = pickle.load(f)
+
+            assert snapshot.get('version') == self._version, 'Unsupported config cache version'
+            self._entries.update(snapshot['entries'])
+        except Exception as e:
+            logger.warning('Could not load the configuration cache {}: {}'.format(self.cache_file, str(e)))
+
+    def save(self):
+        """
+        Write the snapshot of the cache, if it has changed. The file is replaced atomically, so
+        processes loading the configuration at the same time never read a partial snapshot.
+        """
+        with self._lock:
+            if not (self.cache_file and self._dirty):
+                return
+
+            snapshot = pickle.dumps({'version': self._version, 'entries': self._entries})
+            self._dirty = False
+
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=cache_dir, prefix='.config-cache-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(snapshot)
+                os.replace(tmp_file, self.cache_file)
+            except Exception:
+                os.unlink(tmp_file)
+                raise
+        except Exception as e:
+            logger.warning('Could not save the configuration cache {}: {}'.format(self.cache_file, str(e)))
+
+    def load(self, path: str, parser: Callable[[bytes], Any]) -> Any:
+        """
+        Load a parsed file from the cache, parsing it again only if it has changed.
+
+        :param path: Absolute path of the file.
+        :param parser: Function that parses the content of the file.
+        :return: A new copy of the parsed content.
+        """
+        with self._lock:
+            if not self._snapshot_loaded:
+                self._load_snapshot()
+
+            stat = os.stat(path)
+            now_ns = time.time_ns()
+            entry = self._entries.get(path)
+
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size \
+                    and entry.checked_at_ns - entry.mtime_ns > self._racy_window_ns:
+                self.hits += 1
+                return pickle.loads(entry.data)
+
+            with open(path, 'rb') as f:
+                content = f.read()
+
+            digest = hashlib.sha256(content).hexdigest()
+            if entry and entry.digest == digest:
+                self.hits += 1
+                data = entry.data
+            else:
+                self.misses += 1
+                data = pickle.dumps(parser(content))
+
+            self._entries[path] = _CacheEntry(mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+                                              digest=digest, checked_at_ns=now_ns, data=data)
+            self._dirty = True
+            return pickle.loads(data)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# vim:sw=4:ts=4:et:
@@ -2,7 +2,7 @@ import asyncio
 import importlib
 import logging
 
-from threading import RLock
+from threading import RLock, Thread
 
 from ..config import Config
 
@@ -21,6 +21,29 @@ plugins_init_locks = {}
 # Reference to the main application bus
 main_bus = None
 
+# Reference to the main messages/requests dispatcher
+main_dispatcher = None
+main_dispatcher_lock = RLock()
+
+# Reference to the shared executor of the event hooks
+main_hook_executor = None
+main_hook_executor_lock = RLock()
+
+# Reference to the event processor
+main_event_processor = None
+main_event_processor_lock = RLock()
+
+# Lock that serializes the reloads of the configuration
+reload_lock = RLock()
+
+# Reference to the cron scheduler
+main_cron_scheduler = None
+main_cron_scheduler_lock = RLock()
+
+# Reference to the shared event loop that runs the asyncio actions
+main_loop = None
+main_loop_lock = RLock()
+
 def register_backends(bus=None, global_scope=False, **kwargs):
     """ Initialize the backend objects based on the configuration and returns
         a name -> backend_instance map.
@@ -122,6 +145,120 @@ def get_bus():
     return main_bus
 
 
+def get_dispatcher():
+    """ Returns the main dispatcher, initializing it from the ``main.dispatcher`` configuration if required """
+    global main_dispatcher
+
+    with main_dispatcher_lock:
+        if not main_dispatcher:
+            from platypush.bus.dispatcher import Dispatcher
+            main_dispatcher = Dispatcher.build(Config.get('main.dispatcher'))
+
+    return main_dispatcher
+
+
+def get_hook_executor():
+    """ Returns the shared executor of the event hooks, initializing it from the ``main.hook_executor`` configuration if required """
+    global main_hook_executor
+
+    with main_hook_executor_lock:
+        if not main_hook_executor:
+            from platypush.event.executor import HookExecutor
+            main_hook_executor = HookExecutor.build(Config.get('main.hook_executor'))
+
+    return main_hook_executor
+
+
+def get_cron_scheduler():
+    """ Returns the cron scheduler of the configured cronjobs, initializing it from the ``main.cron_scheduler`` configuration if required """
+    global main_cron_scheduler
+
+    with main_cron_scheduler_lock:
+        if not main_cron_scheduler:
+            from platypush.cron.scheduler import CronScheduler
+            main_cron_scheduler = CronScheduler.build(Config.get_cronjobs(), Config.get('main.cron_scheduler'))
+
+    return main_cron_scheduler
+
+
+def get_event_processor():
+    """ Returns the processor that runs the event hooks, initializing it from the configured hooks if required """
+    global main_event_processor
+
+    with main_event_processor_lock:
+        if not main_event_processor:
+            from platypush.event.processor import EventProcessor
+            main_event_processor = EventProcessor()
+
+    return main_event_processor
+
+
+def reload_config() -> dict:
+    """
+    Reload the configuration, and swap the event hooks, procedures and cronjobs that have changed
+    without restarting the backends and the plugins. The executions in progress complete on the
+    previous definitions.
+
+    :return: ``section -> {"changed": [names], "removed": [names]}`` map of the reloaded entries.
+    """
+    from platypush.procedure import compile_procedures
+
+    with reload_lock:
+        changes = Config.reload()
+        if main_event_processor:
+            main_event_processor.reload_hooks(**changes['event_hooks'])
+        if main_cron_scheduler:
+            main_cron_scheduler.update_jobs(**changes['cronjobs'])
+
+        compile_procedures()
+
+    summary = {
+        section: {
+            'changed': sorted(section_changes['changed'].keys()),
+            'removed': sorted(section_changes['removed']),
+        }
+        for section, section_changes in changes.items()
+    }
+
+    logger.info('Configuration reloaded: {}'.format(summary))
+    return summary
+
+
+def get_async_loop() -> asyncio.AbstractEventLoop:
+    """ Returns the shared event loop that runs the asyncio actions, starting it on a daemon thread if required """
+    global main_loop
+
+    with main_loop_lock:
+        if not main_loop:
+            loop = asyncio.new_event_loop()
+            Thread(target=loop.run_forever, name='platypush:async', daemon=True).start()
+            main_loop = loop
+
+    return main_loop
+
+
+def run_async(coro, timeout=None):
+    """
+    Run a coroutine on the shared event loop, and wait for its result.
+
+    :param coro: Coroutine to be executed.
+    :param timeout: Maximum number of seconds to wait (default: no timeout).
+    :raises RuntimeError: If called from the shared event loop itself, where it would block the
+        loop - coroutines running on the loop should ``await`` the other coroutines instead.
+    """
+    loop = get_async_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+
+    if running_loop is loop:
+        coro.close()
+        raise RuntimeError('run_async called from the shared event loop: await the coroutine instead')
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
 def get_or_create_event_loop():
     try:
         loop = asyncio.get_event_loop()
@@ -1,15 +1,24 @@
 from functools import wraps
 from logging import getLogger
+from typing import Optional
 
 from platypush.common import exec_wrapper
 
 logger = getLogger(__name__)
 
 
-def cron(cron_expression: str):
+def cron(cron_expression: str, jitter: Optional[float] = None, missed_runs: Optional[str] = None,
+         grace_time: Optional[float] = None):
+    """
+    Decorator for the functional cronjobs. The optional attributes override the defaults of the
+    scheduler - see :class:`platypush.cron.scheduler.Cronjob`.
+    """
     def wrapper(f):
         f.cron = True
         f.cron_expression = cron_expression
+        f.jitter = jitter
+        f.missed_runs = missed_runs
+        f.grace_time = grace_time
 
         @wraps(f)
         def wrapped(*args, **kwargs):
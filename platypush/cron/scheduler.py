@@ -1,11 +1,18 @@
 import datetime
 import enum
+import heapq
+import itertools
 import logging
 import threading
+import time
+import zlib
+
+from typing import Dict, Iterable, Optional
 
 import croniter
 from dateutil.tz import gettz
 
+from platypush.bus.dispatcher import Dispatcher
 from platypush.procedure import Procedure
 from platypush.utils import is_functional_cron
 
@@ -20,26 +27,122 @@ class CronjobState(enum.IntEnum):
     ERROR = 4
 
 
-class Cronjob(threading.Thread):
-    def __init__(self, name, cron_expression, actions):
-        super().__init__()
+class MissedRunPolicy(enum.Enum):
+    """
+    What the scheduler should do with the runs of a job that are later than their grace
+    time - e.g. after a system suspend, a clock jump or a long previous run.
+    """
+    SKIP = 'skip'           # Skip the missed runs, and wait for the next scheduled time
+    RUN_ONCE = 'run_once'   # Run the job once, and then wait for the next scheduled time
+    CATCH_UP = 'catch_up'   # Run the job once for each missed scheduled time
+
+
+class Cronjob:
+    _default_grace_time = 60.0
+    _options = ('jitter', 'missed_runs', 'grace_time')
+
+    def __init__(self, name, cron_expression, actions, jitter: Optional[float] = None,
+                 missed_runs: Optional[str] = None, grace_time: Optional[float] = None):
+        """
+        :param name: Job name.
+        :param cron_expression: Cron expression of the job schedule.
+        :param actions: Actions to run, or function decorated with :func:`platypush.cron.cron`.
+        :param jitter: Width of the window, in seconds, over which the runs are spread. Each run is
+            delayed by an offset within the window derived from the hash of the job name, so it's
+            stable across restarts but different for jobs with the same schedule (default: 0).
+        :param missed_runs: Missed runs policy - ``skip``, ``run_once`` (default) or ``catch_up``.
+        :param grace_time: Delay, in seconds, after which a run is considered missed (default: 60).
+        """
         self.cron_expression = cron_expression
         self.name = name
         self.state = CronjobState.IDLE
-        self._should_stop = threading.Event()
+        self.jitter = float(jitter or 0)
+        self.missed_runs = MissedRunPolicy(missed_runs or MissedRunPolicy.RUN_ONCE.value)
+        self.grace_time = float(grace_time if grace_time is not None else self._default_grace_time)
+        self.offset = self.jitter * (zlib.crc32(name.encode()) / 2 ** 32)
+        self.next_run: Optional[float] = None
+        self._cron = croniter.croniter(self.cron_expression, self._now())
+
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.last_run: Optional[float] = None
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+        self._due_runs = 0
 
         if isinstance(actions, dict) or isinstance(actions, list):
             self.actions = Procedure.build(name=name + '__Cron', _async=False, requests=actions)
         else:
             self.actions = actions
 
-    def run(self):
+    @classmethod
+    def build(cls, name, config, **defaults) -> 'Cronjob':
+        """
+        Build a job from its configuration.
+
+        :param name: Job name.
+        :param config: Either a ``{cron_expression, actions}`` dictionary, with optional ``jitter``,
+            ``missed_runs`` and ``grace_time`` attributes, or a function decorated with
+            :func:`platypush.cron.cron`.
+        :param defaults: Default values for the optional attributes.
+        """
+        if isinstance(config, dict):
+            options = {key: config[key] for key in cls._options if config.get(key) is not None}
+            return cls(name=name, cron_expression=config['cron_expression'], actions=config['actions'],
+                       **{**defaults, **options})
+        if is_functional_cron(config):
+            options = {key: getattr(config, key) for key in cls._options if getattr(config, key, None) is not None}
+            return cls(name=name, cron_expression=config.cron_expression, actions=config,
+                       **{**defaults, **options})
+
+        raise AssertionError('Expected type dict or function for cron {}, got {}'.format(
+            name, type(config)))
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now().replace(tzinfo=gettz())  # lgtm [py/call-to-non-callable]
+
+    def get_next_run(self) -> float:
+        """
+        Advance the cron iterator, and return the timestamp of the next run. The scheduled
+        times that have already passed are skipped, unless the missed runs are caught up.
+        """
+        now = self._now()
+        next_run = self._cron.get_next() + self.offset
+        if next_run <= now.timestamp() and self.missed_runs != MissedRunPolicy.CATCH_UP:
+            # Restart from the earliest scheduled time whose run (shifted by the offset) is still ahead
+            self._cron.set_current(now - datetime.timedelta(seconds=self.offset))
+            next_run = self._cron.get_next() + self.offset
+
+        self.next_run = next_run
         self.state = CronjobState.WAIT
-        self.wait()
-        if self.should_stop():
-            return
+        return next_run
+
+    def should_run(self, now: float) -> bool:
+        """
+        Record the lateness of a due run, and apply the missed runs policy.
 
+        :return: False if the run should be skipped.
+        """
+        lateness = max(now - self.next_run, 0.0)
+        self._due_runs += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self._total_lateness += lateness
+
+        if lateness <= self.grace_time:
+            return True
+
+        self.missed += 1
+        logger.warning('Cronjob {} is {:.1f} seconds late'.format(self.name, lateness))
+        return self.missed_runs != MissedRunPolicy.SKIP
+
+    def run(self):
         self.state = CronjobState.RUNNING
+        self.runs += 1
+        self.last_run = time.time()
 
         try:
             logger.info('Running cronjob {}'.format(self.name))
@@ -54,51 +157,214 @@ class Cronjob(threading.Thread):
             self.state = CronjobState.DONE
         except Exception as e:
             logger.exception(e)
+            self.errors += 1
             self.state = CronjobState.ERROR
 
-    def wait(self):
-        now = datetime.datetime.now().replace(tzinfo=gettz())  # lgtm [py/call-to-non-callable]
-        cron = croniter.croniter(self.cron_expression, now)
-        next_run = cron.get_next()
-        self._should_stop.wait(next_run - now.timestamp())
+    def get_stats(self) -> dict:
+        return {
+            'cron_expression': self.cron_expression,
+            'state': self.state.name.lower(),
+            'next_run': self.next_run,
+            'last_run': self.last_run,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'offset': self.offset,
+            'last_lateness': self.last_lateness,
+            'avg_lateness': self._total_lateness / self._due_runs if self._due_runs else 0.0,
+            'max_lateness': self.max_lateness,
+        }
 
-    def stop(self):
-        self._should_stop.set()
 
-    def should_stop(self):
-        return self._should_stop.is_set()
+class CronScheduler(threading.Thread):
+    """
+    Cron scheduler. The jobs are kept on a heap of next run times, and the scheduler
+    thread sleeps until the earliest one is due. Due jobs are executed on a pool of
+    workers, and they are scheduled again when they complete, so the runs of a job
+    never overlap.
 
+    The runs of the jobs with the same schedule can be spread over a ``jitter`` window,
+    the number of jobs running at the same time can be limited, and late runs (e.g. after
+    a system suspend or a clock jump) are handled according to the ``missed_runs`` policy
+    (see :class:`MissedRunPolicy`). The defaults can be configured through the
+    ``main.cron_scheduler`` section of the configuration file, and overridden on each job:
 
-class CronScheduler(threading.Thread):
-    def __init__(self, jobs):
-        super().__init__()
+    .. code-block:: yaml
+
+        main.cron_scheduler:
+            max_concurrent_jobs: 4
+            # Spread the runs over 30 seconds
+            jitter: 30
+            # skip, run_once or catch_up
+            missed_runs: run_once
+            # Runs more than 60 seconds late are considered missed
+            grace_time: 60
+
+        cron.SyncCalendar:
+            cron_expression: '*/5 * * * *'
+            jitter: 120
+            missed_runs: skip
+            actions:
+                - action: calendar.sync
+
+    """
+
+    # Upper bound for the scheduler sleeps, so the deadlines (wall-clock timestamps)
+    # are re-evaluated if the system clock is adjusted
+    _max_wait = 60.0
+
+    def __init__(self, jobs, max_concurrent_jobs: Optional[int] = None, jitter: Optional[float] = None,
+                 missed_runs: Optional[str] = None, grace_time: Optional[float] = None):
+        """
+        :param jobs: ``name -> job`` map, where each job is either a ``{cron_expression, actions}``
+            dictionary or a function decorated with :func:`platypush.cron.cron`.
+        :param max_concurrent_jobs: Maximum number of jobs running at the same time (default: 16).
+        :param jitter: Default jitter window of the jobs, in seconds (default: 0).
+        :param missed_runs: Default missed runs policy of the jobs (default: ``run_once``).
+        :param grace_time: Default delay, in seconds, after which a run is considered missed (default: 60).
+        """
+        super().__init__(name='CronScheduler')
         self.jobs_config = jobs
-        self._jobs = {}
+        self._jobs: Dict[str, Cronjob] = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
         self._should_stop = threading.Event()
+        self._workers = Dispatcher(pool_size=max_concurrent_jobs, queue_size=0, name='Cronjob')
+        self._job_defaults = {
+            key: value
+            for key, value in (('jitter', jitter), ('missed_runs', missed_runs), ('grace_time', grace_time))
+            if value is not None
+        }
+
+        for (job_name, job_config) in self.jobs_config.items():
+            self.add_job(job_name, job_config)
+
         logger.info('Cron scheduler initialized with {} jobs'.
                     format(len(self.jobs_config.keys())))
 
-    def _get_job(self, name, config):
-        job = self._jobs.get(name)
-        if job and job.state not in [CronjobState.DONE, CronjobState.ERROR]:
-            return job
+    @classmethod
+    def build(cls, jobs, config: Optional[dict] = None) -> 'CronScheduler':
+        """
+        Build the scheduler from a ``main.cron_scheduler`` configuration section.
+        """
+        config = config or {}
+        return cls(jobs, max_concurrent_jobs=config.get('max_concurrent_jobs'), jitter=config.get('jitter'),
+                   missed_runs=config.get('missed_runs'), grace_time=config.get('grace_time'))
 
-        if isinstance(config, dict):
-            self._jobs[name] = Cronjob(name=name, cron_expression=config['cron_expression'],
-                                       actions=config['actions'])
-        elif is_functional_cron(config):
-            self._jobs[name] = Cronjob(name=name, cron_expression=config.cron_expression,
-                                       actions=config)
-        else:
-            raise AssertionError('Expected type dict or function for cron {}, got {}'.format(
-                name, type(config)))
+    def add_job(self, name: str, config) -> Cronjob:
+        """
+        Add a job to the scheduler, or replace the job with the same name.
+
+        :param name: Job name.
+        :param config: Either a ``{cron_expression, actions}`` dictionary or a function decorated
+            with :func:`platypush.cron.cron` (see :meth:`Cronjob.build`).
+        """
+        job = Cronjob.build(name, config, **self._job_defaults)
+        with self._lock:
+            self._jobs[name] = job
+            self._schedule(job)
+
+        return job
+
+    def update_jobs(self, changed: Optional[dict] = None, removed: Optional[Iterable[str]] = None):
+        """
+        Swap the jobs that have changed. The new jobs are built before the swap, and the runs in
+        progress complete on the previous definitions.
+
+        :param changed: ``name -> job configuration`` map of the new and modified jobs.
+        :param removed: Names of the removed jobs.
+        """
+        jobs = [Cronjob.build(name, config, **self._job_defaults) for name, config in (changed or {}).items()]
+        with self._lock:
+            for name in removed or []:
+                self._jobs.pop(name, None)
+
+            for job in jobs:
+                self._jobs[job.name] = job
+                self._schedule(job)
+
+            self._wakeup.notify()
+
+    def remove_job(self, name: str) -> Optional[Cronjob]:
+        """
+        Remove a job from the scheduler. A running instance of the job won't be interrupted,
+        but the job won't be scheduled again.
+        """
+        with self._lock:
+            job = self._jobs.pop(name, None)
+            # The heap entries of the job are discarded when they are popped
+            self._wakeup.notify()
+
+        return job
 
-        return self._jobs[name]
+    def get_jobs(self) -> Dict[str, Cronjob]:
+        with self._lock:
+            return dict(self._jobs)
+
+    def _schedule(self, job: Cronjob):
+        with self._lock:
+            if self._jobs.get(job.name) is not job:
+                return
+
+            next_run = job.get_next_run()
+            heapq.heappush(self._heap, (next_run, next(self._counter), job))
+            self._wakeup.notify()
+
+    def _run_job(self, job: Cronjob):
+        try:
+            if job.should_run(time.time()):
+                job.run()
+        finally:
+            if not self.should_stop():
+                self._schedule(job)
+
+    def _pop_due_jobs(self) -> list:
+        now = time.time()
+        jobs = []
+
+        while self._heap and self._heap[0][0] <= now:
+            next_run, _, job = heapq.heappop(self._heap)
+            # Skip the entries of removed/replaced jobs
+            if self._jobs.get(job.name) is job and job.next_run == next_run:
+                jobs.append(job)
+
+        return jobs
+
+    def get_stats(self) -> dict:
+        """
+        :return: ``job name -> stats`` map, with the scheduling and lateness metrics of the jobs.
+            Times are UNIX timestamps, lateness values are in seconds. Example:
+
+            .. code-block:: json
+
+                {
+                    "SyncCalendar": {
+                        "cron_expression": "*/5 * * * *",
+                        "state": "wait",
+                        "next_run": 1700000372.5,
+                        "last_run": 1700000072.6,
+                        "runs": 12,
+                        "errors": 0,
+                        "missed": 1,
+                        "offset": 72.5,
+                        "last_lateness": 0.1,
+                        "avg_lateness": 0.3,
+                        "max_lateness": 95.2
+                    }
+                }
+
+        """
+        with self._lock:
+            return {name: job.get_stats() for name, job in self._jobs.items()}
 
     def stop(self):
-        for job in self._jobs.values():
-            job.stop()
-        self._should_stop.set()
+        with self._lock:
+            self._should_stop.set()
+            self._wakeup.notify()
+
+        self._workers.stop()
 
     def should_stop(self):
         return self._should_stop.is_set()
@@ -107,12 +373,18 @@ class CronScheduler(threading.Thread):
         logger.info('Running cron scheduler')
 
         while not self.should_stop():
-            for (job_name, job_config) in self.jobs_config.items():
-                job = self._get_job(name=job_name, config=job_config)
-                if job.state == CronjobState.IDLE:
-                    job.start()
+            with self._lock:
+                jobs = self._pop_due_jobs()
+                if not jobs:
+                    timeout = self._max_wait
+                    if self._heap:
+                        timeout = min(max(self._heap[0][0] - time.time(), 0), timeout)
+
+                    self._wakeup.wait(timeout=timeout)
+                    continue
 
-            self._should_stop.wait(timeout=0.5)
+            for job in jobs:
+                self._workers.submit(self._run_job, job)
 
         logger.info('Terminating cron scheduler')
 
@@ -0,0 +1,268 @@
+import enum
+import logging
+import threading
+import time
+
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from platypush.bus.dispatcher import Dispatcher
+from platypush.utils import set_thread_name
+
+logger = logging.getLogger('platypush:event:executor')
+
+
+class ConcurrencyPolicy(enum.Enum):
+    """
+    What the executor should do when a hook is triggered while it's already running
+    ``max_concurrency`` times.
+    """
+    QUEUE = 'queue'       # Run the hook when one of the running instances completes
+    DROP = 'drop'         # Discard the new run
+    REPLACE = 'replace'   # Discard the queued runs: only the latest one will be executed
+
+
+class _HookRun:
+    __slots__ = ('hook', 'event', 'parsed_args', 'queued_at')
+
+    def __init__(self, hook, event, parsed_args: dict):
+        self.hook = hook
+        self.event = event
+        self.parsed_args = parsed_args
+        self.queued_at = time.time()
+
+
+class _HookState:
+    __slots__ = ('running', 'pending', 'runs', 'failed', 'dropped', 'replaced',
+                 'wait_time', 'max_wait_time', 'exec_time', 'max_exec_time')
+
+    def __init__(self):
+        self.running = 0
+        self.pending = deque()
+        self.runs = 0
+        self.failed = 0
+        self.dropped = 0
+        self.replaced = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.exec_time = 0.0
+        self.max_exec_time = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'running': self.running,
+            'pending': len(self.pending),
+            'runs': self.runs,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'replaced': self.replaced,
+            'avg_wait_time': self.wait_time / self.runs if self.runs else 0.0,
+            'max_wait_time': self.max_wait_time,
+            'avg_exec_time': self.exec_time / self.runs if self.runs else 0.0,
+            'max_exec_time': self.max_exec_time,
+        }
+
+
+class HookExecutor:
+    """
+    Runs the actions of the matched event hooks, and the event handlers registered on the
+    event generators, on a shared pool of workers instead of a new thread per run.
+
+    The number of concurrent runs of a hook can be limited through its ``max_concurrency``,
+    and its ``concurrency_policy`` (``queue``, ``drop`` or ``replace``) decides what happens
+    when the hook is triggered while it's already running that many times - e.g. a flapping
+    motion sensor won't spawn hundreds of runs of the same hook:
+
+    .. code-block:: yaml
+
+        event.hook.OnMotionDetected:
+            if:
+                type: platypush.message.event.sensor.SensorDataChangeEvent
+                motion: true
+            then:
+                action: camera.capture_image
+            # At most one run at the time, and only the latest trigger is queued
+            max_concurrency: 1
+            concurrency_policy: replace
+
+    The executor itself can be configured through the ``main.hook_executor`` section of the
+    configuration file:
+
+    .. code-block:: yaml
+
+        main.hook_executor:
+            # Number of worker threads
+            pool_size: 16
+            # Default limits for the hooks that don't specify them
+            max_concurrency: 4
+            concurrency_policy: queue
+
+    """
+
+    _DEFAULT_POOL_SIZE = 16
+
+    def __init__(self, pool_size: Optional[int] = None, queue_size: Optional[int] = None,
+                 overflow_policy: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 concurrency_policy: Optional[str] = None):
+        """
+        :param pool_size: Number of worker threads (default: 16).
+        :param queue_size: Maximum number of runs queued on the workers, 0 for unbounded (default: 1000).
+        :param overflow_policy: Policy applied when the workers queue is full (see
+            :class:`platypush.bus.dispatcher.Dispatcher`).
+        :param max_concurrency: Default maximum number of concurrent runs of a hook (default: unlimited).
+        :param concurrency_policy: Default policy applied when a hook reaches its maximum concurrency -
+            ``queue`` (default), ``drop`` or ``replace``.
+        """
+        self.dispatcher = Dispatcher(pool_size=pool_size or self._DEFAULT_POOL_SIZE, queue_size=queue_size,
+                                     overflow_policy=overflow_policy, name='HookExecutor')
+        self.max_concurrency = int(max_concurrency) if max_concurrency else None
+        self.concurrency_policy = ConcurrencyPolicy(concurrency_policy or ConcurrencyPolicy.QUEUE.value)
+        self._states: Dict[str, _HookState] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, config: Optional[dict] = None) -> 'HookExecutor':
+        """
+        Build the executor from a ``main.hook_executor`` configuration section.
+        """
+        config = config or {}
+        return cls(pool_size=config.get('pool_size'), queue_size=config.get('queue_size'),
+                   overflow_policy=config.get('overflow_policy'), max_concurrency=config.get('max_concurrency'),
+                   concurrency_policy=config.get('concurrency_policy'))
+
+    def submit(self, hook, event, parsed_args: Optional[dict] = None) -> bool:
+        """
+        Schedule the execution of the actions of a hook.
+
+        :param hook: The :class:`platypush.event.hook.EventHook` to run.
+        :param event: The event that triggered the hook.
+        :param parsed_args: Arguments parsed from the event by the hook condition.
+        :return: True if the run was scheduled or queued, False if it was dropped.
+        """
+        run = _HookRun(hook, event, parsed_args or {})
+        max_concurrency = getattr(hook, 'max_concurrency', None) or self.max_concurrency
+        policy = getattr(hook, 'concurrency_policy', None) or self.concurrency_policy
+
+        with self._lock:
+            state = self._states.get(hook.name)
+            if not state:
+                state = self._states[hook.name] = _HookState()
+
+            if max_concurrency and state.running >= max_concurrency:
+                if policy == ConcurrencyPolicy.DROP:
+                    state.dropped += 1
+                    logger.info('Hook {} is already running {} times: run dropped'.format(
+                        hook.name, state.running))
+                    return False
+
+                if policy == ConcurrencyPolicy.REPLACE:
+                    state.replaced += len(state.pending)
+                    state.pending.clear()
+
+                state.pending.append(run)
+                return True
+
+            state.running += 1
+
+        return self._dispatch(run, state)
+
+    def submit_handler(self, handler: Callable, event):
+        """
+        Schedule the execution of an event handler callback.
+        """
+        self.dispatcher.submit(handler, event)
+
+    def _run(self, run: _HookRun, state: _HookState):
+        while run:
+            self._execute(run, state)
+
+            with self._lock:
+                # The slot is handed over to the next queued run, if any, that is executed on the
+                # same worker: submitting it to the pool from one of its workers could block on
+                # a full queue
+                run = state.pending.popleft() if state.pending else None
+                if not run:
+                    state.running -= 1
+
+    def _execute(self, run: _HookRun, state: _HookState):
+        set_thread_name('Event-' + run.hook.name)
+        started_at = time.time()
+        failed = False
+
+        try:
+            run.hook.execute(run.event, **run.parsed_args)
+        except Exception as e:
+            failed = True
+            logger.warning('Error while running hook {}: {}'.format(run.hook.name, str(e)))
+            logger.exception(e)
+        finally:
+            finished_at = time.time()
+            with self._lock:
+                wait_time = started_at - run.queued_at
+                exec_time = finished_at - started_at
+                state.runs += 1
+                state.failed += int(failed)
+                state.wait_time += wait_time
+                state.max_wait_time = max(state.max_wait_time, wait_time)
+                state.exec_time += exec_time
+                state.max_exec_time = max(state.max_exec_time, exec_time)
+
+    def _dispatch(self, run: _HookRun, state: _HookState) -> bool:
+        submitted = False
+        try:
+            submitted = self.dispatcher.submit(self._run, run, state)
+        finally:
+            if not submitted:
+                # The run was rejected by the workers: release its slot
+                with self._lock:
+                    state.dropped += 1
+                    state.running -= 1
+
+        return submitted
+
+    def get_stats(self, hook: Optional[str] = None) -> dict:
+        """
+        :param hook: [Optional] hook name (default: all the hooks that have been triggered).
+        :return: The counters of the workers and the ``hook name -> stats`` map. Times are in seconds.
+            Example:
+
+            .. code-block:: json
+
+                {
+                    "executor": {
+                        "pool_size": 16,
+                        "queue_depth": 0,
+                        "active": 1,
+                        "...": "..."
+                    },
+                    "hooks": {
+                        "OnMotionDetected": {
+                            "running": 1,
+                            "pending": 1,
+                            "runs": 120,
+                            "failed": 0,
+                            "dropped": 0,
+                            "replaced": 37,
+                            "avg_wait_time": 0.35,
+                            "max_wait_time": 1.2,
+                            "avg_exec_time": 0.8,
+                            "max_exec_time": 1.5
+                        }
+                    }
+                }
+
+        """
+        with self._lock:
+            hooks = {
+                name: state.to_dict()
+                for name, state in self._states.items()
+                if not hook or name == hook
+            }
+
+        return {
+            'executor': self.dispatcher.get_stats(),
+            'hooks': hooks,
+        }
+
+
+# vim:sw=4:ts=4:et:
@@ -1,15 +1,16 @@
 import copy
 import json
 import logging
-import threading
 from functools import wraps
 
 from platypush.common import exec_wrapper
 from platypush.config import Config
-from platypush.message.event import Event
+from platypush.context import get_hook_executor
+from platypush.event.executor import ConcurrencyPolicy
+from platypush.message.event import Event, PhraseMatcher
 from platypush.message.request import Request
 from platypush.procedure import Procedure
-from platypush.utils import get_event_class_by_type, set_thread_name, is_functional_hook
+from platypush.utils import get_event_class_by_type, is_functional_hook
 
 logger = logging.getLogger('platypush')
 
@@ -53,6 +54,13 @@ class EventCondition(object):
             # e.g. or conditions, in, and other operators.
             self.args[key] = value
 
+        # String values are matched through phrase matchers compiled once per condition
+        self.matchers = {
+            key: PhraseMatcher.compile(value)
+            for key, value in self.args.items()
+            if isinstance(value, str)
+        }
+
     @classmethod
     def build(cls, rule):
         """ Builds a rule given either another EventRule, a dictionary or
@@ -103,18 +111,26 @@ class EventHook(object):
     """ Event hook class. It consists of one conditions and
         one or multiple actions to be executed """
 
-    def __init__(self, name, priority=None, condition=None, actions=None):
+    def __init__(self, name, priority=None, condition=None, actions=None, max_concurrency=None,
+                 concurrency_policy=None):
         """ Constructor. Takes a name, a EventCondition object and an event action
             procedure as input. It may also have a priority attached
             as a positive number. If multiple hooks match against an event,
             only the ones that have either the maximum match score or the
-            maximum pre-configured priority will be run. """
+            maximum pre-configured priority will be run.
+
+            The number of concurrent runs of the hook can be limited through
+            max_concurrency, and concurrency_policy (queue, drop or replace)
+            sets what happens when the hook is triggered while it's already
+            running that many times (see :class:`platypush.event.executor.HookExecutor`). """
 
         self.name = name
         self.condition = EventCondition.build(condition or {})
         self.actions = actions or []
         self.priority = priority or 0
         self.condition.priority = self.priority
+        self.max_concurrency = int(max_concurrency) if max_concurrency else None
+        self.concurrency_policy = ConcurrencyPolicy(concurrency_policy) if concurrency_policy else None
 
     @classmethod
     def build(cls, name, hook):
@@ -143,7 +159,8 @@ class EventHook(object):
                 actions = [hook['then']]
 
         actions = Procedure.build(name=name + '__Hook', requests=actions, _async=False)
-        return cls(name=name, condition=condition, actions=actions, priority=priority)
+        return cls(name=name, condition=condition, actions=actions, priority=priority,
+                   max_concurrency=hook.get('max_concurrency'), concurrency_policy=hook.get('concurrency_policy'))
 
     def matches_event(self, event):
         """ Returns an EventMatchResult object containing the information
@@ -151,19 +168,22 @@ class EventHook(object):
 
         return event.matches_condition(self.condition)
 
-    def run(self, event):
-        """ Checks the condition of the hook against a particular event and
-            runs the hook actions if the condition is met """
+    def execute(self, event, **parsed_args):
+        """ Runs the hook actions on the current thread """
+
+        return self.actions.execute(event=event, **parsed_args)
 
-        def _thread_func(result):
-            set_thread_name('Event-' + self.name)
-            self.actions.execute(event=event, **result.parsed_args)
+    def run(self, event, result=None):
+        """ Checks the condition of the hook against a particular event (unless
+            the match result is provided) and schedules the hook actions on the
+            shared hook executor if the condition is met """
 
-        result = self.matches_event(event)
+        if result is None:
+            result = self.matches_event(event)
 
         if result.is_match:
             logger.info('Running hook {} triggered by an event'.format(self.name))
-            threading.Thread(target=_thread_func, name='Event-' + self.name, args=(result,)).start()
+            get_hook_executor().submit(self, event, result.parsed_args)
 
 
 def hook(event_type=Event, **condition):
@@ -1,9 +1,12 @@
 import sys
+from typing import Any, Dict, Iterable, Optional
 
 from ..hook import EventHook
 
 from platypush.config import Config
-from platypush.context import get_backend
+from platypush.context import get_backend, get_dispatcher
+from platypush.event.processor.coalescer import EventCoalescer
+from platypush.event.processor.index import HookIndex
 from platypush.message.event import Event
 
 
@@ -25,6 +28,30 @@ class EventProcessor(object):
             h = EventHook.build(name=name, hook=hook)
             self.hooks.append(h)
 
+        self.index = HookIndex(self.hooks)
+        self.coalescer = EventCoalescer.build(Config.get('main.event_coalescing'),
+                                              on_event=self._on_coalesced_event)
+
+    def reload_hooks(self, changed: Optional[Dict[str, Any]] = None, removed: Optional[Iterable[str]] = None):
+        """
+        Swap the hooks that have changed. The new hooks are built before the swap, so the events
+        are processed either against the previous hooks or against the new ones, and the runs in
+        progress complete on the previous definitions.
+
+        :param changed: ``name -> hook configuration`` map of the new and modified hooks.
+        :param removed: Names of the removed hooks.
+        """
+        changed = changed or {}
+        removed = set(removed or [])
+        new_hooks = [EventHook.build(name=name, hook=hook) for name, hook in changed.items()]
+        hooks = [
+            hook for hook in self.hooks
+            if hook.name not in changed and hook.name not in removed
+        ] + new_hooks
+
+        self.hooks = hooks
+        self.index = HookIndex(hooks)
+
     @staticmethod
     def notify_web_clients(event):
         backends = Config.get_backends()
@@ -39,20 +66,31 @@ class EventProcessor(object):
         if backend:
             backend.notify_web_clients(event)
 
+    def _on_coalesced_event(self, event: Event):
+        get_dispatcher().submit(self._process_event, event)
+
     def process_event(self, event: Event):
-        """ Processes an event and runs the matched hooks with the highest score """
+        """
+        Processes an event and runs the matched hooks with the highest score. High-frequency
+        events may be coalesced first, see :class:`platypush.event.processor.coalescer.EventCoalescer`.
+        """
+        if self.coalescer.coalesce(event):
+            self._process_event(event)
 
+    def _process_event(self, event: Event):
         if not event.disable_web_clients_notification:
             self.notify_web_clients(event)
 
         matched_hooks = set()
         priority_hooks = set()
+        matches = {}
         max_score = -sys.maxsize
         max_priority = 0
 
-        for hook in self.hooks:
+        for hook in self.index.get_candidates(event):
             match = hook.matches_event(event)
             if match.is_match:
+                matches[hook] = match
                 if match.score > max_score:
                     matched_hooks = {hook}
                     max_score = match.score
@@ -67,7 +105,7 @@ class EventProcessor(object):
 
         matched_hooks.update(priority_hooks)
         for hook in matched_hooks:
-            hook.run(event)
+            hook.run(event, result=matches[hook])
 
 
 # vim:sw=4:ts=4:et:
@@ -0,0 +1,215 @@
+import enum
+import heapq
+import logging
+import threading
+import time
+
+from typing import Callable, Dict, Iterable, Optional
+
+from platypush.message.event import Event
+
+logger = logging.getLogger('platypush:event:coalescer')
+
+
+class CoalescingMode(enum.Enum):
+    """
+    How the events received within the same window are coalesced.
+    """
+    LATEST = 'latest'   # Only the latest event of the window is processed
+    MERGE = 'merge'     # The arguments of the events of the window are merged, the latest ones win
+
+
+class _CoalescingRule:
+    __slots__ = ('window', 'key', 'mode')
+
+    def __init__(self, window: float, key: Optional[Iterable[str]] = None, mode: Optional[str] = None):
+        self.window = float(window)
+        self.key = tuple(key or ())
+        self.mode = CoalescingMode(mode or CoalescingMode.LATEST.value)
+        assert self.window > 0, 'The coalescing window should be a positive number of seconds'
+
+
+class _Window:
+    __slots__ = ('expires_at', 'pending')
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.pending: Optional[Event] = None
+
+
+class EventCoalescer:
+    """
+    Coalescing stage for high-frequency events, applied before the events are matched
+    against the hooks and forwarded to the web clients.
+
+    The first event received for a key is processed immediately, and it opens a window.
+    The events with the same key received within the window are coalesced, and the result
+    is processed when the window expires (which opens a new window). Therefore at most one
+    event per key is processed in each window, and the last state is never lost.
+
+    The key of an event is its type plus the values of the configured ``key`` arguments
+    (e.g. ``source`` for sensor events, or ``device`` and ``axis`` for joystick events).
+
+    Coalescing rules are configured per event type, and they also apply to the subclasses
+    of the configured types:
+
+    .. code-block:: yaml
+
+        main.event_coalescing:
+            platypush.message.event.sensor.SensorDataChangeEvent:
+                # Window length in seconds
+                window: 0.5
+                # Event arguments that identify the key of the event
+                key:
+                    - source
+                # latest (default): only the latest event of the window is processed.
+                # merge: the arguments of the events of the window are merged.
+                mode: merge
+
+            platypush.message.event.joystick.JoystickAxisEvent:
+                window: 0.1
+                key:
+                    - device
+                    - axis
+
+    """
+
+    def __init__(self, rules: Optional[Dict[str, dict]] = None, on_event: Optional[Callable[[Event], None]] = None):
+        """
+        :param rules: ``fully qualified event type -> rule`` map, where each rule has a ``window``,
+            and optionally ``key`` and ``mode`` attributes.
+        :param on_event: Callback invoked with the coalesced events when their window expires.
+        """
+        self.rules = {
+            event_type: _CoalescingRule(**rule)
+            for event_type, rule in (rules or {}).items()
+        }
+
+        self.on_event = on_event
+        self._rules_by_type = {}
+        self._windows: Dict[tuple, _Window] = {}
+        self._deadlines = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    @classmethod
+    def build(cls, config: Optional[dict] = None, on_event: Optional[Callable[[Event], None]] = None) \
+            -> 'EventCoalescer':
+        """
+        Build the coalescer from a ``main.event_coalescing`` configuration section.
+        """
+        return cls(rules=config, on_event=on_event)
+
+    def _get_rule(self, event: Event) -> Optional[_CoalescingRule]:
+        event_type = type(event)
+        if event_type in self._rules_by_type:
+            return self._rules_by_type[event_type]
+
+        rule = None
+        for cls in event_type.__mro__:
+            rule = self.rules.get('{}.{}'.format(cls.__module__, cls.__name__))
+            if rule:
+                break
+
+        self._rules_by_type[event_type] = rule
+        return rule
+
+    @staticmethod
+    def _get_key(event: Event, rule: _CoalescingRule) -> tuple:
+        values = []
+        for attr in rule.key:
+            value = event.args.get(attr)
+            try:
+                hash(value)
+            except TypeError:
+                value = str(value)
+            values.append(value)
+
+        return (type(event), *values)
+
+    @staticmethod
+    def _merge(pending: Event, event: Event) -> Event:
+        # The events may be frozen and shared with other consumers: build a new one
+        merged = event.to_dict()
+        merged['args'] = {**pending.to_dict()['args'], **merged['args']}
+        return Event.build(merged)
+
+    def coalesce(self, event: Event) -> bool:
+        """
+        Pass an event through the coalescing stage.
+
+        :return: True if the event should be processed now, False if it has been coalesced
+            and its window will be processed later.
+        """
+        rule = self._get_rule(event) if self.rules else None
+        if not rule:
+            return True
+
+        key = self._get_key(event, rule)
+        now = time.time()
+
+        with self._lock:
+            window = self._windows.get(key)
+            if not window:
+                window = self._windows[key] = _Window(expires_at=now + rule.window)
+                heapq.heappush(self._deadlines, (window.expires_at, id(window), key))
+                self._wakeup.notify()
+                self._start()
+                return True
+
+            if window.pending and rule.mode == CoalescingMode.MERGE:
+                window.pending = self._merge(window.pending, event)
+            else:
+                window.pending = event
+
+            return False
+
+    def _start(self):
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run, name='EventCoalescer', daemon=True)
+            self._thread.start()
+
+    def _expire(self) -> list:
+        """
+        Close the expired windows, and return their pending events.
+        """
+        now = time.time()
+        events = []
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, key = heapq.heappop(self._deadlines)
+            window = self._windows.get(key)
+            if not window:
+                continue
+
+            if not window.pending:
+                del self._windows[key]
+                continue
+
+            # The pending event is processed, and it opens a new window
+            events.append(window.pending)
+            window.pending = None
+            window.expires_at = now + self._get_rule(events[-1]).window
+            heapq.heappush(self._deadlines, (window.expires_at, id(window), key))
+
+        return events
+
+    def _run(self):
+        while True:
+            with self._lock:
+                events = self._expire()
+                if not events:
+                    timeout = self._deadlines[0][0] - time.time() if self._deadlines else None
+                    self._wakeup.wait(timeout)
+                    continue
+
+            for event in events:
+                try:
+                    self.on_event(event)
+                except Exception as e:
+                    logger.warning('Error while processing coalesced event {}: {}'.format(event, str(e)))
+                    logger.exception(e)
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,111 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from platypush.message.event import Event, PhraseMatcher
+
+
+class _IndexedHook:
+    """
+    A hook with the pre-computed checks used to discard it without evaluating its condition.
+    """
+
+    __slots__ = ('hook', 'checks')
+
+    def __init__(self, hook):
+        self.hook = hook
+        # (argument name, condition value, lowercase literal tokens or None)
+        self.checks: List[Tuple[str, object, Optional[Tuple[str, ...]]]] = []
+
+        matchers = getattr(hook.condition, 'matchers', {})
+        for attr, value in hook.condition.args.items():
+            tokens = None
+            if isinstance(value, str):
+                # Literal tokens (no regular expressions nor ${} placeholders) must be contained in
+                # the value of the argument: they either match a token or a part of it
+                matcher = matchers.get(attr) or PhraseMatcher.compile(value)
+                tokens = tuple(matcher.literals)
+
+            self.checks.append((attr, value, tokens))
+
+    def may_match(self, args: dict, lowercase_args: dict) -> bool:
+        """
+        :return: False if the hook certainly doesn't match an event with these arguments,
+            True if its condition should be evaluated.
+        """
+        try:
+            for attr, value, tokens in self.checks:
+                if attr not in args:
+                    return False
+
+                arg = args[attr]
+                if isinstance(arg, str):
+                    if not tokens:
+                        continue
+
+                    if attr not in lowercase_args:
+                        lowercase_args[attr] = arg.lower()
+                    if any(token not in lowercase_args[attr] for token in tokens):
+                        return False
+                elif arg != value:
+                    return False
+        except Exception:
+            # Let the hook evaluate the condition, and handle the errors
+            return True
+
+        return True
+
+
+class HookIndex:
+    """
+    Index of the event hooks, used to evaluate only the conditions of the hooks that may match
+    an event:
+
+        - Hooks are indexed by event class, and the hooks for an event are the ones registered
+          on any of the classes in its MRO (the list is computed once per event class).
+
+        - The arguments of the conditions are pre-processed, so the hooks whose conditions
+          certainly don't match the event are discarded through cheap checks: missing arguments,
+          different non-string values, or literal tokens that don't appear in string values.
+          String values are matched through fuzzy token matching (see
+          :class:`platypush.message.event.PhraseMatcher`), therefore their literal tokens are
+          only checked for containment.
+
+    Event classes that override the matching logic with different semantics should set
+    ``prefilter_conditions = False``: their hooks are only indexed by class.
+    """
+
+    def __init__(self, hooks: Iterable = ()):
+        self._hooks_by_type: Dict[type, List[_IndexedHook]] = {}
+        self._hooks_by_event_type: Dict[type, List[_IndexedHook]] = {}
+
+        for hook in hooks:
+            self._hooks_by_type.setdefault(hook.condition.type, []).append(_IndexedHook(hook))
+
+    def _get_hooks(self, event_type: type) -> List[_IndexedHook]:
+        hooks = self._hooks_by_event_type.get(event_type)
+        if hooks is None:
+            hooks = [
+                indexed_hook
+                for cls in event_type.__mro__
+                for indexed_hook in self._hooks_by_type.get(cls, [])
+            ]
+
+            self._hooks_by_event_type[event_type] = hooks
+
+        return hooks
+
+    def get_candidates(self, event: Event) -> list:
+        """
+        :return: The hooks whose condition may match the event.
+        """
+        hooks = self._get_hooks(type(event))
+        if not getattr(event, 'prefilter_conditions', True):
+            return [indexed_hook.hook for indexed_hook in hooks]
+
+        lowercase_args = {}
+        return [
+            indexed_hook.hook for indexed_hook in hooks
+            if indexed_hook.may_match(event.args, lowercase_args)
+        ]
+
+
+# vim:sw=4:ts=4:et:
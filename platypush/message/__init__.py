@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
+import copy
 import datetime
 import logging
 import inspect
 import json
 import time
-from typing import Union
+from typing import Callable, Optional, Union
 
 logger = logging.getLogger('platypush')
 
@@ -19,9 +20,20 @@ class JSONAble(ABC):
         raise NotImplementedError()
 
 
+class FrozenMessageError(AttributeError):
+    """
+    Raised when trying to change an attribute of a message that has been frozen (see :meth:`Message.freeze`).
+    """
+
+
 class Message(object):
     """ Message generic class """
 
+    # Attributes that are not part of the serialized representation of the
+    # message, and that should be reset when a message is delivered without
+    # being serialized.
+    _transient_attrs = ()
+
     class Encoder(json.JSONEncoder):
         @staticmethod
         def parse_numpy(obj):
@@ -72,25 +84,104 @@ class Message(object):
     def __init__(self, timestamp=None, *args, **kwargs):
         self.timestamp = timestamp or time.time()
 
-    def __str__(self):
+    def __setattr__(self, key, value):
+        if self.__dict__.get('_frozen'):
+            raise FrozenMessageError('Cannot set {} on a frozen {}'.format(key, self.__class__.__name__))
+
+        self.__dict__.pop('_serialized', None)
+        super().__setattr__(key, value)
+
+    def invalidate_cache(self):
         """
-        Overrides the str() operator and converts
-        the message into a UTF-8 JSON string
+        Drop the memoized serialized representations of the message. They are
+        computed once and reused by the bus, the logs and the web clients, and
+        they are automatically invalidated when an attribute is set. This method
+        should be called after changing a nested attribute in place (e.g.
+        ``msg.args['key'] = value``) on a message that has already been serialized.
+        """
+        self.__dict__.pop('_serialized', None)
+
+    def _get_serialized(self, fmt: str, serializer: Callable[[], Union[str, bytes]]) -> Union[str, bytes]:
+        cache = self.__dict__.get('_serialized')
+        if cache is None:
+            cache = self.__dict__['_serialized'] = {}
+
+        value = cache.get(fmt)
+        if value is None:
+            value = cache[fmt] = serializer()
+        return value
+
+    def freeze(self):
         """
+        Mark the message as immutable. It's done when a message is posted on a
+        bus that delivers it by reference to local consumers, so the same object
+        can be safely shared among them. Any further attribute assignment will
+        raise a :class:`FrozenMessageError`.
+        """
+        self.__dict__['_frozen'] = True
+        return self
+
+    def is_frozen(self) -> bool:
+        return self.__dict__.get('_frozen', False)
 
-        return json.dumps({
+    def local_copy(self):
+        """
+        :return: A frozen shallow copy of this message that can be delivered to local
+            consumers without being serialized. The producer can still change its own
+            object after posting it. The transient attributes are reset, so local
+            consumers see the same message as remote consumers would.
+        """
+        msg = copy.copy(self)
+        if any(getattr(self, attr, None) is not None for attr in self._transient_attrs):
+            msg.__dict__.pop('_serialized', None)
+            for attr in self._transient_attrs:
+                msg.__dict__[attr] = None
+        elif '_serialized' in msg.__dict__:
+            # Don't share the memoized representations with the original message
+            msg.__dict__['_serialized'] = dict(msg.__dict__['_serialized'])
+
+        return msg.freeze()
+
+    def to_dict(self) -> dict:
+        """
+        :return: The dictionary representation of the message, as it will be serialized.
+        """
+        return {
             attr: getattr(self, attr)
             for attr in self.__dir__()
             if (attr != '_timestamp' or not attr.startswith('_'))
+            and attr not in ('_frozen', '_serialized')
             and not inspect.ismethod(getattr(self, attr))
-        }, cls=self.Encoder).replace('\n', ' ')
+        }
+
+    def __str__(self):
+        """
+        Overrides the str() operator and converts
+        the message into a UTF-8 JSON string
+        """
+
+        return self._get_serialized(
+            'str', lambda: json.dumps(self.to_dict(), cls=self.Encoder).replace('\n', ' '))
 
     def __bytes__(self):
         """
         Overrides the bytes() operator, converts the message into
         its JSON-serialized UTF-8-encoded representation
         """
-        return str(self).encode('utf-8')
+        return self._get_serialized('json', lambda: str(self).encode('utf-8'))
+
+    def serialize(self, codec: Optional[str] = None) -> bytes:
+        """
+        Serialize the message through a codec. The result is memoized until the
+        message is changed (see :meth:`invalidate_cache`).
+
+        :param codec: Name of the codec - see :mod:`platypush.message.codec` (default: ``json``).
+        """
+        from platypush.message.codec import JsonCodec, get_codec
+
+        if not codec or codec == JsonCodec.name:
+            return bytes(self)
+        return self._get_serialized(codec, lambda: get_codec(codec).encode(self.to_dict()))
 
     @classmethod
     def parse(cls, msg):
@@ -99,15 +190,15 @@ class Message(object):
         Params:
             msg -- Original message - can be a dictionary, a Message,
                    or a string/bytearray, as long as it's valid UTF-8 JSON
+                   or a payload serialized through one of the supported codecs
         """
+        from platypush.message.codec import decode
 
         if isinstance(msg, cls):
             msg = str(msg)
-        if isinstance(msg, bytes) or isinstance(msg, bytearray):
-            msg = msg.decode('utf-8')
-        if isinstance(msg, str):
+        if isinstance(msg, bytes) or isinstance(msg, bytearray) or isinstance(msg, str):
             try:
-                msg = json.loads(msg.strip())
+                msg = decode(msg)
             except (ValueError, TypeError):
                 logger.warning('Invalid JSON message: {}'.format(msg))
 
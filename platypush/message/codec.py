@@ -0,0 +1,151 @@
+import json
+import logging
+
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Union
+
+from platypush.message import Message
+
+logger = logging.getLogger('platypush:message:codec')
+
+
+class Codec(ABC):
+    """
+    Base class for message codecs. A codec converts the dictionary representation
+    of a message (see :meth:`platypush.message.Message.to_dict`) to bytes and back.
+
+    Codecs that don't produce JSON prepend a format marker to their payload
+    (``\\x00<codec name>\\x00``), so a node can always tell the format of a message
+    it receives, regardless of the codec it's configured to send messages with.
+    Payloads with no marker are always parsed as JSON.
+    """
+
+    name = None
+    marker = b''
+
+    @abstractmethod
+    def dumps(self, obj: dict) -> bytes:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def loads(self, data: bytes) -> dict:
+        raise NotImplementedError()
+
+    def encode(self, obj: dict) -> bytes:
+        return self.marker + self.dumps(obj)
+
+    @staticmethod
+    def _default(obj):
+        """
+        Fallback serializer for the types not natively supported by a codec, it
+        applies the same conversions as :class:`platypush.message.Message.Encoder`.
+        """
+        return Message.Encoder().default(obj)
+
+
+class JsonCodec(Codec):
+    """
+    Default codec - plain UTF-8 JSON.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj: dict) -> bytes:
+        return json.dumps(obj, cls=Message.Encoder).encode('utf-8')
+
+    def loads(self, data: bytes) -> dict:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    JSON codec based on `orjson <https://github.com/ijl/orjson>`_. It produces
+    plain JSON, therefore it interoperates with the nodes that use the default codec.
+
+    Requires:
+
+        * **orjson** (``pip install orjson``)
+
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj: dict) -> bytes:
+        return self._orjson.dumps(obj, default=self._default,
+                                  option=self._orjson.OPT_SERIALIZE_NUMPY | self._orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: bytes) -> dict:
+        return self._orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """
+    Binary codec based on `MessagePack <https://msgpack.org>`_.
+
+    Requires:
+
+        * **msgpack** (``pip install msgpack``)
+
+    """
+
+    name = 'msgpack'
+    marker = b'\x00msgpack\x00'
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, obj: dict) -> bytes:
+        return self._msgpack.packb(obj, default=self._default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> dict:
+        return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+_codec_classes = {
+    codec.name: codec
+    for codec in [JsonCodec, OrjsonCodec, MsgpackCodec]
+}
+
+_codecs: Dict[str, Codec] = {}
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """
+    Get a codec by name (``json``, ``orjson`` or ``msgpack``).
+
+    :param name: Codec name (default: ``json``).
+    """
+    name = name or JsonCodec.name
+    codec = _codecs.get(name)
+    if codec:
+        return codec
+
+    assert name in _codec_classes, 'Unsupported message codec: {}. Supported codecs: {}'.format(
+        name, list(_codec_classes.keys()))
+
+    codec = _codecs[name] = _codec_classes[name]()
+    return codec
+
+
+def decode(data: Union[bytes, bytearray, str]) -> dict:
+    """
+    Decode a serialized message into a dictionary, using the codec identified by its
+    format marker, or JSON if the message has no marker.
+    """
+    if isinstance(data, str):
+        return json.loads(data.strip())
+
+    data = bytes(data)
+    if data.startswith(b'\x00'):
+        end = data.index(b'\x00', 1)
+        return get_codec(data[1:end].decode()).loads(data[end + 1:])
+
+    return json.loads(data.decode('utf-8').strip())
+
+
+# vim:sw=4:ts=4:et:
@@ -1,11 +1,8 @@
-import copy
-import json
+import functools
 import random
 import re
 import time
 
-from datetime import date
-
 from platypush.config import Config
 from platypush.message import Message
 from platypush.utils import get_event_class_by_type
@@ -14,6 +11,16 @@ from platypush.utils import get_event_class_by_type
 class Event(Message):
     """ Event message class """
 
+    # Bus lane of the events of this type (see :class:`platypush.bus.lanes.PriorityLanes`).
+    # High-frequency events should use the ``background`` lane, so they can't delay
+    # the processing of requests and other events.
+    priority = 'event'
+
+    # Whether the hook conditions on these events can be discarded through cheap checks on
+    # the arguments before being evaluated (see :class:`platypush.event.processor.index.HookIndex`).
+    # Events that override :meth:`.matches_condition` with different semantics should disable it.
+    prefilter_conditions = True
+
     # If this class property is set to false then the logging of these events
     # will be disabled. Logging is usually disabled for events with a very
     # high frequency that would otherwise pollute the logs e.g. camera capture
@@ -72,18 +79,23 @@ class Event(Message):
         :param condition: The platypush.event.hook.EventCondition object
         """
 
-        result = EventMatchResult(is_match=False, parsed_args=self.args)
+        result = EventMatchResult(is_match=False, parsed_args={**self.args})
         match_scores = []
 
         if not isinstance(self, condition.type):
             return result
 
+        matchers = getattr(condition, 'matchers', {})
         for (attr, value) in condition.args.items():
             if attr not in self.args:
                 return result
 
             if isinstance(self.args[attr], str):
-                arg_result = self._matches_argument(argname=attr, condition_value=value)
+                matcher = matchers.get(attr)
+                if matcher:
+                    arg_result = matcher.match(self.args[attr])
+                else:
+                    arg_result = self._matches_argument(argname=attr, condition_value=value)
 
                 if arg_result.is_match:
                     match_scores.append(arg_result.score)
@@ -118,61 +130,10 @@ class Event(Message):
               will return EventMatchResult(is_match=False, parsed_args={})
         """
 
-        result = EventMatchResult(is_match=False)
-        event_tokens = re.split(r'\s+', self.args[argname].strip().lower())
-        condition_tokens = re.split(r'\s+', condition_value.strip().lower())
-
-        while event_tokens and condition_tokens:
-            event_token = event_tokens[0]
-            condition_token = condition_tokens[0]
-
-            if event_token == condition_token:
-                event_tokens.pop(0)
-                condition_tokens.pop(0)
-                result.score += 1.5
-            elif re.search(condition_token, event_token):
-                m = re.search('({})'.format(condition_token), event_token)
-                if m.group(1):
-                    event_tokens.pop(0)
-                    result.score += 1.25
-
-                condition_tokens.pop(0)
-            else:
-                m = re.match(r'[^\\]*\${(.+?)}', condition_token)
-                if m:
-                    argname = m.group(1)
-                    if argname not in result.parsed_args:
-                        result.parsed_args[argname] = event_token
-                        result.score += 1.0
-                    else:
-                        result.parsed_args[argname] += ' ' + event_token
-
-                    if (len(condition_tokens) == 1 and len(event_tokens) == 1) \
-                            or (len(event_tokens) > 1 and len(condition_tokens) > 1
-                                and event_tokens[1] == condition_tokens[1]):
-                        # Stop appending tokens to this argument, as the next
-                        # condition will be satisfied as well
-                        condition_tokens.pop(0)
-
-                    event_tokens.pop(0)
-                else:
-                    result.score -= 1.0
-                    event_tokens.pop(0)
-
-        # It's a match if all the tokens in the condition string have been satisfied
-        result.is_match = len(condition_tokens) == 0
-        return result
-
-    def __str__(self):
-        """
-        Overrides the str() operator and converts
-        the message into a UTF-8 JSON string
-        """
-
-        args = copy.deepcopy(self.args)
-        flatten(args)
+        return PhraseMatcher.compile(condition_value).match(self.args[argname])
 
-        return json.dumps({
+    def to_dict(self) -> dict:
+        return {
             'type': 'event',
             'target': self.target,
             'origin': self.origin if hasattr(self, 'origin') else None,
@@ -180,9 +141,9 @@ class Event(Message):
             '_timestamp': self.timestamp,
             'args': {
                 'type': self.type,
-                **args
+                **self.args
             },
-        }, cls=self.Encoder)
+        }
 
 
 class EventMatchResult(object):
@@ -198,18 +159,108 @@ class EventMatchResult(object):
         self.parsed_args = {} if not parsed_args else parsed_args
 
 
-def flatten(args):
-    if isinstance(args, dict):
-        for (key, value) in args.items():
-            if isinstance(value, date):
-                args[key] = value.isoformat()
-            elif isinstance(value, dict) or isinstance(value, list):
-                flatten(args[key])
-    elif isinstance(args, list):
-        for i in range(0, len(args)):
-            if isinstance(args[i], date):
-                args[i] = args[i].isoformat()
-            elif isinstance(args[i], dict) or isinstance(args[i], list):
-                flatten(args[i])
+class PhraseMatcher:
+    """
+    A condition phrase compiled once into the tokens matched against the event values:
+
+        - Each token is either matched as-is, as a regular expression (e.g. ``turn (on|off)``),
+          or as a ``${placeholder}`` that captures the tokens of the event value.
+
+        - The literal tokens (no regular expressions nor placeholders) of the phrase can only be
+          matched by event values that contain them, so the values that don't contain them are
+          rejected without tokenizing them.
+    """
+
+    _whitespace_regex = re.compile(r'\s+')
+    _placeholder_regex = re.compile(r'[^\\]*\${(.+?)}')
+
+    def __init__(self, phrase: str):
+        self.phrase = phrase
+        # (token, compiled token regex, placeholder name or None)
+        self.tokens = []
+        self.literals = []
+
+        for token in self._whitespace_regex.split(phrase.strip().lower()):
+            try:
+                regex = re.compile(token)
+            except re.error:
+                # Tokens that aren't valid regular expressions are matched literally
+                regex = re.compile(re.escape(token))
+
+            placeholder = self._placeholder_regex.match(token)
+            self.tokens.append((token, regex, placeholder.group(1) if placeholder else None))
+            if token and re.escape(token) == token:
+                self.literals.append(token)
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def compile(cls, phrase: str) -> 'PhraseMatcher':
+        """
+        :return: The compiled phrase (cached).
+        """
+        return cls(phrase)
+
+    def may_match(self, value: str) -> bool:
+        """
+        :param value: Lowercase event value.
+        :return: False if the value certainly doesn't match the phrase.
+        """
+        return all(token in value for token in self.literals)
+
+    def match(self, value: str) -> EventMatchResult:
+        """
+        Match an event value against the phrase. See :meth:`Event._matches_argument`.
+        """
+        result = EventMatchResult(is_match=False)
+        value = value.strip().lower()
+        if not self.may_match(value):
+            return result
+
+        event_tokens = self._whitespace_regex.split(value)
+        condition_tokens = self.tokens
+        i = j = 0
+
+        while i < len(event_tokens) and j < len(condition_tokens):
+            event_token = event_tokens[i]
+            condition_token, regex, placeholder = condition_tokens[j]
+
+            if event_token == condition_token:
+                i += 1
+                j += 1
+                result.score += 1.5
+                continue
+
+            m = regex.search(event_token)
+            if m:
+                if m.group(0):
+                    i += 1
+                    result.score += 1.25
+
+                j += 1
+            elif placeholder:
+                if placeholder not in result.parsed_args:
+                    result.parsed_args[placeholder] = event_token
+                    result.score += 1.0
+                else:
+                    result.parsed_args[placeholder] += ' ' + event_token
+
+                remaining_event_tokens = len(event_tokens) - i
+                remaining_condition_tokens = len(condition_tokens) - j
+                if (remaining_condition_tokens == 1 and remaining_event_tokens == 1) \
+                        or (remaining_event_tokens > 1 and remaining_condition_tokens > 1
+                            and event_tokens[i + 1] == condition_tokens[j + 1][0]):
+                    # Stop appending tokens to this argument, as the next
+                    # condition will be satisfied as well
+                    j += 1
+
+                i += 1
+            else:
+                result.score -= 1.0
+                i += 1
+
+        # It's a match if all the tokens in the condition string have been satisfied
+        result.is_match = j == len(condition_tokens)
+        return result
+
 
 # vim:sw=4:ts=4:et:
@@ -7,6 +7,9 @@ class FlicButtonEvent(Event):
     Flic button (https://flic.io).
     """
 
+    # Sequences are matched through custom logic
+    prefilter_conditions = False
+
     def __init__(self, btn_addr, sequence, *args, **kwargs):
         """
         :param btn_addr: Physical address of the button that originated the event
@@ -50,6 +50,7 @@ class CameraFrameCapturedEvent(CameraEvent):
     """
 
     disable_logging = True
+    priority = 'background'
 
     def __init__(self, filename=None, *args, **kwargs):
         super().__init__(*args, filename=filename,
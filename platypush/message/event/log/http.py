@@ -8,6 +8,9 @@ class HttpLogEvent(Event):
     """
     Event triggered when a new HTTP log entry is created.
     """
+
+    priority = 'background'
+
     def __init__(self, logfile: str, address: str, time: datetime, method: str, url: str, status: int, size: int,
                  http_version: str = '1.0', user_id: Optional[str] = None, user_identifier: Optional[str] = None,
                  referrer: Optional[str] = None, user_agent: Optional[str] = None, **kwargs):
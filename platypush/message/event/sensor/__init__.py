@@ -8,6 +8,8 @@ class SensorDataChangeEvent(Event):
     Event triggered when a sensor has new data
     """
 
+    priority = 'background'
+
     def __init__(self, data, source: Optional[str] = None, *args, **kwargs):
         """
         :param data: Sensor data
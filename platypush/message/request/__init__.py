@@ -1,19 +1,16 @@
+import asyncio
 import copy
-import datetime
-import json
 import logging
 import random
-import re
 import time
 
-from threading import Thread
-
 from platypush.config import Config
-from platypush.context import get_plugin
+from platypush.context import get_async_loop, get_plugin, get_dispatcher
 from platypush.message import Message
 from platypush.message.response import Response
 from platypush.utils import get_hash, get_module_and_method_from_action, get_redis_queue_name_by_message, \
     is_functional_procedure
+from platypush.utils.template import Template
 
 logger = logging.getLogger('platypush')
 
@@ -21,6 +18,10 @@ logger = logging.getLogger('platypush')
 class Request(Message):
     """ Request message class """
 
+    # The backend is only used to route the response, and it's not serialized
+    _transient_attrs = ('backend',)
+    priority = 'request'
+
     def __init__(self, target, action, origin=None, id=None, backend=None,
                  args=None, token=None, timestamp=None):
         """
@@ -77,17 +78,15 @@ class Request(Message):
 
         proc_config = procedures[proc_name]
         if is_functional_procedure(proc_config):
-            self._expand_context(self.args, **kwargs)
-            kwargs = {**self.args, **kwargs}
+            # Expand a copy of the arguments: changing them in place would leave the memoized
+            # serialized representation of the request stale
+            kwargs = {**self._expand_context(**kwargs), **kwargs}
             if 'n_tries' in kwargs:
                 del kwargs['n_tries']
 
             return proc_config(*args, **kwargs)
 
-        proc = Procedure.build(name=proc_name, requests=proc_config['actions'],
-                               _async=proc_config['_async'], args=self.args,
-                               backend=self.backend, id=self.id)
-
+        proc = Procedure.compile(proc_name, proc_config).bind(args=self.args, backend=self.backend, id=self.id)
         return proc.execute(*args, **kwargs)
 
     def _expand_context(self, event_args=None, **context):
@@ -121,58 +120,16 @@ class Request(Message):
 
     @classmethod
     def expand_value_from_context(cls, _value, **context):
-        for (k, v) in context.items():
-            if isinstance(v, Message):
-                v = json.loads(str(v))
-            try:
-                exec('{}={}'.format(k, v))
-            except Exception as e:
-                logger.debug(str(e))
-                if isinstance(v, str):
-                    try:
-                        exec('{}="{}"'.format(k, re.sub(r'(^|[^\\])"', '\1\\"', v)))
-                    except Exception as e:
-                        logger.debug('Could not set context variable {}={}: {}'.format(k, v, str(e)))
-                        logger.debug('Context: {}'.format(context))
-
-        parsed_value = ''
+        """
+        Expand the ``${...}`` expressions in a value against a context. The expressions are
+        compiled once (see :class:`platypush.utils.template.Template`), and they can reference
+        the context variables and the modules imported by this module (e.g. ``datetime``).
+        Strings that are valid JSON after the expansion are parsed (e.g. ``'42'`` becomes ``42``),
+        and values that are not strings are returned as they are.
+        """
         if not isinstance(_value, str):
-            parsed_value = _value
-
-        while _value and isinstance(_value, str):
-            m = re.match(r'([^$]*)(\${\s*(.+?)\s*})(.*)', _value)
-            if m and not m.group(1).endswith('\\'):
-                prefix = m.group(1)
-                expr = m.group(2)
-                inner_expr = m.group(3)
-                _value = m.group(4)
-
-                try:
-                    context_value = eval(inner_expr)
-
-                    if callable(context_value):
-                        context_value = context_value()
-                    if isinstance(context_value, range) or isinstance(context_value, tuple):
-                        context_value = [*context_value]
-                    if isinstance(context_value, datetime.date):
-                        context_value = context_value.isoformat()
-                except Exception as e:
-                    logger.exception(e)
-                    context_value = expr
-
-                parsed_value += prefix + (
-                    json.dumps(context_value)
-                    if isinstance(context_value, list) or isinstance(context_value, dict)
-                    else str(context_value)
-                )
-            else:
-                parsed_value += _value
-                _value = ''
-
-        try:
-            return json.loads(parsed_value)
-        except (ValueError, TypeError):
-            return parsed_value
+            return _value
+        return Template.compile(_value).render(context, globals_=globals())
 
     def _send_response(self, response):
         response = Response.build(response)
@@ -184,20 +141,32 @@ class Request(Message):
             self.backend.send_response(response=response, request=self)
         else:
             redis = get_plugin('redis')
-            if redis:
-                queue_name = get_redis_queue_name_by_message(self)
-                redis.send_message(queue_name, response)
-                redis.expire(queue_name, 60)
+            if not redis:
+                return
+
+            channel = None
+            if self.origin == 'http':
+                # The web server receives the responses on a shared channel
+                from platypush.bus.responses import RESPONSES_CHANNEL
+                channel = RESPONSES_CHANNEL
+
+            # The response is always pushed to the request queue, so it can be read by external
+            # clients, and recovered by the web server if it's published while its subscriber
+            # is reconnecting
+            redis.send_response(get_redis_queue_name_by_message(self), response, expire=60, channel=channel)
 
     def execute(self, n_tries=1, _async=True, **context):
         """
         Execute this request and returns a Response object
         Params:
             n_tries -- Number of tries in case of failure before raising a RuntimeError
-            _async   -- If True, the request will be run asynchronously and the
-                       response posted on the bus when available (default),
-                       otherwise the current thread will wait for the response
-                       to be returned synchronously.
+            _async   -- If True, the request will be submitted to the main
+                       dispatcher (or, for asyncio actions, scheduled on the
+                       shared event loop) and the response posted on the bus
+                       when available (default), otherwise the current thread
+                       will wait for the response to be returned synchronously.
+                       asyncio actions executed asynchronously return the
+                       ``concurrent.futures.Future`` of their coroutine.
             context -- Key-valued context. Example:
                 context = (group_name='Kitchen lights')
                 request.args:
@@ -234,16 +203,7 @@ class Request(Message):
                 else:
                     response = plugin.run(method_name, args)
 
-                if not response:
-                    logger.warning('Received null response from action {}'.format(action))
-                else:
-                    if response.is_error():
-                        logger.warning(('Response processed with errors from ' +
-                                        'action {}: {}').format(
-                            action, str(response)))
-                    elif not response.disable_logging:
-                        logger.info('Processed response from action {}: {}'.
-                                    format(action, str(response)))
+                self._log_response(action, response)
             except (AssertionError, TimeoutError) as e:
                 plugin.logger.exception(e)
                 logger.warning('{} from action [{}]: {}'.format(type(e), action, str(e)))
@@ -267,24 +227,107 @@ class Request(Message):
                 self._send_response(response)
                 return response
 
+        async def _coroutine_func():
+            # asyncio actions are awaited on the shared event loop, without a worker thread
+            action = self.expand_value_from_context(self.action, **context)
+            (module_name, method_name) = get_module_and_method_from_action(action)
+            plugin = get_plugin(module_name)
+            response = None
+
+            try:
+                args = self._expand_context(**context)
+                args = self.expand_value_from_context(args, **context)
+                if isinstance(args, dict):
+                    response = await plugin.run_async(method_name, **args)
+                elif isinstance(args, list):
+                    response = await plugin.run_async(method_name, *args)
+                else:
+                    response = await plugin.run_async(method_name, args)
+
+                self._log_response(action, response)
+            except (AssertionError, TimeoutError) as e:
+                plugin.logger.exception(e)
+                logger.warning('{} from action [{}]: {}'.format(type(e), action, str(e)))
+                response = Response(output=None, errors=[str(e)])
+            except Exception as e:
+                plugin.logger.exception(e)
+                logger.warning(('Uncaught exception while processing response ' +
+                                'from action [{}]: {}').format(action, str(e)))
+
+                response = Response(output=None, errors=[str(e)])
+                if n_tries - 1 > 0:
+                    # Reload the plugin and retry on a worker thread
+                    logger.info('Reloading plugin {} and retrying'.format(module_name))
+                    get_dispatcher().submit(self._reload_and_retry, module_name, _thread_func, n_tries - 1, [str(e)])
+                    return
+
+            # Sending the response may block: don't do it on the event loop
+            get_dispatcher().submit(self._send_response, response)
+
         token_hash = Config.get('token_hash')
 
         if token_hash:
             if self.token is None or get_hash(self.token) != token_hash:
                 raise PermissionError()
 
-        if _async:
-            Thread(target=_thread_func, args=(n_tries,)).start()
+        if _async and self.is_async_action(**context):
+            future = asyncio.run_coroutine_threadsafe(_coroutine_func(), get_async_loop())
+            future.add_done_callback(self._log_async_error)
+            return future
+        elif _async:
+            get_dispatcher().submit(_thread_func, n_tries,
+                                    key=get_module_and_method_from_action(self.action)[0])
         else:
             return _thread_func(n_tries)
 
-    def __str__(self):
+    @staticmethod
+    def _log_response(action, response):
+        if not response:
+            logger.warning('Received null response from action {}'.format(action))
+        else:
+            if response.is_error():
+                logger.warning(('Response processed with errors from ' +
+                                'action {}: {}').format(
+                    action, str(response)))
+            elif not response.disable_logging:
+                logger.info('Processed response from action {}: {}'.
+                            format(action, str(response)))
+
+    def _log_async_error(self, future):
+        if future.cancelled():
+            logger.warning('Asyncio action [{}] cancelled'.format(self.action))
+            return
+
+        error = future.exception()
+        if error:
+            logger.warning('Error while running asyncio action [{}]: {}'.format(self.action, str(error)))
+            logger.exception(error)
+
+    @staticmethod
+    def _reload_and_retry(module_name, func, n_tries, errors):
+        get_plugin(module_name, reload=True)
+        return func(_n_tries=n_tries, errors=errors)
+
+    def is_async_action(self, **context) -> bool:
         """
-        Overrides the str() operator and converts
-        the message into a UTF-8 JSON string
+        :return: True if the request targets an ``async`` action of a plugin that has already been
+            initialized (plugins are initialized on the worker threads).
         """
+        from platypush.context import plugins
+
+        if self.action.startswith('procedure.') or self.action == 'utils.get_context':
+            return False
+
+        action = self.expand_value_from_context(self.action, **context)
+        if not isinstance(action, str):
+            return False
+
+        (module_name, method_name) = get_module_and_method_from_action(action)
+        plugin = plugins.get(module_name)
+        return bool(plugin and plugin.is_async_action(method_name))
 
-        return json.dumps({
+    def to_dict(self) -> dict:
+        return {
             'type': 'request',
             'target': self.target,
             'action': self.action,
@@ -293,6 +336,6 @@ class Request(Message):
             'id': self.id if hasattr(self, 'id') else None,
             'token': self.token if hasattr(self, 'token') else None,
             '_timestamp': self.timestamp,
-        })
+        }
 
 # vim:sw=4:ts=4:et:
@@ -7,6 +7,8 @@ from platypush.message import Message
 class Response(Message):
     """ Response message class """
 
+    priority = 'response'
+
     def __init__(self, target=None, origin=None, id=None, output=None, errors=None,
                  timestamp=None, disable_logging=False):
         """
@@ -64,11 +66,7 @@ class Response(Message):
 
         return cls(**args)
 
-    def __str__(self):
-        """
-        Overrides the ``str()`` operator and converts
-        the message into a UTF-8 JSON string
-        """
+    def to_dict(self) -> dict:
         output = self.output if self.output is not None else {
             'success': True if not self.errors else False
         }
@@ -88,7 +86,7 @@ class Response(Message):
         if self.disable_logging:
             response_dict['_disable_logging'] = self.disable_logging
 
-        return json.dumps(response_dict, cls=self.Encoder)
+        return response_dict
 
 
 # vim:sw=4:ts=4:et:
@@ -1,56 +1,315 @@
+import asyncio
+import copy
+import inspect
+import json
 import logging
 
-from functools import wraps
+from functools import partial, wraps
+from typing import FrozenSet, List, Optional
 
+from platypush.context import run_async
 from platypush.event import EventGenerator
 from platypush.message.response import Response
-from platypush.utils import get_decorators, get_plugin_name_by_class
+from platypush.utils import get_plugin_name_by_class
+from platypush.utils.cache import ActionCache, ActionCacheRule
+from platypush.utils.singleflight import SingleFlight
 
 
-def action(f):
-    @wraps(f)
-    def _execute_action(*args, **kwargs):
-        response = Response()
-        result = f(*args, **kwargs)
+def _build_response(result) -> Response:
+    response = Response()
 
-        if result and isinstance(result, Response):
-            result.errors = result.errors \
-                if isinstance(result.errors, list) else [result.errors]
-            response = result
-        elif isinstance(result, tuple) and len(result) == 2:
-            response.errors = result[1] \
-                if isinstance(result[1], list) else [result[1]]
+    if result and isinstance(result, Response):
+        result.errors = result.errors \
+            if isinstance(result.errors, list) else [result.errors]
+        response = result
+    elif isinstance(result, tuple) and len(result) == 2:
+        response.errors = result[1] \
+            if isinstance(result[1], list) else [result[1]]
 
-            if len(response.errors) == 1 and response.errors[0] is None:
-                response.errors = []
-            response.output = result[0]
-        else:
-            response = Response(output=result, errors=[])
+        if len(response.errors) == 1 and response.errors[0] is None:
+            response.errors = []
+        response.output = result[0]
+    else:
+        response = Response(output=result, errors=[])
 
+    return response
+
+
+def action(f=None, *, cache_ttl=None, cache_key=None, invalidates=None, single_flight=False):
+    """
+    Decorator for the methods of a plugin that are exposed as actions.
+
+    Idempotent actions can declare that their results can be cached, and the actions that
+    change the state of a device can declare which cached results they invalidate:
+
+    .. code-block:: python
+
+        @action(cache_ttl=5, cache_key=['device'])
+        def status(self, device=None):
+            ...
+
+        @action(invalidates=['status'])
+        def on(self, device=None):
+            ...
+
+    Actions on slow or rate-limited devices can also opt in to single-flight execution: concurrent
+    calls to the action with the same arguments share the same execution and response:
+
+    .. code-block:: python
+
+        @action(single_flight=True)
+        def get_nodes(self):
+            ...
+
+    :param cache_ttl: If set, the successful results of the action are cached for this number of seconds.
+    :param cache_key: Names of the arguments that identify a cached result (default: all the arguments).
+    :param invalidates: Names of the actions of the same plugin whose cached results are
+        invalidated when this action is executed.
+    :param single_flight: If True, concurrent calls with the same arguments are coalesced into one
+        execution (see :meth:`Plugin.run`).
+
+    Actions can also be ``async def`` coroutines. They are executed on the shared event loop (see
+    :func:`platypush.context.get_async_loop`) without tying up a thread while they wait for I/O,
+    and synchronous callers get a blocking wrapper. Coroutines already running on the loop should
+    ``await`` :meth:`Plugin.run_async` instead.
+    """
+    if f is None:
+        return partial(action, cache_ttl=cache_ttl, cache_key=cache_key, invalidates=invalidates,
+                       single_flight=single_flight)
+
+    default_cache_rule = ActionCacheRule(ttl=cache_ttl, key=cache_key) if cache_ttl else None
+    invalidates = [invalidates] if isinstance(invalidates, str) else list(invalidates or [])
+    signature = None
+
+    def _get_args(*args, **kwargs) -> dict:
+        nonlocal signature
+        if not signature:
+            signature = inspect.signature(f)
+
+        bound_args = signature.bind(*args, **kwargs)
+        bound_args.apply_defaults()
+        return {name: value for name, value in list(bound_args.arguments.items())[1:]}
+
+    def _get_cached_response(args, kwargs):
+        """
+        :return: A ``(plugin, cached response, cache state)`` tuple, where the cache state is
+            required to store the response of the action once executed.
+        """
+        plugin = args[0] if args and isinstance(args[0], Plugin) else None
+        cache_rule = plugin._get_cache_rule(f.__name__, default_cache_rule) if plugin else None
+        if not cache_rule:
+            return plugin, None, None
+
+        try:
+            key = cache_rule.get_key(_get_args(*args, **kwargs))
+        except TypeError:
+            # Invalid arguments: let the action raise the error
+            return plugin, None, None
+
+        cache = plugin._get_action_cache()
+        hit, output = cache.get(f.__name__, key)
+        if hit:
+            return plugin, Response(output=output, errors=[]), None
+
+        return plugin, None, (cache, key, cache.get_generation(f.__name__), cache_rule.ttl)
+
+    def _invalidate_cache(plugin):
+        if plugin:
+            invalidated_actions = plugin._get_invalidated_actions(f.__name__, invalidates)
+            if invalidated_actions:
+                plugin.invalidate_cache(*invalidated_actions)
+
+    def _cache_response(response: Response, cache_state) -> Response:
+        if cache_state and not response.errors:
+            cache, key, generation, ttl = cache_state
+            cache.put(f.__name__, key, response.output, ttl=ttl, generation=generation)
         return response
 
+    async def _execute_action_async(*args, **kwargs):
+        plugin, response, cache_state = _get_cached_response(args, kwargs)
+        if response:
+            return response
+
+        try:
+            response = _build_response(await f(*args, **kwargs))
+        finally:
+            _invalidate_cache(plugin)
+
+        return _cache_response(response, cache_state)
+
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        def _execute_action(*args, **kwargs):
+            # Synchronous callers wait for the action to be executed on the shared event loop
+            return run_async(_execute_action_async(*args, **kwargs))
+
+        _execute_action.execute_async = _execute_action_async
+    else:
+        @wraps(f)
+        def _execute_action(*args, **kwargs):
+            plugin, response, cache_state = _get_cached_response(args, kwargs)
+            if response:
+                return response
+
+            try:
+                response = _build_response(f(*args, **kwargs))
+            finally:
+                _invalidate_cache(plugin)
+
+            return _cache_response(response, cache_state)
+
     # Propagate the docstring
     _execute_action.__doc__ = f.__doc__
+    # Tags used to build the actions registry of the plugin classes
+    _execute_action.is_action = True
+    _execute_action.single_flight = single_flight
     return _execute_action
 
 
 class Plugin(EventGenerator):
     """ Base plugin class """
 
+    # Names of the actions of the class, computed once when the class is defined
+    _action_names: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._action_names = frozenset(
+            name
+            for klass in cls.__mro__
+            for name, attr in vars(klass).items()
+            if getattr(attr, 'is_action', False)
+        )
+
+    @classmethod
+    def get_action_names(cls) -> FrozenSet[str]:
+        """
+        :return: The names of the actions of the plugin class, including the inherited ones.
+        """
+        return cls._action_names
+
     def __init__(self, **kwargs):
         super().__init__()
         self.logger = logging.getLogger('platypush:plugin:' + get_plugin_name_by_class(self.__class__))
         if 'logging' in kwargs:
             self.logger.setLevel(getattr(logging, kwargs['logging'].upper()))
 
-        self.registered_actions = set(
-            get_decorators(self.__class__, climb_class_hierarchy=True).get('action', [])
-        )
+        # Copied per instance, as some plugins (e.g. media) register the actions of other plugins
+        self.registered_actions = set(self.get_action_names())
+
+        # Caching rules configured for this plugin instance, which override the ones declared
+        # on the actions. Example:
+        #
+        #   light.hue:
+        #     action_cache_size: 512
+        #     action_cache:
+        #       get_lights: 2
+        #       get_groups:
+        #         ttl: 10
+        #         invalidated_by:
+        #           - set_group
+        self._action_cache_size = kwargs.get('action_cache_size', 256)
+        self._action_cache_rules = {
+            action_name: ActionCacheRule.build(rule)
+            for action_name, rule in (kwargs.get('action_cache') or {}).items()
+        }
+        self._action_cache_invalidations = {}
+        self._action_cache = ActionCache(max_size=self._action_cache_size)
+
+        # Actions that coalesce concurrent identical calls, besides the ones that declare it
+        self._single_flight_actions = set(kwargs.get('single_flight_actions') or [])
+        self._single_flight = SingleFlight()
+
+        for action_name, rule in self._action_cache_rules.items():
+            for invalidating_action in rule.invalidated_by:
+                self._action_cache_invalidations.setdefault(invalidating_action, []).append(action_name)
 
     def run(self, method, *args, **kwargs):
+        """
+        Run an action of the plugin. If the action is single-flight, and a call to the same action
+        with the same arguments is already in progress, the response of that call is returned.
+        """
+        assert method in self.registered_actions, '{} is not a registered action on {}'.\
+            format(method, self.__class__.__name__)
+
+        f = getattr(self, method)
+        if not (getattr(f, 'single_flight', False) or method in getattr(self, '_single_flight_actions', ())):
+            return f(*args, **kwargs)
+
+        try:
+            key = (method, json.dumps([args, kwargs], sort_keys=True))
+        except (TypeError, ValueError):
+            # The arguments have no stable fingerprint
+            return f(*args, **kwargs)
+
+        response, shared = self._get_single_flight().run(key, f, *args, **kwargs)
+        if shared and isinstance(response, Response):
+            # Each caller gets its own copy of the shared response
+            response = Response(output=copy.deepcopy(response.output), errors=list(response.errors),
+                                disable_logging=response.disable_logging)
+
+        return response
+
+    async def run_async(self, method, *args, **kwargs):
+        """
+        Run an action of the plugin from a coroutine running on the shared event loop. ``async``
+        actions are awaited directly, while the synchronous actions are executed on a thread pool.
+        """
         assert method in self.registered_actions, '{} is not a registered action on {}'.\
             format(method, self.__class__.__name__)
-        return getattr(self, method)(*args, **kwargs)
+
+        f = getattr(self, method)
+        execute_async = getattr(f, 'execute_async', None)
+        if execute_async:
+            # Actions registered from other plugins (e.g. media) are bound to them
+            return await execute_async(getattr(f, '__self__', self), *args, **kwargs)
+
+        return await asyncio.get_running_loop().run_in_executor(None, partial(self.run, method, *args, **kwargs))
+
+    def is_async_action(self, method) -> bool:
+        """
+        :return: True if the action is an ``async`` coroutine.
+        """
+        return hasattr(getattr(self, method, None), 'execute_async')
+
+    def _get_cache_rule(self, action_name: str, default: Optional[ActionCacheRule] = None) \
+            -> Optional[ActionCacheRule]:
+        return getattr(self, '_action_cache_rules', {}).get(action_name, default)
+
+    def _get_invalidated_actions(self, action_name: str, invalidates: List[str]) -> List[str]:
+        return [*invalidates, *getattr(self, '_action_cache_invalidations', {}).get(action_name, [])]
+
+    def _get_action_cache(self) -> ActionCache:
+        # Plugins that don't call the parent constructor get the default settings
+        if not getattr(self, '_action_cache', None):
+            self._action_cache = ActionCache(max_size=getattr(self, '_action_cache_size', 256))
+        return self._action_cache
+
+    def _get_single_flight(self) -> SingleFlight:
+        if not getattr(self, '_single_flight', None):
+            self._single_flight = SingleFlight()
+        return self._single_flight
+
+    def invalidate_cache(self, *actions: str):
+        """
+        Invalidate the cached results of the specified actions of the plugin, or all of them if no
+        actions are specified. Write actions should either declare the actions they invalidate (see
+        :func:`action`) or call this method.
+        """
+        if getattr(self, '_action_cache', None):
+            self._action_cache.invalidate(*actions)
+
+    def get_cache_stats(self) -> dict:
+        """
+        :return: Size and hits/misses/evictions/invalidations counters of the action cache of the plugin.
+        """
+        return self._get_action_cache().get_stats()
+
+    def get_single_flight_stats(self) -> dict:
+        """
+        :return: Executions and collapsed calls counters of the single-flight actions of the plugin.
+        """
+        return self._get_single_flight().get_stats()
 
 
 # vim:sw=4:ts=4:et:
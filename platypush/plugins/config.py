@@ -1,6 +1,7 @@
 import json
 
 from platypush import Config
+from platypush.context import reload_config
 from platypush.message import Message
 from platypush.plugins import Plugin, action
 
@@ -22,6 +23,26 @@ class ConfigPlugin(Plugin):
     def get_procedures(self) -> dict:
         return json.loads(json.dumps(Config.get_procedures(), cls=Message.Encoder))
 
+    @action
+    def reload(self) -> dict:
+        """
+        Reload the configuration, and swap the event hooks, procedures and cronjobs that have
+        changed without restarting the application. Running hooks, procedures and cronjobs
+        complete on their previous definitions.
+
+        :return: The names of the changed (or added) and removed entries. Example:
+
+            .. code-block:: json
+
+                {
+                    "event_hooks": {"changed": ["OnMotionDetected"], "removed": []},
+                    "procedures": {"changed": [], "removed": ["old_procedure"]},
+                    "cronjobs": {"changed": ["SyncCalendar"], "removed": []}
+                }
+
+        """
+        return reload_config()
+
     @action
     def dashboards(self) -> dict:
         return Config.get_dashboards()
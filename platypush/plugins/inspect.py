@@ -4,7 +4,7 @@ import json
 import pkgutil
 import re
 import threading
-from typing import Optional
+from typing import Callable, Optional
 
 import platypush.backend   # lgtm [py/import-and-import-from]
 import platypush.plugins   # lgtm [py/import-and-import-from]
@@ -13,10 +13,10 @@ import platypush.message.response   # lgtm [py/import-and-import-from]
 
 from platypush.backend import Backend
 from platypush.config import Config
+from platypush.context import get_cron_scheduler, get_dispatcher, get_hook_executor
 from platypush.plugins import Plugin, action
 from platypush.message.event import Event
 from platypush.message.response import Response
-from platypush.utils import get_decorators
 
 
 # noinspection PyTypeChecker
@@ -65,7 +65,7 @@ class PluginModel(Model):
         self.html_doc = html_doc
         self.doc = self.to_html(plugin.__doc__) if html_doc and plugin.__doc__ else plugin.__doc__
         self.actions = {action_name: ActionModel(getattr(plugin, action_name), html_doc=html_doc)
-                        for action_name in get_decorators(plugin, climb_class_hierarchy=True).get('action', [])}
+                        for action_name in plugin.get_action_names()}
 
     def __iter__(self):
         for attr in ['name', 'actions', 'doc', 'html_doc']:
@@ -354,5 +354,69 @@ class InspectPlugin(Plugin):
         cfg = Config.get()
         return cfg
 
+    @action
+    def get_dispatcher_stats(self) -> dict:
+        """
+        Get the state of the main dispatcher - queue depth, active workers and
+        submitted/completed/dropped/rejected tasks counters.
+        """
+        return get_dispatcher().get_stats()
+
+    @action
+    def get_hook_stats(self, hook: Optional[str] = None) -> dict:
+        """
+        Get the state of the event hooks executor - running, queued and dropped runs, queue wait
+        and execution times of the hooks.
+
+        :param hook: [Optional] hook name (default: all the hooks that have been triggered).
+        """
+        return get_hook_executor().get_stats(hook)
+
+    @action
+    def get_cron_stats(self) -> dict:
+        """
+        Get the scheduling metrics of the cronjobs - next and last run, runs, errors, missed runs
+        and lateness of the runs.
+        """
+        return get_cron_scheduler().get_stats()
+
+    @staticmethod
+    def _get_plugins_stats(get_stats: Callable[[Plugin], dict], plugin: Optional[str] = None,
+                           *counters: str) -> dict:
+        from platypush.context import plugins
+
+        stats = {
+            name: get_stats(plugin_)
+            for name, plugin_ in list(plugins.items())
+            if isinstance(plugin_, Plugin) and (not plugin or name == plugin)
+        }
+
+        # Only report the plugins that have been used, unless a plugin was requested
+        return {
+            name: plugin_stats
+            for name, plugin_stats in stats.items()
+            if plugin or any(plugin_stats[counter] for counter in counters)
+        }
+
+    @action
+    def get_action_cache_stats(self, plugin: Optional[str] = None) -> dict:
+        """
+        Get the hits/misses/evictions/invalidations counters of the action caches of the plugins.
+
+        :param plugin: [Optional] plugin name (default: all the initialized plugins with cached results).
+        :return: ``plugin name -> stats`` map.
+        """
+        return self._get_plugins_stats(Plugin.get_cache_stats, plugin, 'hits', 'misses')
+
+    @action
+    def get_single_flight_stats(self, plugin: Optional[str] = None) -> dict:
+        """
+        Get the executions and collapsed calls counters of the single-flight actions of the plugins.
+
+        :param plugin: [Optional] plugin name (default: all the initialized plugins with single-flight calls).
+        :return: ``plugin name -> stats`` map.
+        """
+        return self._get_plugins_stats(Plugin.get_single_flight_stats, plugin, 'executions')
+
 
 # vim:sw=4:ts=4:et:
@@ -453,7 +453,7 @@ class MusicMpdPlugin(MusicPlugin):
 
         return self._exec('seekcur', '-15')
 
-    @action
+    @action(single_flight=True)
     def status(self):
         """
         :returns: The current state.
@@ -17,6 +17,7 @@ class RedisPlugin(Plugin):
         super().__init__()
         self.args = args
         self.kwargs = kwargs
+        self._redis = None
 
         if not kwargs:
             try:
@@ -27,7 +28,10 @@ class RedisPlugin(Plugin):
                 self.logger.debug(e)
 
     def _get_redis(self):
-        return Redis(*self.args, **self.kwargs)
+        # The client is shared, as it manages a pool of connections
+        if not self._redis:
+            self._redis = Redis(*self.args, **self.kwargs)
+        return self._redis
 
     @action
     def send_message(self, queue, msg, *args, **kwargs):
@@ -55,6 +59,47 @@ class RedisPlugin(Plugin):
 
         return redis.rpush(queue, str(msg))
 
+    @action
+    def send_response(self, queue, msg, expire=60, channel=None):
+        """
+        Push a response to a Redis queue, set the expiration of the queue and, optionally, publish
+        the response on a channel, in a single round trip.
+
+        :param queue: Queue name
+        :type queue: str
+
+        :param msg: Response to be sent
+        :type msg: str, bytes, list, dict, Message object
+
+        :param expire: Expiration of the queue, in seconds (default: 60)
+        :type expire: int
+
+        :param channel: [Optional] Channel where the response should also be published
+        :type channel: str
+        """
+        msg = str(msg)
+        pipe = self._get_redis().pipeline(transaction=False)
+        pipe.rpush(queue, msg)
+        pipe.expire(queue, expire)
+        if channel:
+            pipe.publish(channel, msg)
+        pipe.execute()
+
+    @action
+    def publish(self, channel, msg):
+        """
+        Publish a message on a Redis channel.
+
+        :param channel: Channel name
+        :type channel: str
+
+        :param msg: Message to be sent
+        :type msg: str, bytes, list, dict, Message object
+
+        :return: The number of clients that received the message.
+        """
+        return self._get_redis().publish(channel, str(msg))
+
     @action
     def mget(self, keys, *args):
         """
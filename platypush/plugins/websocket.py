@@ -1,7 +1,6 @@
 import json
 import websockets
 
-from platypush.context import get_or_create_event_loop
 from platypush.message import Message
 from platypush.plugins import Plugin, action
 from platypush.utils import get_ssl_client_context
@@ -20,7 +19,7 @@ class WebsocketPlugin(Plugin):
         super().__init__(**kwargs)
 
     @action
-    def send(self, url, msg, ssl_cert=None, ssl_key=None, ssl_cafile=None, ssl_capath=None):
+    async def send(self, url, msg, ssl_cert=None, ssl_key=None, ssl_cafile=None, ssl_capath=None):
         """
         Sends a message to a websocket.
 
@@ -43,21 +42,6 @@ class WebsocketPlugin(Plugin):
         :type ssl_capath: str
         """
 
-        async def send():
-            websocket_args = {}
-            if ssl_cert:
-                websocket_args['ssl'] = get_ssl_client_context(ssl_cert=ssl_cert,
-                                                               ssl_key=ssl_key,
-                                                               ssl_cafile=ssl_cafile,
-                                                               ssl_capath=ssl_capath)
-
-            async with websockets.connect(url, **websocket_args) as websocket:
-                try:
-                    await websocket.send(str(msg))
-                except websockets.exceptions.ConnectionClosed as err:
-                    self.logger.warning('Error on websocket {}: {}'.
-                                        format(url, err))
-
         try:
             msg = json.dumps(msg)
         except Exception as e:
@@ -68,7 +52,18 @@ class WebsocketPlugin(Plugin):
         except Exception as e:
             self.logger.debug(e)
 
-        loop = get_or_create_event_loop()
-        loop.run_until_complete(send())
+        websocket_args = {}
+        if ssl_cert:
+            websocket_args['ssl'] = get_ssl_client_context(ssl_cert=ssl_cert,
+                                                           ssl_key=ssl_key,
+                                                           ssl_cafile=ssl_cafile,
+                                                           ssl_capath=ssl_capath)
+
+        async with websockets.connect(url, **websocket_args) as websocket:
+            try:
+                await websocket.send(str(msg))
+            except websockets.exceptions.ConnectionClosed as err:
+                self.logger.warning('Error on websocket {}: {}'.
+                                    format(url, err))
 
 # vim:sw=4:ts=4:et:
@@ -446,7 +446,7 @@ class ZwaveMqttPlugin(MqttPlugin, ZwaveBasePlugin):
         """
         raise _NOT_IMPLEMENTED_ERR
 
-    @action
+    @action(single_flight=True)
     def status(self, **kwargs) -> Dict[str, Any]:
         """
         Get the status of the controller.
@@ -574,7 +574,7 @@ class ZwaveMqttPlugin(MqttPlugin, ZwaveBasePlugin):
         """
         self._api_request('refreshNeighbors', **kwargs)
 
-    @action
+    @action(single_flight=True)
     def get_nodes(self, node_id: Optional[int] = None, node_name: Optional[str] = None, **kwargs) \
             -> Optional[Dict[str, Any]]:
         """
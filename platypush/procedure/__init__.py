@@ -1,14 +1,20 @@
+import copy
 import enum
 import logging
 import re
+import threading
 from functools import wraps
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from queue import LifoQueue
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from ..common import exec_wrapper
 from ..config import Config
 from ..message.request import Request
 from ..message.response import Response
+from ..utils import is_functional_procedure
+from ..utils.template import Expression, Template
 
 logger = logging.getLogger('platypush')
 
@@ -19,10 +25,68 @@ class Statement(enum.Enum):
     RETURN = 'return'
 
 
+_if_regex = re.compile(r'\s*(if)\s+\${(.*)}\s*')
+_for_regex = re.compile(r'\s*(fork?)(?:\s*\(\s*(\d+)\s*\))?\s+([\w\d_]+)\s+in\s+(.*)\s*')
+_while_regex = re.compile(r'\s*while\s+\${(.*)}\s*')
+
+# name -> (procedure configuration, compiled procedure)
+_compiled_procedures: Dict[str, Tuple[dict, 'Procedure']] = {}
+_compiled_procedures_lock = threading.RLock()
+
+
+class _Frame:
+    """
+    Execution state of a procedure. Procedures are compiled once and they can be
+    executed concurrently, therefore the state of each execution (``break``,
+    ``continue`` and ``return`` flags) is kept on the frames of the execution stack.
+    """
+
+    __slots__ = ('procedure', 'should_return', 'should_break', 'should_continue')
+
+    def __init__(self, procedure: 'Procedure'):
+        self.procedure = procedure
+        self.should_return = False
+        self.should_break = False
+        self.should_continue = False
+
+
+class _StepType(enum.Enum):
+    STATEMENT = 'statement'
+    CALLABLE = 'callable'
+    PROCEDURE = 'procedure'
+    REQUEST = 'request'
+
+
+class _Step:
+    """
+    A step of a compiled procedure, with its pre-computed type.
+    """
+
+    __slots__ = ('type', 'target')
+
+    def __init__(self, target):
+        self.target = target
+        if isinstance(target, Statement):
+            self.type = _StepType.STATEMENT
+        elif isinstance(target, Procedure):
+            self.type = _StepType.PROCEDURE
+        elif callable(target):
+            self.type = _StepType.CALLABLE
+        else:
+            self.type = _StepType.REQUEST
+
+
 class Procedure(object):
-    """ Procedure class. A procedure is a pre-configured list of requests """
+    """
+    Procedure class. A procedure is a pre-configured list of requests.
+
+    Procedures are compiled once into an immutable execution plan: the ``if``/``for``/``while``
+    statements are parsed, and their conditions and iterables are compiled, when the procedure is
+    built. The state of each execution is kept on its own stack, so a procedure can be executed
+    any number of times, also concurrently.
+    """
 
-    def __init__(self, name, _async, requests, args=None, backend=None):
+    def __init__(self, name, _async, requests, args=None, backend=None, id=None):
         """
         Params:
             name     -- Procedure name
@@ -35,11 +99,13 @@ class Procedure(object):
         self._async = _async
         self.requests = requests
         self.backend = backend
+        self.id = id
         self.args = args or {}
-        self._should_return = False
+        self.steps = [_Step(req) for req in requests]
 
         for req in requests:
-            req.backend = self.backend
+            if isinstance(req, Request):
+                req.backend = self.backend
 
     @classmethod
     def build(cls, name, _async, requests, args=None, backend=None, id=None, procedure_class=None, **kwargs):
@@ -50,6 +116,8 @@ class Procedure(object):
         if_config = LifoQueue()
         procedure_class = procedure_class or cls
         key = None
+        step_names = {}
+        step_dependencies = {}
 
         for request_config in requests:
             # Check if it's a break/continue/return statement
@@ -60,7 +128,7 @@ class Procedure(object):
             # Check if this request is an if-else
             if len(request_config.keys()) >= 1:
                 key = list(request_config.keys())[0]
-                m = re.match(r'\s*(if)\s+\${(.*)}\s*', key)
+                m = _if_regex.match(key)
 
                 if m:
                     if_count += 1
@@ -96,7 +164,7 @@ class Procedure(object):
             # Check if this request is a for loop
             if len(request_config.keys()) == 1:
                 key = list(request_config.keys())[0]
-                m = re.match(r'\s*(fork?)\s+([\w\d_]+)\s+in\s+(.*)\s*', key)
+                m = _for_regex.match(key)
 
                 if m:
                     for_count += 1
@@ -104,15 +172,17 @@ class Procedure(object):
 
                     # A 'for' loop is synchronous. Declare a 'fork' loop if you
                     # want to process the elements in the iterable in parallel
-                    _async = True if m.group(1) == 'fork' else False
-                    iterator_name = m.group(2)
-                    iterable = m.group(3)
+                    fork = m.group(1) == 'fork'
+                    max_parallel = int(m.group(2)) if m.group(2) else None
+                    iterator_name = m.group(3)
+                    iterable = m.group(4)
 
-                    loop = ForProcedure.build(name=loop_name, _async=_async,
+                    loop = ForProcedure.build(name=loop_name, _async=False,
                                               requests=request_config[key],
                                               backend=backend, id=id,
                                               iterator_name=iterator_name,
-                                              iterable=iterable)
+                                              iterable=iterable, fork=fork,
+                                              max_parallel=max_parallel)
 
                     reqs.append(loop)
                     continue
@@ -120,7 +190,7 @@ class Procedure(object):
             # Check if this request is a while loop
             if len(request_config.keys()) == 1:
                 key = list(request_config.keys())[0]
-                m = re.match(r'\s*while\s+\${(.*)}\s*', key)
+                m = _while_regex.match(key)
 
                 if m:
                     while_count += 1
@@ -135,11 +205,18 @@ class Procedure(object):
                     reqs.append(loop)
                     continue
 
-            request_config['origin'] = Config.get('device_id')
-            request_config['id'] = id
+            request_config = {**request_config, 'origin': Config.get('device_id'), 'id': id}
             if 'target' not in request_config:
                 request_config['target'] = request_config['origin']
 
+            # Name and explicit dependencies of the step, used by DAG procedures
+            step_name = request_config.pop('name', None)
+            depends_on = request_config.pop('depends_on', None)
+            if step_name:
+                step_names[len(reqs)] = step_name
+            if depends_on:
+                step_dependencies[len(reqs)] = [depends_on] if isinstance(depends_on, str) else depends_on
+
             request = Request.build(request_config)
             reqs.append(request)
 
@@ -147,28 +224,89 @@ class Procedure(object):
             pending_if = if_config.get()
             reqs.append(IfProcedure.build(**pending_if))
 
+        if issubclass(procedure_class, DagProcedure):
+            kwargs['step_names'] = step_names
+            kwargs['step_dependencies'] = step_dependencies
+
         # noinspection PyArgumentList
-        return procedure_class(name=name, _async=_async, requests=reqs, args=args, backend=backend, **kwargs)
+        return procedure_class(name=name, _async=_async, requests=reqs, args=args, backend=backend, id=id, **kwargs)
+
+    @classmethod
+    def compile(cls, name: str, config: dict) -> 'Procedure':
+        """
+        Get the compiled version of a configured procedure. Procedures are compiled the first
+        time they are requested (or by :func:`compile_procedures`), and compiled again only if
+        their configuration changes.
+
+        :param name: Procedure name.
+        :param config: Procedure configuration, as returned by
+            :meth:`platypush.config.Config.get_procedures`.
+        """
+        with _compiled_procedures_lock:
+            compiled = _compiled_procedures.get(name)
+            if compiled and compiled[0] is config:
+                return compiled[1]
+
+            proc = cls.build(name=name, requests=config['actions'], _async=config['_async'],
+                             procedure_class=DagProcedure if config.get('dag') else None)
+            _compiled_procedures[name] = (config, proc)
+            return proc
+
+    def bind(self, args=None, backend=None, id=None) -> 'Procedure':
+        """
+        :return: A lightweight copy of the procedure, bound to the arguments, backend and
+            request ID of a call. The compiled steps are shared with the original procedure.
+        """
+        proc = copy.copy(self)
+        proc.args = args or {}
+        proc.backend = backend
+        proc.id = id
+        return proc
 
     @staticmethod
     def _find_nearest_loop(stack):
-        for proc in stack[::-1]:
-            if isinstance(proc, LoopProcedure):
-                return proc
+        for frame in stack[::-1]:
+            if isinstance(frame.procedure, LoopProcedure):
+                return frame
 
         raise AssertionError('break/continue statement found outside of a loop')
 
+    def _push_frame(self, stack: Optional[list]) -> list:
+        return [*(stack or []), _Frame(self)]
+
+    def _get_request(self, request: Request, stack: list, token: Optional[str]) -> Request:
+        """
+        Bind a compiled request to the backend and request ID of the procedure call.
+        """
+        backend = next((frame.procedure.backend for frame in stack[::-1]
+                        if frame.procedure.backend is not None), request.backend)
+        req_id = next((frame.procedure.id for frame in stack[::-1]
+                       if frame.procedure.id is not None), request.id)
+
+        if backend is request.backend and req_id == request.id and (not token or token == request.token):
+            return request
+
+        request = copy.copy(request)
+        request.invalidate_cache()
+        request.backend = backend
+        request.id = req_id
+        if token:
+            request.token = token
+
+        return request
+
     def execute(self, n_tries=1, __stack__=None, **context):
         """
         Execute the requests in the procedure
         Params:
             n_tries -- Number of tries in case of failure before raising a RuntimeError
         """
-        if not __stack__:
-            __stack__ = [self]
-        else:
-            __stack__.append(self)
+        return self._execute(self._push_frame(__stack__), n_tries=n_tries, **context)
 
+    def _expand_args(self, context: dict):
+        """
+        Expand the arguments of the procedure call, and add them to the context.
+        """
         if self.args:
             args = self.args.copy()
             for k, v in args.items():
@@ -179,43 +317,40 @@ class Procedure(object):
         else:
             logger.info('Executing procedure {}'.format(self.name))
 
+    def _execute(self, __stack__, n_tries=1, **context):
+        frame = __stack__[-1]
+        self._expand_args(context)
         response = Response()
         token = Config.get('token')
 
-        for request in self.requests:
-            if callable(request):
-                response = request(**context)
+        for step in self.steps:
+            if step.type == _StepType.CALLABLE:
+                response = step.target(**context)
                 continue
 
-            if isinstance(request, Statement):
-                if request == Statement.RETURN:
-                    self._should_return = True
-                    for proc in __stack__:
-                        proc._should_return = True
-                    break
-
-                if request in [Statement.BREAK, Statement.CONTINUE]:
-                    loop = self._find_nearest_loop(__stack__)
-                    if request == Statement.BREAK:
-                        loop._should_break = True
-                    else:
-                        loop._should_continue = True
+            if step.type == _StepType.STATEMENT:
+                if step.target == Statement.RETURN:
+                    for stack_frame in __stack__:
+                        stack_frame.should_return = True
                     break
 
-            if isinstance(self, LoopProcedure):
-                if self._should_continue or self._should_break:
-                    if self._should_continue:
-                        # noinspection PyAttributeOutsideInit
-                        self._should_continue = False
-
-                    break
+                loop = self._find_nearest_loop(__stack__)
+                if step.target == Statement.BREAK:
+                    loop.should_break = True
+                else:
+                    loop.should_continue = True
+                break
 
-            if token:
-                request.token = token
+            if frame.should_continue or frame.should_break:
+                break
 
             context['_async'] = self._async
             context['n_tries'] = n_tries
-            response = request.execute(__stack__=__stack__, **context)
+
+            if step.type == _StepType.PROCEDURE:
+                response = step.target.execute(__stack__=__stack__, **context)
+            else:
+                response = self._get_request(step.target, __stack__, token).execute(__stack__=__stack__, **context)
 
             if not self._async and response:
                 if isinstance(response.output, dict):
@@ -225,7 +360,7 @@ class Procedure(object):
                 context['output'] = response.output
                 context['errors'] = response.errors
 
-            if self._should_return:
+            if frame.should_return:
                 break
 
         return response or Response()
@@ -236,10 +371,31 @@ class LoopProcedure(Procedure):
     Base class while and for/fork loops.
     """
 
-    def __init__(self, name, requests, _async=False, args=None, backend=None):
-        super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend)
-        self._should_break = False
-        self._should_continue = False
+    def __init__(self, name, requests, _async=False, args=None, backend=None, id=None):
+        super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend, id=id)
+
+    def _run_iteration(self, stack: list, **context) -> Optional[Response]:
+        """
+        Run an iteration of the loop.
+
+        :return: The response of the iteration, or None if the loop should be interrupted.
+        """
+        frame = stack[-1]
+        if frame.should_return:
+            logger.info('Returning from {}'.format(self.name))
+            return
+
+        response = self._execute(stack, **context)
+        if frame.should_continue:
+            frame.should_continue = False
+            logger.info('Continuing loop {}'.format(self.name))
+
+        if frame.should_return or frame.should_break:
+            logger.info('{} loop {}'.format('Returning from' if frame.should_return else 'Breaking', self.name))
+            frame.should_break = False
+            return
+
+        return response
 
 
 class ForProcedure(LoopProcedure):
@@ -249,6 +405,14 @@ class ForProcedure(LoopProcedure):
     loop, i.e. the nested actions will be executed in sequence. Use 'fork'
     instead of 'for' if you want to run the actions in parallel.
 
+    In a 'fork' loop each item is processed on its own thread, with its own copy
+    of the context, and at most ``max_parallel`` items are processed at the same
+    time (default: 8, it can be set through the ``fork(max_parallel)`` syntax).
+    The output of a 'fork' loop is the list of the outputs of the items, in the
+    same order as the iterable. ``continue`` stops the processing of the current
+    item, while ``break`` and ``return`` prevent the items that haven't been
+    started yet from being processed.
+
     Example::
 
         procedure.sync.process_results:
@@ -262,42 +426,99 @@ class ForProcedure(LoopProcedure):
                       id: ${result['id']}
                       name: ${result['name']}
 
+            - fork(4) light in ${lights}:
+                - action: light.hue.on
+                  args:
+                      lights:
+                          - ${light}
+
     """
 
-    def __init__(self, name, iterator_name, iterable, requests, _async=False, args=None, backend=None):
-        super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend)
+    _DEFAULT_MAX_PARALLEL = 8
+
+    def __init__(self, name, iterator_name, iterable, requests, _async=False, args=None, backend=None, id=None,
+                 fork=False, max_parallel=None):
+        super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend, id=id)
         self.iterator_name = iterator_name
         self.iterable = iterable
+        self.fork = fork
+        self.max_parallel = max(1, int(max_parallel or self._DEFAULT_MAX_PARALLEL))
 
-    def execute(self, _async=None, **context):
         try:
-            iterable = eval(self.iterable)
-            assert hasattr(iterable, '__iter__'), 'Object of type {} is not iterable: {}'.\
-                format(type(iterable), iterable)
-        except Exception as e:
-            logger.debug(f'Iterable {self.iterable} expansion error: {e}')
-            iterable = Request.expand_value_from_context(self.iterable, **context)
+            self._iterable_expr = Expression.compile(iterable)
+        except SyntaxError:
+            # ${...} iterables are expanded as templates
+            self._iterable_expr = None
 
-        response = Response()
+        self._iterable_template = Template.compile(iterable)
 
-        # noinspection DuplicatedCode
-        for item in iterable:
-            if self._should_return:
-                logger.info('Returning from {}'.format(self.name))
-                break
+    def _get_iterable(self, **context):
+        if self._iterable_expr:
+            try:
+                iterable = self._iterable_expr.evaluate(context, globals_=globals())
+                assert hasattr(iterable, '__iter__'), 'Object of type {} is not iterable: {}'.\
+                    format(type(iterable), iterable)
+                return iterable
+            except Exception as e:
+                logger.debug(f'Iterable {self.iterable} expansion error: {e}')
 
-            if self._should_continue:
-                self._should_continue = False
-                logger.info('Continuing loop {}'.format(self.name))
-                continue
+        return self._iterable_template.render(context, globals_=globals())
 
-            if self._should_break:
-                self._should_break = False
-                logger.info('Breaking loop {}'.format(self.name))
-                break
+    def _fork(self, iterable, __stack__=None, **context) -> Response:
+        stop = threading.Event()
+        slots = threading.BoundedSemaphore(self.max_parallel)
+        futures = []
+
+        def run_item(item_stack: list, item_context: dict):
+            try:
+                response = self._run_iteration(item_stack, **item_context)
+                if response is None:
+                    # break or return: don't start any other item
+                    stop.set()
+                return response
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix=self.name) as executor:
+            for item in iterable:
+                slots.acquire()
+                if stop.is_set():
+                    slots.release()
+                    break
+
+                # Each item gets its own frame and its own copy of the context
+                futures.append(executor.submit(run_item, self._push_frame(__stack__),
+                                               {**context, self.iterator_name: item}))
+
+        outputs = []
+        errors = []
+        for future in futures:
+            try:
+                response = future.result()
+            except Exception as e:
+                logger.exception(e)
+                response = Response(errors=[str(e)])
+
+            outputs.append(response.output if response else None)
+            errors.extend(response.errors if response else [])
+
+        return Response(output=outputs, errors=errors)
+
+    def execute(self, _async=None, __stack__=None, **context):
+        iterable = self._get_iterable(**context)
+        if self.fork:
+            return self._fork(iterable, __stack__=__stack__, **context)
+
+        stack = self._push_frame(__stack__)
+        response = Response()
 
+        for item in iterable:
             context[self.iterator_name] = item
-            response = super().execute(**context)
+            iteration_response = self._run_iteration(stack, **context)
+            if iteration_response is None:
+                break
+
+            response = iteration_response
 
         return response
 
@@ -327,67 +548,26 @@ class WhileProcedure(LoopProcedure):
 
     """
 
-    def __init__(self, name, condition, requests, _async=False, args=None, backend=None):
-        super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend)
+    def __init__(self, name, condition, requests, _async=False, args=None, backend=None, id=None):
+        super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend, id=id)
         self.condition = condition
-
-    @staticmethod
-    def _get_context(**context):
-        for (k, v) in context.items():
-            try:
-                context[k] = eval(v)
-            except Exception as e:
-                logger.debug(f'Evaluation error for {v}: {e}')
-                if isinstance(v, str):
-                    # noinspection PyBroadException
-                    try:
-                        context[k] = eval('"{}"'.format(re.sub(r'(^|[^\\])"', '\1\\"', v)))
-                    except Exception as e:
-                        logger.warning('Could not parse value for context variable {}={}'.format(k, v))
-                        logger.warning('Context: {}'.format(context))
-                        logger.exception(e)
-
-        return context
+        self._condition_expr = Expression.compile(condition)
 
     # noinspection DuplicatedCode,PyBroadException
-    def execute(self, _async=None, **context):
+    def execute(self, _async=None, __stack__=None, **context):
+        stack = self._push_frame(__stack__)
         response = Response()
-        context = self._get_context(**context)
-        for k, v in context.items():
-            try:
-                exec('{}={}'.format(k, v))
-            except Exception as e:
-                logger.debug(f'Evaluation error: {k}={v}: {e}')
-
-        while True:
-            condition_true = eval(self.condition)
-            if not condition_true:
-                break
-
-            if self._should_return:
-                logger.info('Returning from {}'.format(self.name))
-                break
-
-            if self._should_continue:
-                self._should_continue = False
-                logger.info('Continuing loop {}'.format(self.name))
-                continue
+        condition_context = dict(context)
 
-            if self._should_break:
-                self._should_break = False
-                logger.info('Breaking loop {}'.format(self.name))
+        while self._condition_expr.evaluate(condition_context, globals_=globals()):
+            iteration_response = self._run_iteration(stack, **context)
+            if iteration_response is None:
                 break
 
-            response = super().execute(**context)
-
-            if response.output:
-                if isinstance(response.output, dict):
-                    new_context = self._get_context(**response.output)
-                    for k, v in new_context.items():
-                        try:
-                            exec('{}={}'.format(k, v))
-                        except Exception as e:
-                            logger.debug(f'Evaluation error: {k}={v}: {e}')
+            response = iteration_response
+            if isinstance(response.output, dict):
+                # The variables returned by the last action are visible to the condition
+                condition_context.update(response.output)
 
         return response
 
@@ -422,12 +602,12 @@ class IfProcedure(Procedure):
         kwargs['_async'] = False
         self.condition = condition
         self.else_branch = else_branch
+        self._condition_expr = Expression.compile(condition)
         reqs = []
 
         for req in requests:
             if isinstance(req, dict):
-                req['origin'] = Config.get('device_id')
-                req['id'] = id
+                req = {**req, 'origin': Config.get('device_id'), 'id': id}
                 if 'target' not in req:
                     req['target'] = req['origin']
 
@@ -435,7 +615,7 @@ class IfProcedure(Procedure):
 
             reqs.append(req)
 
-        super(). __init__(name=name, requests=reqs, args=args, backend=backend, **kwargs)
+        super(). __init__(name=name, requests=reqs, args=args, backend=backend, id=id, **kwargs)
 
     @classmethod
     def build(cls, name, condition, requests, else_branch=None, args=None, backend=None, id=None, **kwargs):
@@ -449,30 +629,225 @@ class IfProcedure(Procedure):
                              else_branch=else_branch, args=args, backend=backend, id=id,
                              **kwargs)
 
-    def execute(self, **context):
-        for (k, v) in context.items():
-            try:
-                exec('{}={}'.format(k, v))
-            except Exception as e:
-                logger.debug(f'Evaluation error: {k}={v}: {e}')
-                if isinstance(v, str):
-                    try:
-                        exec('{}="{}"'.format(k, re.sub(r'(^|[^\\])"', '\1\\"', v)))
-                    except Exception as e:
-                        logger.debug('Could not set context variable {}={}: {}'.format(k, v, str(e)))
-                        logger.debug('Context: {}'.format(context))
-
-        condition_true = eval(self.condition)
+    def execute(self, __stack__=None, **context):
+        condition_true = self._condition_expr.evaluate(context, globals_=globals())
         response = Response()
 
         if condition_true:
-            response = super().execute(**context)
+            response = super().execute(__stack__=__stack__, **context)
         elif self.else_branch:
-            response = self.else_branch.execute(**context)
+            response = self.else_branch.execute(__stack__=__stack__, **context)
 
         return response
 
 
+class DagProcedure(Procedure):
+    """
+    Procedure whose steps are executed as a dependency graph: each step runs as soon as the steps
+    it depends on have completed, and independent steps run in parallel (on at most
+    ``max_parallel`` threads). DAG procedures are declared with the ``procedure.dag.`` prefix.
+
+    The output of a step with a ``name`` is exposed to the other steps as a context variable
+    with the same name. A step depends on:
+
+        - The steps listed in its ``depends_on`` attribute.
+        - The named steps referenced by the ``${...}`` expressions in its action and arguments.
+        - The previous step, if its expressions reference ``output`` or ``errors``.
+
+    Like in sequential procedures, the variables returned by a step in a dictionary are also
+    added to the context, but only of the steps that depend on it. ``if``/``for``/``while``
+    blocks and ``return`` statements are executed once all the previous steps have completed,
+    and the following steps run only after them.
+
+    Example::
+
+        procedure.dag.morning_report:
+            - name: weather
+              action: weather.openweathermap.get_current_weather
+
+            - name: calendar
+              action: calendar.get_upcoming_events
+
+            - name: zigbee
+              action: zigbee.mqtt.devices
+
+            - action: tts.say
+              args:
+                  text: "${weather['summary']}. You have ${len(calendar)} events today."
+
+    """
+
+    _DEFAULT_MAX_PARALLEL = 8
+
+    def __init__(self, name, _async, requests, args=None, backend=None, id=None, step_names=None,
+                 step_dependencies=None, max_parallel=None):
+        super().__init__(name=name, _async=False, requests=requests, args=args, backend=backend, id=id)
+        self.step_names: Dict[int, str] = step_names or {}
+        self.max_parallel = max(1, int(max_parallel or self._DEFAULT_MAX_PARALLEL))
+        self.dependencies = self._get_dependencies(step_dependencies or {})
+
+    @staticmethod
+    def _get_referenced_names(value) -> set:
+        names = set()
+        if isinstance(value, str):
+            if '${' in value:
+                for part in Template.compile(value).parts:
+                    if isinstance(part, tuple):
+                        names.update(part[0].names)
+        elif isinstance(value, dict):
+            for v in value.values():
+                names.update(DagProcedure._get_referenced_names(v))
+        elif isinstance(value, list):
+            for v in value:
+                names.update(DagProcedure._get_referenced_names(v))
+
+        return names
+
+    def _get_dependencies(self, explicit_dependencies: Dict[int, List[str]]) -> List[FrozenSet[int]]:
+        """
+        :return: The indices of the steps each step depends on.
+        """
+        dependencies = []
+        steps_by_name = {}
+        last_barrier = None
+
+        for i, step in enumerate(self.steps):
+            if step.type != _StepType.REQUEST:
+                # Blocks, statements and callables run after all the previous steps
+                dependencies.append(frozenset(range(i)))
+                last_barrier = i
+                continue
+
+            deps = set()
+            if last_barrier is not None:
+                deps.add(last_barrier)
+
+            for dep_name in explicit_dependencies.get(i, []):
+                assert dep_name in steps_by_name, \
+                    'Step {} of {} depends on an unknown or later step: {}'.format(i, self.name, dep_name)
+                deps.add(steps_by_name[dep_name])
+
+            names = self._get_referenced_names(step.target.action) | self._get_referenced_names(step.target.args)
+            deps.update(steps_by_name[name] for name in names if name in steps_by_name)
+            if i > 0 and names.intersection({'output', 'errors'}):
+                deps.add(i - 1)
+
+            dependencies.append(frozenset(deps))
+            if i in self.step_names:
+                steps_by_name[self.step_names[i]] = i
+
+        return dependencies
+
+    def _get_step_context(self, i: int, context: dict, responses: Dict[int, Response]) -> dict:
+        step_context = {**context}
+        deps = sorted(self.dependencies[i])
+
+        for dep in deps:
+            response = responses.get(dep)
+            if not response:
+                continue
+
+            if isinstance(response.output, dict):
+                step_context.update(response.output)
+            if dep in self.step_names:
+                step_context[self.step_names[dep]] = response.output
+
+        if deps and responses.get(deps[-1]):
+            step_context['output'] = responses[deps[-1]].output
+            step_context['errors'] = responses[deps[-1]].errors
+
+        return step_context
+
+    def _run_step(self, i: int, stack: list, token: Optional[str], n_tries: int, **context) -> Response:
+        step = self.steps[i]
+        if step.type == _StepType.CALLABLE:
+            return step.target(**context)
+
+        context['_async'] = False
+        context['n_tries'] = n_tries
+        if step.type == _StepType.PROCEDURE:
+            return step.target.execute(__stack__=stack, **context)
+
+        return self._get_request(step.target, stack, token).execute(__stack__=stack, **context)
+
+    def _execute(self, __stack__, n_tries=1, **context):
+        frame = __stack__[-1]
+        self._expand_args(context)
+
+        token = Config.get('token')
+        responses: Dict[int, Response] = {}
+        pending = {}
+        completed = set()
+        next_step = 0
+        stop = False
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix=self.name) as executor:
+            while next_step < len(self.steps) or pending:
+                # Schedule, in order, the steps whose dependencies have completed
+                for i in range(next_step, len(self.steps)):
+                    if stop or len(pending) >= self.max_parallel:
+                        break
+                    if i in completed or i in pending.values() or not self.dependencies[i] <= completed:
+                        continue
+
+                    step = self.steps[i]
+                    if step.type == _StepType.STATEMENT:
+                        if step.target == Statement.RETURN:
+                            for stack_frame in __stack__:
+                                stack_frame.should_return = True
+                        else:
+                            loop = self._find_nearest_loop(__stack__)
+                            if step.target == Statement.BREAK:
+                                loop.should_break = True
+                            else:
+                                loop.should_continue = True
+
+                        stop = True
+                        break
+
+                    future = executor.submit(self._run_step, i, __stack__, token, n_tries,
+                                             **self._get_step_context(i, context, responses))
+                    pending[future] = i
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = pending.pop(future)
+                    try:
+                        responses[i] = future.result() or Response()
+                    except Exception as e:
+                        logger.exception(e)
+                        responses[i] = Response(errors=[str(e)])
+
+                    completed.add(i)
+
+                while next_step in completed:
+                    next_step += 1
+
+                # Stop scheduling new steps on return, but wait for the running ones
+                stop = stop or frame.should_return
+
+        return responses[max(responses.keys())] if responses else Response()
+
+
+def compile_procedures():
+    """
+    Compile all the procedures in the configuration, so the first call of each
+    procedure doesn't have to pay the compilation cost.
+    """
+    for name, config in Config.get_procedures().items():
+        if is_functional_procedure(config):
+            continue
+
+        try:
+            Procedure.compile(name, config)
+        except Exception as e:
+            logger.warning('Could not compile procedure {}: {}'.format(name, str(e)))
+            logger.exception(e)
+
+
 def procedure(f):
     f.procedure = True
 
@@ -179,13 +179,20 @@ def get_decorators(cls, climb_class_hierarchy=False):
     return decorators
 
 
+def get_redis_queue_name_by_id(msg_id: Optional[str]) -> Optional[str]:
+    """
+    :return: The name of the Redis queue where the response to the message with the given ID is pushed.
+    """
+    return 'platypush/responses/{}'.format(msg_id) if msg_id else None
+
+
 def get_redis_queue_name_by_message(msg):
     from platypush.message import Message
 
     if not isinstance(msg, Message):
         logger.warning('Not a valid message (type: {}): {}'.format(type(msg), msg))
 
-    return 'platypush/responses/{}'.format(msg.id) if msg.id else None
+    return get_redis_queue_name_by_id(msg.id)
 
 
 def _get_ssl_context(context_type=None, ssl_cert=None, ssl_key=None,
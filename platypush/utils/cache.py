@@ -0,0 +1,139 @@
+import copy
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class ActionCacheRule:
+    """
+    Caching metadata of an action.
+    """
+
+    __slots__ = ('ttl', 'key', 'invalidated_by')
+
+    def __init__(self, ttl: float, key: Optional[Iterable[str]] = None,
+                 invalidated_by: Optional[Iterable[str]] = None):
+        """
+        :param ttl: Time-to-live of the cached results, in seconds.
+        :param key: Names of the arguments that identify a cached result (default: all the arguments).
+        :param invalidated_by: Names of the actions of the same plugin that invalidate the cached results.
+        """
+        self.ttl = float(ttl)
+        self.key = tuple(key) if key is not None else None
+        self.invalidated_by = tuple(invalidated_by or ())
+        assert self.ttl > 0, 'The cache TTL should be a positive number of seconds'
+
+    @classmethod
+    def build(cls, rule) -> 'ActionCacheRule':
+        """
+        Build a rule either from a TTL or from a ``{"ttl": ..., "key": [...], "invalidated_by": [...]}``
+        dictionary.
+        """
+        if isinstance(rule, cls):
+            return rule
+        if isinstance(rule, dict):
+            return cls(**rule)
+        return cls(ttl=rule)
+
+    def get_key(self, args: Dict[str, Any]) -> Hashable:
+        if self.key is not None:
+            args = {name: args.get(name) for name in self.key}
+        return json.dumps(args, sort_keys=True, default=str)
+
+
+class ActionCache:
+    """
+    Bounded LRU store for the results of the actions of a plugin, with per-entry
+    expiration, hit/miss counters and explicit invalidation.
+
+    Each action also has a generation counter, increased whenever its results are
+    invalidated: a result computed while the cache was being invalidated (e.g. a
+    read that raced with a write action) is not stored.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max(1, int(max_size))
+        # (action, key) -> (expiry time, output)
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_generation(self, action: str) -> Tuple[int, int]:
+        return self._global_generation, self._generations.get(action, 0)
+
+    def get(self, action: str, key: Hashable) -> Tuple[bool, Any]:
+        """
+        :return: A ``(hit, output)`` tuple. The output is a copy of the cached one,
+            so callers are free to change it.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((action, key))
+            if entry and entry[0] > now:
+                self._entries.move_to_end((action, key))
+                self.hits += 1
+                output = entry[1]
+            else:
+                if entry:
+                    del self._entries[(action, key)]
+                self.misses += 1
+                return False, None
+
+        return True, copy.deepcopy(output)
+
+    def put(self, action: str, key: Hashable, output, ttl: float, generation: Optional[Tuple[int, int]] = None):
+        """
+        Store the output of an action.
+
+        :param generation: Generation of the action when the output was computed. If the
+            action has been invalidated in the meantime, the output is discarded.
+        """
+        output = copy.deepcopy(output)
+        with self._lock:
+            if generation is not None and generation != self.get_generation(action):
+                return
+
+            self._entries[(action, key)] = (time.time() + ttl, output)
+            self._entries.move_to_end((action, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *actions: str):
+        """
+        Invalidate the cached results of the specified actions, or all the cached results
+        if no actions are specified.
+        """
+        with self._lock:
+            if not actions:
+                self._entries.clear()
+                self._global_generation += 1
+            else:
+                for entry_key in [k for k in self._entries.keys() if k[0] in actions]:
+                    del self._entries[entry_key]
+                for action in actions:
+                    self._generations[action] = self._generations.get(action, 0) + 1
+
+            self.invalidations += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,73 @@
+import threading
+
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first call is executed, and the calls
+    with the same key received while it's in flight wait for it and get the same result (or
+    exception). Results are never stored once the call has completed - see
+    :class:`platypush.utils.cache.ActionCache` for that.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.collapsed = 0
+
+    def run(self, key: Hashable, f: Callable, *args, **kwargs) -> Tuple[object, bool]:
+        """
+        Run ``f(*args, **kwargs)``, unless a call with the same key is already in flight.
+
+        :return: A ``(result, shared)`` tuple, where ``shared`` is True if the result comes from
+            a call started by another caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call:
+                self.collapsed += 1
+                owner = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                owner = True
+
+        if not owner:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = f(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'collapsed': self.collapsed,
+            }
+
+
+# vim:sw=4:ts=4:et:
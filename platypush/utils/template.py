@@ -0,0 +1,207 @@
+import ast
+import builtins
+import copy
+import datetime
+import functools
+import json
+import logging
+import random
+import re
+import time
+
+from types import CodeType
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+logger = logging.getLogger('platypush:template')
+
+_expr_regex = re.compile(r'\${\s*(.+?)\s*}')
+
+# Characters a JSON document can start with
+_json_start = frozenset('{["-0123456789tfnNI')
+
+# Modules that are always available to the expressions
+_default_globals = {
+    module.__name__: module
+    for module in [copy, datetime, json, logging, random, re, time]
+}
+
+
+def _get_names(code: CodeType) -> FrozenSet[str]:
+    """
+    :return: The names referenced by a code object, including the ones referenced by
+        its nested code objects (e.g. comprehensions and lambdas).
+    """
+    names = set(code.co_names) | set(code.co_varnames) | set(code.co_freevars)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names.update(_get_names(const))
+    return frozenset(names)
+
+
+def to_context_value(value):
+    """
+    Convert a context variable to the value exposed to the expressions: messages
+    are exposed as dictionaries, and strings that contain a Python literal (e.g.
+    ``42`` or ``[1, 2]``) are exposed as the parsed value.
+    """
+    from platypush.message import Message
+
+    if isinstance(value, Message):
+        return json.loads(str(value))
+
+    if isinstance(value, str):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            return value
+
+    return value
+
+
+class Expression:
+    """
+    A Python expression compiled once and evaluated against a namespace that
+    contains only the context variables it references.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.code = compile(source, '<expression>', 'eval')
+        self.names = _get_names(self.code)
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def compile(cls, source: str) -> 'Expression':
+        """
+        :return: The compiled expression (cached).
+        :raises SyntaxError: If the expression is not valid.
+        """
+        return cls(source)
+
+    def build_namespace(self, context: Optional[Dict[str, Any]] = None,
+                        globals_: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        context = context or {}
+        globals_ = globals_ or {}
+        namespace = {'__builtins__': builtins}
+
+        for name in self.names:
+            if name in context:
+                namespace[name] = to_context_value(context[name])
+            elif name in globals_:
+                namespace[name] = globals_[name]
+            elif name in _default_globals:
+                namespace[name] = _default_globals[name]
+            elif name == 'context':
+                namespace[name] = context
+
+        return namespace
+
+    def evaluate(self, context: Optional[Dict[str, Any]] = None, globals_: Optional[Dict[str, Any]] = None):
+        """
+        Evaluate the expression.
+
+        :param context: Context variables.
+        :param globals_: Additional names (e.g. modules) exposed to the expression, with lower
+            precedence than the context variables.
+        """
+        return eval(self.code, self.build_namespace(context, globals_))
+
+
+class Template:
+    """
+    A string with ``${...}`` expressions, parsed once into literal parts and compiled
+    :class:`Expression` objects. ``${`` sequences preceded by a backslash are not expanded.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        # Literal strings and (expression, source text) tuples
+        self.parts: List[Union[str, Tuple[Expression, str]]] = []
+        pos = 0
+
+        for m in _expr_regex.finditer(text):
+            if m.start() > 0 and text[m.start() - 1] == '\\':
+                continue
+
+            if m.start() > pos:
+                self.parts.append(text[pos:m.start()])
+
+            try:
+                self.parts.append((Expression.compile(m.group(1)), m.group(0)))
+            except SyntaxError as e:
+                logger.warning('Invalid expression {}: {}'.format(m.group(0), str(e)))
+                self.parts.append(m.group(0))
+
+            pos = m.end()
+
+        if pos < len(text):
+            self.parts.append(text[pos:])
+
+        self.has_expressions = any(isinstance(part, tuple) for part in self.parts)
+
+    @classmethod
+    def compile(cls, text: str) -> 'Template':
+        """
+        :return: The compiled template. Templates are cached, except for the strings
+            that contain no expressions, which are never compiled.
+        """
+        if '${' not in text:
+            return cls(text)
+        return cls._compile(text)
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _compile(cls, text: str) -> 'Template':
+        return cls(text)
+
+    @staticmethod
+    def _to_str(value) -> str:
+        if callable(value):
+            value = value()
+        if isinstance(value, (range, tuple)):
+            value = [*value]
+        if isinstance(value, datetime.date):
+            value = value.isoformat()
+
+        return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+
+    def render(self, context: Optional[Dict[str, Any]] = None, globals_: Optional[Dict[str, Any]] = None):
+        """
+        Expand the expressions of the template against a context.
+
+        :param context: Context variables.
+        :param globals_: Additional names (e.g. modules) exposed to the expressions.
+        :return: The expanded string or, if it's valid JSON, the parsed value (e.g. ``42`` or
+            ``true``), also for the strings with no expressions.
+        """
+        if not self.has_expressions:
+            return self._parse(self.text)
+
+        rendered = ''
+        for part in self.parts:
+            if isinstance(part, str):
+                rendered += part
+                continue
+
+            expr, source = part
+            try:
+                rendered += self._to_str(expr.evaluate(context, globals_))
+            except Exception as e:
+                logger.exception(e)
+                rendered += source
+
+        return self._parse(rendered)
+
+    @staticmethod
+    def _parse(text: str):
+        # Skip the JSON parser on the strings that can't be JSON (e.g. plain words)
+        if not text or text.lstrip()[:1] not in _json_start:
+            return text
+
+        try:
+            return json.loads(text)
+        except (ValueError, TypeError):
+            return text
+
+
+# vim:sw=4:ts=4:et:
@@ -84,6 +84,8 @@ setup(
         'mqtt': ['paho-mqtt'],
         # Support for RSS feeds parser
         'rss': ['feedparser'],
+        # Support for faster JSON and binary message codecs
+        'codecs': ['orjson', 'msgpack'],
         # Support for PDF generation
         'pdf': ['weasyprint'],
         # Support for Philips Hue plugin
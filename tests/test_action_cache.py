@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from platypush.plugins import Plugin, action
+
+
+class CachedCounterPlugin(Plugin):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.values = {}
+
+    @action(cache_ttl=60, cache_key=['name'])
+    def get(self, name, unused=None):
+        self.calls += 1
+        return {'value': self.values.get(name, 0)}
+
+    @action(invalidates=['get'])
+    def set(self, name, value):
+        self.values[name] = value
+
+    @action
+    def count(self):
+        self.calls += 1
+        return self.calls
+
+    @action(single_flight=True)
+    def slow_count(self, delay):
+        time.sleep(delay)
+        return self.count().output
+
+
+def test_action_registry():
+    """
+    The actions of a plugin class should be registered when the class is defined, including the inherited ones.
+    """
+    class ExtendedCounterPlugin(CachedCounterPlugin):
+        @action
+        def reset(self):
+            self.calls = 0
+
+        def helper(self):
+            pass
+
+    assert CachedCounterPlugin.get_action_names() == {'get', 'set', 'count', 'slow_count'}
+    assert ExtendedCounterPlugin.get_action_names() == {'get', 'set', 'count', 'slow_count', 'reset'}
+
+    plugin = ExtendedCounterPlugin()
+    assert plugin.run('count').output == 1
+    with pytest.raises(AssertionError):
+        plugin.run('helper')
+
+
+def test_action_cache():
+    """
+    The results of the cached actions should be reused until they expire or until a write action invalidates them.
+    """
+    plugin = CachedCounterPlugin()
+    assert plugin.get('a').output == {'value': 0}
+    assert plugin.get('a', unused=1).output == {'value': 0}
+    assert plugin.calls == 1, 'The cached result was not reused'
+
+    # The cached results are copied, so the callers can't alter them
+    plugin.get('a').output['value'] = 42
+    assert plugin.get('a').output == {'value': 0}
+
+    plugin.get('b')
+    assert plugin.calls == 2
+
+    plugin.set('a', 1)
+    assert plugin.get('a').output == {'value': 1}
+    assert plugin.calls == 3, 'The write action did not invalidate the cached results'
+
+    stats = plugin.get_cache_stats()
+    assert stats['hits'] == 3
+    assert stats['misses'] == 3
+
+
+def test_action_cache_config():
+    """
+    The caching rules configured on a plugin should apply to actions that don't declare them.
+    """
+    plugin = CachedCounterPlugin(action_cache={'count': {'ttl': 60, 'invalidated_by': ['set']}})
+    assert plugin.count().output == 1
+    assert plugin.count().output == 1
+
+    plugin.set('a', 1)
+    assert plugin.count().output == 2
+
+    plugin.invalidate_cache()
+    assert plugin.count().output == 3
+
+
+def test_single_flight():
+    """
+    Concurrent calls to a single-flight action with the same arguments should share one execution.
+    """
+    plugin = CachedCounterPlugin()
+    responses = []
+
+    def call():
+        responses.append(plugin.run('slow_count', delay=0.2))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.output for response in responses] == [1] * 5
+    assert len({id(response) for response in responses}) == 5, 'Each caller should get its own response'
+
+    stats = plugin.get_single_flight_stats()
+    assert stats['executions'] == 1
+    assert stats['collapsed'] == 4
+
+    # Calls made once the previous one has completed are executed again
+    assert plugin.run('slow_count', delay=0).output == 2
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
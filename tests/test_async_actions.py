@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import platypush.message.request
+from platypush import Daemon
+from platypush.bus import Bus
+from platypush.bus.dispatcher import Dispatcher
+from platypush.context import get_async_loop, plugins, run_async
+from platypush.message.request import Request
+from platypush.plugins import Plugin, action
+
+
+class AsyncSleepPlugin(Plugin):
+    @action
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+        return threading.current_thread().name
+
+    @action
+    def sync_sleep(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+
+def test_async_action_sync_call():
+    """
+    Synchronous callers of an asyncio action should get its response once executed on the shared event loop.
+    """
+    plugin = AsyncSleepPlugin()
+    assert plugin.is_async_action('sleep')
+    assert not plugin.is_async_action('sync_sleep')
+
+    response = plugin.sleep(0)
+    assert not response.errors
+    assert response.output == 'platypush:async'
+
+
+def test_async_action_concurrency():
+    """
+    Concurrent calls to asyncio actions should be executed on the shared event loop without blocking each other.
+    """
+    plugin = AsyncSleepPlugin()
+
+    async def run():
+        return await asyncio.gather(*[plugin.run_async('sleep', seconds=0.2) for _ in range(100)],
+                                    plugin.run_async('sync_sleep', seconds=0.2))
+
+    start_time = time.time()
+    responses = asyncio.run_coroutine_threadsafe(run(), get_async_loop()).result()
+    assert time.time() - start_time < 1
+    assert [response.output for response in responses] == ['platypush:async'] * 100 + [0.2]
+
+
+def test_blocking_call_on_event_loop():
+    """
+    Blocking calls from the shared event loop should be rejected, as they would deadlock it.
+    """
+    async def blocking_call():
+        return run_async(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run_coroutine_threadsafe(blocking_call(), get_async_loop()).result()
+
+
+def test_async_action_errors_are_logged(monkeypatch, caplog):
+    """
+    Errors raised while scheduling an asyncio action on the event loop should be logged.
+    """
+    def get_plugin(*_, **__):
+        raise RuntimeError('Plugin initialization failed')
+
+    monkeypatch.setattr(Request, 'is_async_action', lambda *_, **__: True)
+    monkeypatch.setattr(platypush.message.request, 'get_plugin', get_plugin)
+
+    Request(target='localhost', action='async_sleep.sleep', args={'seconds': 0}).execute()
+    for _ in range(20):
+        if 'Plugin initialization failed' in caplog.text:
+            break
+        time.sleep(0.05)
+
+    assert 'Plugin initialization failed' in caplog.text, 'The error of the asyncio action was not logged'
+
+
+def test_async_actions_from_the_bus(monkeypatch):
+    """
+    Requests to asyncio actions received on the bus should be awaited on the shared event loop,
+    without holding a dispatcher worker each.
+    """
+    monkeypatch.setitem(plugins, 'async_sleep', AsyncSleepPlugin())
+    daemon = Daemon.__new__(Daemon)
+    daemon.processed_requests = 0
+    daemon.requests_to_process = None
+
+    dispatcher = Dispatcher(pool_size=2, name='AsyncTestDispatcher')
+    bus = Bus(on_message=daemon.on_message(), dispatcher=dispatcher)
+    acked = []
+    bus.ack = acked.append
+
+    n_requests = 10
+    for i in range(n_requests):
+        bus.post(Request(target='localhost', action='async_sleep.sleep', args={'seconds': 0.3},
+                         id='async-{}'.format(i)))
+
+    start_time = time.time()
+    poller = threading.Thread(target=bus.poll)
+    poller.start()
+    while len(acked) < n_requests and time.time() - start_time < 5:
+        time.sleep(0.02)
+
+    elapsed = time.time() - start_time
+    bus.stop()
+    poller.join(1)
+    dispatcher.stop()
+
+    assert len(acked) == n_requests, 'Not all the requests were acknowledged'
+    assert elapsed < 1, 'The asyncio actions held the dispatcher workers'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,35 @@
+import pytest
+
+from platypush.bus.lanes import PriorityLanes
+from platypush.message.event.sensor import SensorDataChangeEvent
+from platypush.message.request import Request
+
+
+def test_requests_are_not_starved_by_events():
+    """
+    A request queued after a storm of background events should be picked up first.
+    """
+    lanes = PriorityLanes()
+    for i in range(100):
+        lanes.put(SensorDataChangeEvent(data={'value': i}))
+
+    lanes.put(Request(target='localhost', action='shell.exec', args={'cmd': 'true'}))
+    assert isinstance(lanes.get(timeout=0.1), Request)
+
+    values = [lanes.get(timeout=0.1).data['value'] for _ in range(100)]
+    assert values == list(range(100)), 'Messages on the same lane should be delivered in FIFO order'
+
+
+def test_priority_override():
+    """
+    The priority configured for an event type should override the one declared by its class.
+    """
+    lanes = PriorityLanes(priorities={'platypush.message.event.sensor.SensorDataChangeEvent': 'request'})
+    assert lanes.get_lane(SensorDataChangeEvent(data=1)) == 'request'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
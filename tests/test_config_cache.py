@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+import yaml
+
+from platypush.config.cache import ConfigFileCache
+
+
+@pytest.fixture
+def config_files(tmp_path):
+    files = {
+        name: str(tmp_path / name)
+        for name in ('config.yaml', 'hooks.yaml')
+    }
+
+    with open(files['config.yaml'], 'w') as f:
+        f.write('include: hooks.yaml\nlogging:\n  level: info\n')
+    with open(files['hooks.yaml'], 'w') as f:
+        f.write('event.hook.OnPing:\n  if:\n    type: platypush.message.event.ping.PingEvent\n')
+
+    # Move the modification times out of the window where they can't be trusted
+    for file in files.values():
+        os.utime(file, (time.time() - 10, time.time() - 10))
+
+    yield files
+
+
+def test_config_file_cache(config_files, tmp_path):
+    """
+    Only the files that have changed should be parsed again, and the parsed files should be shared through the snapshot.
+    """
+    parsed = []
+
+    def parse(content):
+        parsed.append(content)
+        return yaml.safe_load(content)
+
+    cache_file = str(tmp_path / 'config.cache')
+    cache = ConfigFileCache(cache_file)
+    config = cache.load(config_files['config.yaml'], parse)
+    cache.load(config_files['hooks.yaml'], parse)
+    cache.save()
+    assert len(parsed) == 2
+
+    config['logging']['level'] = 'debug'
+    assert cache.load(config_files['config.yaml'], parse)['logging']['level'] == 'info', \
+        'The cached files should not be modified by the callers'
+
+    # A new process should reuse the snapshot
+    cache = ConfigFileCache(cache_file)
+    cache.load(config_files['config.yaml'], parse)
+    cache.load(config_files['hooks.yaml'], parse)
+    assert len(parsed) == 2
+    assert cache.get_stats() == {'files': 2, 'hits': 2, 'misses': 0}
+
+    # Only the modified file should be parsed again
+    with open(config_files['hooks.yaml'], 'a') as f:
+        f.write('  then:\n    action: shell.exec\n')
+
+    cache.load(config_files['config.yaml'], parse)
+    hooks = cache.load(config_files['hooks.yaml'], parse)
+    assert len(parsed) == 3
+    assert hooks['event.hook.OnPing']['then'] == {'action': 'shell.exec'}
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
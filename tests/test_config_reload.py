@@ -0,0 +1,96 @@
+import pytest
+
+import platypush.config
+from platypush.config import Config
+from platypush.cron.scheduler import CronScheduler
+from platypush.event.processor import EventProcessor
+from platypush.message.event.ping import PingEvent
+
+config_template = '''
+event.hook.OnPing:
+    if:
+        type: platypush.message.event.ping.PingEvent
+    then:
+        action: shell.exec
+        args:
+            cmd: echo ping
+
+event.hook.OnHostUp:
+    if:
+        type: platypush.message.event.ping.HostUpEvent
+    then:
+        action: shell.exec
+        args:
+            cmd: echo {host_up_cmd}
+
+procedure.unchanged_procedure:
+    - action: shell.exec
+      args:
+          cmd: echo unchanged
+
+procedure.changed_procedure:
+    - action: shell.exec
+      args:
+          cmd: echo {procedure_cmd}
+
+cron.TestCron:
+    cron_expression: '{cron_expression}'
+    actions:
+        - action: shell.exec
+          args:
+              cmd: echo cron
+'''
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    config_instance = platypush.config._default_config_instance
+    config_file = str(tmp_path / 'config.yaml')
+    with open(config_file, 'w') as f:
+        f.write(config_template.format(host_up_cmd='up', procedure_cmd='v1', cron_expression='0 * * * *'))
+
+    Config.init(config_file)
+    yield config_file
+    platypush.config._default_config_instance = config_instance
+
+
+def test_config_reload(config_file):
+    """
+    Only the hooks, procedures and cronjobs that have changed should be swapped when the configuration is reloaded.
+    """
+    processor = EventProcessor()
+    scheduler = CronScheduler(jobs=Config.get_cronjobs())
+    hooks = {hook.name: hook for hook in processor.hooks}
+    procedures = Config.get_procedures()
+    cronjob = scheduler.get_jobs()['TestCron']
+
+    with open(config_file, 'w') as f:
+        f.write(config_template.format(host_up_cmd='host up', procedure_cmd='v2', cron_expression='*/5 * * * *')
+                .replace('OnPing', 'OnPong'))
+
+    changes = Config.reload()
+    assert set(changes['event_hooks']['changed']) == {'OnPong', 'OnHostUp'}
+    assert changes['event_hooks']['removed'] == ['OnPing']
+    assert set(changes['procedures']['changed']) == {'changed_procedure'}
+    assert set(changes['cronjobs']['changed']) == {'TestCron'}
+
+    processor.reload_hooks(**changes['event_hooks'])
+    new_hooks = {hook.name: hook for hook in processor.hooks}
+    assert set(new_hooks.keys()) == {'OnPong', 'OnHostUp'} | (set(hooks.keys()) - {'OnPing', 'OnHostUp'})
+    assert new_hooks['OnHostUp'] is not hooks['OnHostUp']
+    assert [hook.name for hook in processor.index.get_candidates(PingEvent(message='pong'))] == ['OnPong']
+
+    assert Config.get_procedures()['unchanged_procedure'] is procedures['unchanged_procedure'], \
+        'Unchanged procedures should keep their compiled versions'
+    assert Config.get_procedures()['changed_procedure']['actions'][0]['args']['cmd'] == 'echo v2'
+
+    scheduler.update_jobs(**changes['cronjobs'])
+    assert scheduler.get_jobs()['TestCron'] is not cronjob
+    assert scheduler.get_jobs()['TestCron'].cron_expression == '*/5 * * * *'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,86 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+from platypush.cron import cron
+from platypush.cron.scheduler import Cronjob, CronScheduler
+
+
+def _build_job(runs: list):
+    @cron('* * * * * *')
+    def job(**_):
+        runs.append(time.time())
+
+    return job
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = CronScheduler(jobs={}, max_concurrent_jobs=2)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_cron_scheduler_jobs(scheduler):
+    """
+    Jobs added at runtime should run on their schedule without a thread per job, and removed jobs
+    should not run anymore.
+    """
+    n_threads = threading.active_count()
+    runs = {name: [] for name in ('job_1', 'job_2')}
+    for name, job_runs in runs.items():
+        scheduler.add_job(name, _build_job(job_runs))
+
+    time.sleep(2.5)
+    assert all(len(job_runs) >= 2 for job_runs in runs.values())
+    assert threading.active_count() - n_threads <= 2, 'The jobs should run on the shared workers'
+
+    scheduler.remove_job('job_1')
+    n_runs = len(runs['job_1'])
+    time.sleep(1.5)
+    assert len(runs['job_1']) == n_runs, 'Removed jobs should not run anymore'
+    assert len(runs['job_2']) >= 3
+
+
+def test_cron_jitter():
+    """
+    Jobs with the same schedule should be spread over the jitter window, with offsets that only depend on their names.
+    """
+    offsets = [Cronjob(name='job_{}'.format(i), cron_expression='*/5 * * * *', actions=[], jitter=60).offset
+               for i in range(10)]
+
+    assert all(0 <= offset < 60 for offset in offsets)
+    assert len(set(offsets)) == len(offsets)
+    assert Cronjob(name='job_0', cron_expression='0 * * * *', actions=[], jitter=60).offset == offsets[0]
+
+
+@pytest.mark.parametrize('policy', ['skip', 'run_once', 'catch_up'])
+def test_cron_missed_runs(policy):
+    """
+    Runs later than the grace time should be skipped, run once or caught up depending on the missed runs policy.
+    """
+    job = Cronjob(name='test_job', cron_expression='* * * * * *', actions=[], missed_runs=policy, grace_time=1)
+    job.get_next_run()
+
+    # Simulate a suspend of 10 seconds
+    job._cron.set_current(datetime.datetime.fromtimestamp(job.next_run - 10).astimezone())
+    job.next_run -= 10
+    assert job.should_run(time.time()) == (policy != 'skip')
+    assert job.missed == 1
+    assert job.get_stats()['max_lateness'] >= 9
+
+    next_run = job.get_next_run()
+    if policy == 'catch_up':
+        assert next_run < time.time() - 5, 'The missed runs should be scheduled'
+    else:
+        assert next_run > time.time(), 'The missed runs should not be scheduled'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
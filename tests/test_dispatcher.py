@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from platypush.bus import Bus
+from platypush.bus.dispatcher import Dispatcher, DispatcherFullError
+from platypush.message.event import Event
+
+
+def test_dispatcher_concurrency_cap():
+    """
+    Tasks submitted with the same key should never run above the configured concurrency cap.
+    """
+    dispatcher = Dispatcher(pool_size=4, queue_size=10, concurrency={'light.hue': 1})
+    lock = threading.Lock()
+    running = set()
+    max_running = 0
+
+    def task(i):
+        nonlocal max_running
+        with lock:
+            running.add(i)
+            max_running = max(max_running, len(running))
+
+        time.sleep(0.05)
+        with lock:
+            running.remove(i)
+
+    for i in range(5):
+        dispatcher.submit(task, i, key='light.hue')
+
+    time.sleep(0.5)
+    stats = dispatcher.get_stats()
+    dispatcher.stop()
+
+    assert max_running == 1, 'The per-key concurrency cap was not enforced'
+    assert stats['completed'] == 5
+
+
+def test_dispatcher_reject_policy():
+    """
+    A full queue with ``reject`` overflow policy should raise :class:`DispatcherFullError`.
+    """
+    dispatcher = Dispatcher(pool_size=1, queue_size=1, overflow_policy='reject')
+    dispatcher.submit(time.sleep, 0.2)
+    time.sleep(0.05)
+    dispatcher.submit(time.sleep, 0.1)
+
+    with pytest.raises(DispatcherFullError):
+        dispatcher.submit(time.sleep, 0.1)
+
+    assert dispatcher.get_stats()['rejected'] == 1
+    dispatcher.stop()
+
+
+def test_bus_poll_reject_policy():
+    """
+    Messages rejected by a full dispatcher should be acknowledged and dropped, without
+    stopping the bus.
+    """
+    dispatcher = Dispatcher(pool_size=1, queue_size=1, overflow_policy='reject')
+    processed = []
+    acked = []
+
+    bus = Bus(on_message=lambda msg: (time.sleep(0.1), processed.append(msg)), dispatcher=dispatcher)
+    bus.ack = acked.append
+    # Let the messages through as if other submitters filled the queue after the check
+    dispatcher.wait_for_slot = lambda *_, **__: True
+
+    for i in range(5):
+        bus.post(Event(target='test', origin='test', id='poll-test-{}'.format(i), value=i))
+
+    errors = []
+    poller = threading.Thread(target=lambda: errors.extend(_poll(bus)))
+    poller.start()
+    time.sleep(0.5)
+    bus.stop()
+    poller.join(1)
+    dispatcher.stop()
+
+    assert not errors, 'The bus stopped polling on a rejected message'
+    assert dispatcher.get_stats()['rejected'] > 0
+    assert len(acked) == 5, 'The rejected messages were not acknowledged'
+    assert len(processed) < 5
+
+
+def _poll(bus):
+    try:
+        bus.poll()
+    except Exception as e:
+        return [e]
+    return []
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from platypush.event.processor.coalescer import EventCoalescer
+from platypush.message.event.sensor import SensorDataChangeEvent
+
+
+def test_event_coalescing():
+    """
+    At most one event per key should be processed within a window, and the last state should
+    be processed when the window expires.
+    """
+    processed = []
+    coalescer = EventCoalescer(rules={
+        'platypush.message.event.sensor.SensorDataChangeEvent': {
+            'window': 0.2,
+            'key': ['source'],
+            'mode': 'merge',
+        },
+    }, on_event=processed.append)
+
+    assert coalescer.coalesce(SensorDataChangeEvent(data={'temperature': 20}, source='sensor-1'))
+    assert coalescer.coalesce(SensorDataChangeEvent(data={'temperature': 18}, source='sensor-2'))
+
+    for i in range(10):
+        assert not coalescer.coalesce(SensorDataChangeEvent(data={'temperature': 21 + i}, source='sensor-1'))
+
+    assert not coalescer.coalesce(SensorDataChangeEvent(data={'temperature': 30}, source='sensor-1', unit='C'))
+    time.sleep(0.3)
+
+    assert len(processed) == 1, 'Only the coalesced event of sensor-1 should be processed on window expiry'
+    assert processed[0].args['data'] == {'temperature': 30}
+    assert processed[0].args['source'] == 'sensor-1'
+    assert processed[0].args['unit'] == 'C'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -1,6 +1,7 @@
 import pytest
 
 from platypush.event.hook import EventCondition
+from platypush.message.event import PhraseMatcher
 from platypush.message.event.ping import PingEvent
 
 
@@ -27,6 +28,37 @@ def test_event_parse():
     assert not result.is_match
 
 
+def test_event_serialization_cache():
+    """
+    The serialized representation of an event should be computed once, and invalidated when the event changes.
+    """
+    event = PingEvent(message='ping')
+    serialized = str(event)
+    assert str(event) is serialized
+    assert event.serialize() == serialized.encode()
+
+    event.args = {**event.args, 'message': 'pong'}
+    assert '"pong"' in str(event)
+
+
+def test_phrase_matcher():
+    """
+    Condition phrases should be compiled once, and event values missing their literal tokens should be rejected.
+    """
+    matcher = condition.matchers['message']
+    assert matcher is PhraseMatcher.compile(condition.args['message'])
+    assert 'answer:' in matcher.literals and '${answer}' not in matcher.literals
+    assert not matcher.may_match('garbage')
+
+    result = PingEvent(message='Turn on the living room lights').matches_condition(EventCondition.build({
+        'type': 'platypush.message.event.ping.PingEvent',
+        'message': 'turn (on|off) the ${lights} lights',
+    }))
+
+    assert result.is_match
+    assert result.parsed_args['lights'] == 'living room'
+
+
 if __name__ == '__main__':
     pytest.main()
 
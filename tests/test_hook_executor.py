@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from platypush.event.executor import ConcurrencyPolicy, HookExecutor
+
+
+class SleepHook:
+    """
+    Minimal hook that records its concurrent runs.
+    """
+
+    def __init__(self, name, max_concurrency=None, concurrency_policy=None, duration=0.1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.concurrency_policy = concurrency_policy
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.events = []
+
+    def execute(self, event, **_):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        time.sleep(self.duration)
+        with self.lock:
+            self.running -= 1
+            self.events.append(event)
+
+
+def _run_hook(hook, n_events, timeout=2.0, **kwargs):
+    executor = HookExecutor(**{'pool_size': 8, **kwargs})
+    for i in range(n_events):
+        executor.submit(hook, i)
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = executor.get_stats(hook.name)['hooks'][hook.name]
+        if not stats['running'] and not stats['pending']:
+            break
+        time.sleep(0.05)
+
+    executor.dispatcher.stop()
+    return stats
+
+
+@pytest.mark.parametrize('policy', ['queue', 'drop', 'replace'])
+def test_hook_executor_policies(policy):
+    """
+    Hooks should never run above their maximum concurrency, and the runs exceeding it should be
+    queued, dropped or replaced depending on the concurrency policy.
+    """
+    hook = SleepHook('test_hook', max_concurrency=1, concurrency_policy=ConcurrencyPolicy(policy))
+    stats = _run_hook(hook, 5)
+    assert hook.max_running == 1
+
+    if policy == 'queue':
+        assert hook.events == [0, 1, 2, 3, 4]
+        assert stats['max_wait_time'] >= 0.3, 'The queue wait times were not recorded'
+    elif policy == 'drop':
+        assert hook.events == [0]
+        assert stats['dropped'] == 4
+    else:
+        assert hook.events == [0, 4], 'Only the latest queued run should be executed'
+        assert stats['replaced'] == 3
+
+    assert stats['runs'] == len(hook.events)
+    assert stats['max_exec_time'] >= hook.duration
+
+
+def test_hook_executor_unlimited():
+    """
+    Hooks with no maximum concurrency should run concurrently on the shared workers.
+    """
+    hook = SleepHook('test_unlimited_hook', duration=0.2)
+    start_time = time.time()
+    _run_hook(hook, 8)
+
+    assert len(hook.events) == 8
+    assert hook.max_running > 1
+    assert time.time() - start_time < 1
+
+
+def test_hook_executor_hand_off_on_full_pool():
+    """
+    Queued runs should be handed over to the next run without going through the workers
+    queue, so a full queue can't block the workers.
+    """
+    hook = SleepHook('test_hand_off_hook', max_concurrency=1, duration=0.02)
+    stats = _run_hook(hook, 20, pool_size=1, queue_size=1, overflow_policy='block')
+
+    assert hook.events == list(range(20))
+    assert stats['runs'] == 20 and not stats['dropped']
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,81 @@
+import pytest
+
+from platypush.event.hook import EventHook
+from platypush.event.processor.index import HookIndex
+from platypush.message.event import Event
+from platypush.message.event.button.flic import FlicButtonEvent
+from platypush.message.event.ping import HostUpEvent, PingEvent
+
+
+def _build_hook(name, condition):
+    return EventHook.build(name=name, hook={
+        'if': condition,
+        'then': [{'action': 'shell.exec', 'args': {'cmd': 'echo ' + name}}],
+    })
+
+
+@pytest.fixture
+def hooks():
+    yield [
+        _build_hook('on_any_event', {'type': 'platypush.message.event.Event'}),
+        _build_hook('on_kitchen', {'type': 'platypush.message.event.ping.PingEvent', 'message': 'kitch'}),
+        _build_hook('on_lights', {'type': 'platypush.message.event.ping.PingEvent',
+                                  'message': 'turn on the ${what}'}),
+        _build_hook('on_regex', {'type': 'platypush.message.event.ping.PingEvent', 'message': 'hel+o'}),
+        _build_hook('on_host_up', {'type': 'platypush.message.event.ping.HostUpEvent', 'host': 'localhost'}),
+        _build_hook('on_flic', {'type': 'platypush.message.event.button.flic.FlicButtonEvent',
+                                'btn_addr': '00:11:22:33:44:55', 'sequence': ['ShortPressEvent']}),
+    ]
+
+
+def _get_matches(hooks, event):
+    return sorted(hook.name for hook in hooks if hook.matches_event(event).is_match)
+
+
+def test_hook_index_candidates(hooks):
+    """
+    The index should discard the hooks registered on other event classes and the ones whose literal
+    conditions certainly don't match.
+    """
+    index = HookIndex(hooks)
+    candidates = {hook.name for hook in index.get_candidates(PingEvent(message='nothing to see here'))}
+    assert 'on_any_event' in candidates
+    assert 'on_regex' in candidates, 'Conditions with regular expressions should always be evaluated'
+    assert not candidates.intersection({'on_kitchen', 'on_lights', 'on_host_up', 'on_flic'})
+
+    candidates = {hook.name for hook in index.get_candidates(HostUpEvent(host='localhost'))}
+    assert candidates == {'on_any_event', 'on_host_up'}
+
+
+def test_hook_index_matches(hooks):
+    """
+    The hooks matching an event through the index should be the same as the ones matched by a linear scan.
+    """
+    index = HookIndex(hooks)
+    events = [
+        PingEvent(message='kitchen'),
+        PingEvent(message='Turn on the lights'),
+        PingEvent(message='hellllo'),
+        PingEvent(message=42),
+        PingEvent(message=None),
+        PingEvent(),
+        HostUpEvent(host='localhost'),
+        HostUpEvent(host='example.org'),
+        Event(),
+    ]
+
+    for event in events:
+        assert _get_matches(index.get_candidates(event), event) == _get_matches(hooks, event), \
+            'Mismatching hooks for {}'.format(event)
+
+    # Flic button sequences are matched as subsequences, and they shouldn't be pre-filtered
+    flic_hooks = [hook for hook in hooks if hook.name == 'on_flic']
+    event = FlicButtonEvent(btn_addr='00:11:22:33:44:55', sequence=['LongPressEvent', 'ShortPressEvent'])
+    assert _get_matches(HookIndex(flic_hooks).get_candidates(event), event) == ['on_flic']
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -1,6 +1,9 @@
 import pytest
+import requests
 
-from .utils import register_user, send_request as _send_request
+from platypush.message import Message
+
+from .utils import register_user, request_timeout, send_request as _send_request, test_pass, test_user
 
 
 @pytest.fixture(scope='module')
@@ -59,6 +62,31 @@ def test_request_with_wrong_credentials(base_url, expected_login_redirect):
     assert expected_login_redirect == response.url, 'A request with wrong credentials should fail'
 
 
+def test_batch_request(base_url):
+    """
+    A list of requests sent to /execute should return the list of the responses, in the same order.
+    """
+    for body in [
+        [{'type': 'request', 'action': 'shell.exec', 'args': {'cmd': 'echo item-{}'.format(i)}} for i in range(3)],
+        {'requests': [{'type': 'request', 'action': 'shell.exec', 'args': {'cmd': 'echo item-{}'.format(i)}}
+                      for i in range(3)], 'sequential': True},
+    ]:
+        response = requests.post('{}/execute'.format(base_url), auth=(test_user, test_pass), json=body,
+                                 timeout=request_timeout)
+        responses = [Message.build(item) for item in response.json()]
+        assert [r.output.strip() for r in responses] == ['item-0', 'item-1', 'item-2'], \
+            'The responses of the batch request do not match the requests'
+
+    # Invalid items should get an error, without failing the other requests
+    response = requests.post('{}/execute'.format(base_url), auth=(test_user, test_pass), json=[
+        {'type': 'request', 'action': 'shell.exec', 'args': {'cmd': 'echo ping'}},
+        {'type': 'unknown'},
+    ], timeout=request_timeout)
+    responses = [Message.build(item) for item in response.json()]
+    assert responses[0].output.strip() == 'ping'
+    assert responses[1].errors, 'An invalid request in a batch should get an error response'
+
+
 if __name__ == '__main__':
     pytest.main()
 
@@ -0,0 +1,74 @@
+import datetime
+
+import pytest
+
+from platypush.message import Message
+from platypush.message.codec import decode, get_codec
+from platypush.message.event import Event
+from platypush.message.request import Request
+
+
+def _codec(name):
+    if name != 'json':
+        pytest.importorskip(name)
+    return get_codec(name)
+
+
+@pytest.mark.parametrize('codec', ['json', 'orjson', 'msgpack'])
+def test_round_trip(codec):
+    """
+    A message serialized through a codec should be rebuilt with the same attributes.
+    """
+    _codec(codec)
+    event = Event(target='test', origin='test', id='codec-test', value=42, tags=['a', 'b'],
+                  nested={'key': [1, 2.5, None, True]})
+
+    msg = Message.build(event.serialize(codec))
+    assert isinstance(msg, Event)
+    assert msg.id == event.id and msg.args == event.args
+
+    request = Request(target='test', action='shell.exec', args={'cmd': 'true'}, id='codec-req')
+    msg = Message.build(request.serialize(codec))
+    assert isinstance(msg, Request)
+    assert msg.action == request.action and msg.args == request.args
+
+
+@pytest.mark.parametrize('codec', ['json', 'orjson', 'msgpack'])
+def test_non_native_types(codec):
+    """
+    The types not natively supported by a codec should be converted as the JSON encoder does.
+    """
+    ts = datetime.datetime(2021, 1, 1, 12, 30)
+    payload = _codec(codec).encode({'ts': ts, 'values': {1, 2}})
+    assert decode(payload) == {'ts': ts.isoformat(), 'values': [1, 2]}
+
+
+def test_format_marker():
+    """
+    Binary payloads should carry their format marker, and payloads with no marker should
+    be parsed as JSON, regardless of the configured codec.
+    """
+    _codec('msgpack')
+    payload = get_codec('msgpack').encode({'value': 42})
+    assert payload.startswith(b'\x00msgpack\x00')
+    assert decode(payload) == {'value': 42}
+    assert decode(bytearray(payload)) == {'value': 42}
+
+    assert get_codec('json').encode({'value': 42}) == b'{"value": 42}'
+    assert decode(b'{"value": 42}\n') == {'value': 42}
+    assert decode('{"value": 42}') == {'value': 42}
+
+
+def test_unsupported_codec():
+    with pytest.raises(AssertionError):
+        get_codec('pickle')
+
+    with pytest.raises(AssertionError):
+        decode(b'\x00pickle\x00data')
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from platypush.context import get_plugin
+from platypush.message.response import Response
+from platypush.procedure import DagProcedure, ForProcedure, IfProcedure, Procedure
+
+
+def test_procedure_compile_cache():
+    """
+    Procedures should be compiled once per configuration, and bound calls should share the compiled steps.
+    """
+    config = {
+        '_async': False,
+        'actions': [
+            {'for item in ${items}': [{'if ${item > 1}': ['break']}]},
+        ],
+    }
+
+    proc = Procedure.compile('test_compiled_procedure', config)
+    assert Procedure.compile('test_compiled_procedure', config) is proc
+    assert Procedure.compile('test_compiled_procedure', {**config}) is not proc, \
+        'A procedure should be compiled again when its configuration changes'
+
+    loop = proc.steps[0].target
+    assert isinstance(loop, ForProcedure)
+    assert isinstance(loop.steps[0].target, IfProcedure)
+
+    bound = proc.bind(args={'items': [1, 2, 3]}, id='test-id')
+    assert bound.steps is proc.steps
+    assert bound.id == 'test-id' and proc.id is None
+
+
+def test_fork_loop():
+    """
+    A fork loop should process the items in parallel, up to ``max_parallel`` at the same time,
+    and collect their outputs in the same order as the iterable.
+    """
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def process(item, **_):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+
+        time.sleep(0.1)
+        with lock:
+            running -= 1
+
+        return Response(output=item * 2)
+
+    loop = ForProcedure(name='test_fork', iterator_name='item', iterable='${items}',
+                        requests=[process], fork=True, max_parallel=3)
+
+    start_time = time.time()
+    response = loop.execute(items=list(range(6)))
+
+    assert response.output == [0, 2, 4, 6, 8, 10]
+    assert max_running == 3
+    assert time.time() - start_time < 0.5, 'The items of the fork loop were not processed in parallel'
+
+
+def test_dag_procedure():
+    """
+    The steps of a DAG procedure should depend on the steps they reference, and the independent
+    steps should run in parallel.
+    """
+    proc = DagProcedure.build(name='test_dag', _async=False, procedure_class=DagProcedure, requests=[
+        {'name': 'first', 'action': 'utils.sleep', 'args': {'seconds': 0.2}},
+        {'name': 'second', 'action': 'utils.sleep', 'args': {'seconds': 0.2}},
+        {'name': 'third', 'action': 'utils.sleep', 'args': {'seconds': '${0.1 if first else 0}'}},
+        {'action': 'utils.sleep', 'args': {'seconds': 0}, 'depends_on': ['second', 'third']},
+    ])
+
+    assert proc.dependencies == [frozenset(), frozenset(), frozenset({0}), frozenset({1, 2})]
+
+    # Load the plugin before measuring the execution time
+    get_plugin('utils')
+    start_time = time.time()
+    response = proc.execute()
+    assert not response.errors
+    assert time.time() - start_time < 0.4, 'The independent steps were not executed in parallel'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from platypush.bus.redis import RedisBus
+from platypush.message.event import Event
+
+
+@pytest.fixture
+def redis_bus():
+    queue = 'platypush-tests/list-{}'.format(int(time.time() * 1000))
+    bus = RedisBus(redis_queue=queue, batch_size=3)
+    yield bus
+
+    bus.redis.delete(queue)
+    bus.stop()
+
+
+def _event(value):
+    return Event(target='test', origin='test', id='bus-test-{}'.format(value), value=value)
+
+
+def test_batch_drain(redis_bus):
+    """
+    After a blocking pop, up to ``batch_size - 1`` more messages should be drained in the
+    same round trip, and the others should be left on the queue.
+    """
+    redis_bus.post_batch([_event(i) for i in range(5)])
+
+    msg = redis_bus.get()
+    assert msg and msg.args.get('value') == 0
+    assert redis_bus.redis.llen(redis_bus.redis_queue) == 2, 'The batch was not drained'
+
+    values = [redis_bus.get().args.get('value') for _ in range(4)]
+    assert values == [1, 2, 3, 4], 'Messages should be delivered in FIFO order'
+
+
+def test_coalesced_posts(redis_bus):
+    """
+    Messages posted while another thread is pushing to Redis should be sent together in
+    a single ``RPUSH``.
+    """
+    rpush = redis_bus.redis.rpush
+    pushed = []
+    push_started = threading.Event()
+    push_unblocked = threading.Event()
+
+    def slow_rpush(queue, *msgs):
+        pushed.append(len(msgs))
+        push_started.set()
+        push_unblocked.wait(1)
+        return rpush(queue, *msgs)
+
+    redis_bus.redis.rpush = slow_rpush
+    poster = threading.Thread(target=redis_bus.post, args=(_event(0),))
+    poster.start()
+    push_started.wait(1)
+
+    for i in range(1, 5):
+        redis_bus.post(_event(i))
+
+    push_unblocked.set()
+    poster.join(1)
+
+    assert pushed == [1, 4], 'The concurrent posts were not coalesced'
+    values = [redis_bus.get().args.get('value') for _ in range(5)]
+    assert values == list(range(5))
+
+
+def test_failed_posts_are_requeued(redis_bus):
+    """
+    A batch that couldn't be pushed should be sent again with the next post.
+    """
+    rpush = redis_bus.redis.rpush
+
+    def failing_rpush(*_, **__):
+        redis_bus.redis.rpush = rpush
+        raise ConnectionError('Redis unreachable')
+
+    redis_bus.redis.rpush = failing_rpush
+    redis_bus.post(_event(0))
+    assert redis_bus.redis.llen(redis_bus.redis_queue) == 0
+
+    redis_bus.post(_event(1))
+    values = [redis_bus.get().args.get('value') for _ in range(2)]
+    assert values == [0, 1], 'The failed batch was not pushed again'
+
+
+def test_local_delivery_copy(redis_bus):
+    """
+    Local consumers should receive a frozen copy of a posted message, while the producer
+    can still change its own object.
+    """
+    redis_bus._local_consumer = True
+    event = _event(0)
+    redis_bus.post(event)
+    event.args = {'value': 1}
+
+    msg = redis_bus.bus.get(timeout=1)
+    assert msg is not event and msg.is_frozen() and not event.is_frozen()
+    assert msg.args.get('value') == 0
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
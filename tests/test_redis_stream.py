@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from platypush.bus.redis_stream import RedisStreamBus
+from platypush.message.event import Event
+
+
+@pytest.fixture
+def stream_buses():
+    queue = 'platypush-tests/stream-{}'.format(int(time.time() * 1000))
+    buses = [
+        RedisStreamBus(redis_queue=queue, consumer=consumer, claim_timeout=0.2)
+        for consumer in ('consumer-1', 'consumer-2')
+    ]
+
+    yield buses
+
+    buses[0].redis.delete(buses[0].stream, buses[0].dead_stream)
+    for bus in buses:
+        bus.stop()
+
+
+def test_redis_stream_redelivery(stream_buses):
+    """
+    A message that hasn't been acknowledged by its consumer should be redelivered to
+    another consumer of the group after ``claim_timeout``.
+    """
+    bus_1, bus_2 = stream_buses
+    bus_1.post(Event(target='test', origin='test', id='stream-test', value=42))
+
+    msg = bus_1.get()
+    assert msg and msg.args.get('value') == 42
+
+    time.sleep(0.3)
+    msg = bus_2.get()
+    assert msg and msg.args.get('value') == 42, 'The unacknowledged message was not redelivered'
+
+    bus_2.ack(msg)
+    assert bus_2.redis.xpending(bus_2.stream, bus_2.group)['pending'] == 0
+
+
+def test_redis_stream_claim_cursor(stream_buses):
+    """
+    All the messages left unacknowledged by a consumer should be claimed in a single sweep,
+    following the ``XAUTOCLAIM`` cursor over pages of ``claim_count`` entries.
+    """
+    bus_1, bus_2 = stream_buses
+    bus_1.batch_size = 5
+    bus_2.claim_count = 2
+    bus_1.post_batch([
+        Event(target='test', origin='test', id='stream-test-{}'.format(i), value=i)
+        for i in range(5)
+    ])
+
+    values = [bus_1.get().args.get('value') for _ in range(5)]
+    assert values == list(range(5))
+
+    time.sleep(0.3)
+    start_time = time.time()
+    values = [bus_2.get().args.get('value') for _ in range(5)]
+    assert values == list(range(5)), 'The unacknowledged messages were not all redelivered'
+    assert time.time() - start_time < 0.5, 'The unacknowledged messages were not claimed in a single sweep'
+
+
+def test_redis_stream_invalid_message(stream_buses):
+    """
+    A message that can't be parsed should be acknowledged and moved to the dead letter stream,
+    instead of being claimed and redelivered over and over.
+    """
+    bus_1, bus_2 = stream_buses
+    bus_1._create_group()
+    bus_1.redis.xadd(bus_1.stream, {'msg': 'not json'})
+
+    assert bus_1.get() is None
+    assert bus_1.redis.xpending(bus_1.stream, bus_1.group)['pending'] == 0, \
+        'The invalid message was not acknowledged'
+
+    dead_entries = bus_1.redis.xrange(bus_1.dead_stream)
+    assert len(dead_entries) == 1 and dead_entries[0][1][b'msg'] == b'not json'
+
+    time.sleep(0.3)
+    assert bus_2.get() is None
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
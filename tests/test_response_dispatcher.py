@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from redis import Redis
+
+from platypush.bus.responses import ResponseDispatcher
+from platypush.message.response import Response
+from platypush.utils import get_redis_queue_name_by_id
+
+
+@pytest.fixture
+def dispatcher():
+    yield ResponseDispatcher(channel='platypush-tests/responses')
+
+
+def test_response_dispatcher(dispatcher):
+    """
+    Responses published on the shared channel should resolve the futures of the matching requests.
+    """
+    futures = {request_id: dispatcher.expect(request_id) for request_id in ('req-1', 'req-2')}
+    redis = Redis()
+    redis.publish(dispatcher.channel, str(Response(id='req-2', output='pong')))
+    redis.publish(dispatcher.channel, str(Response(id='unknown', output='ignored')))
+
+    response = dispatcher.wait('req-2', futures['req-2'], timeout=5)
+    assert response and response.output == 'pong'
+    assert dispatcher.wait('req-1', futures['req-1'], timeout=0.5) is None, \
+        'A request with no response should time out'
+
+
+def test_response_dispatcher_queue_cleanup(dispatcher):
+    """
+    The queue of a response received on the channel should be deleted.
+    """
+    future = dispatcher.expect('req-7')
+    redis = Redis()
+    response = str(Response(id='req-7', output='pong'))
+    queue = get_redis_queue_name_by_id('req-7')
+    redis.rpush(queue, response)
+    redis.publish(dispatcher.channel, response)
+
+    assert dispatcher.wait('req-7', future, timeout=5).output == 'pong'
+    for _ in range(20):
+        if not redis.exists(queue):
+            break
+        time.sleep(0.05)
+
+    assert not redis.exists(queue), 'The queue of the received response was not deleted'
+
+
+def test_response_dispatcher_cancel(dispatcher):
+    """
+    Cancelling a request should wake up the thread waiting for its response.
+    """
+    future = dispatcher.expect('req-3')
+    threading.Timer(0.2, dispatcher.cancel, args=('req-3',)).start()
+    assert dispatcher.wait('req-3', future, timeout=5) is None
+    assert not dispatcher._futures
+
+
+def test_response_dispatcher_recovery(dispatcher):
+    """
+    Responses that were pushed to the request queues but not received on the channel (e.g.
+    while the subscriber was reconnecting) should be recovered from the queues.
+    """
+    redis = Redis()
+    futures = {request_id: dispatcher.expect(request_id) for request_id in ('req-4', 'req-5')}
+    for request_id in futures.keys():
+        redis.rpush(get_redis_queue_name_by_id(request_id), str(Response(id=request_id, output=request_id)))
+
+    dispatcher._recover()
+    assert futures['req-4'].done() and futures['req-5'].done()
+    assert dispatcher.wait('req-4', futures['req-4'], timeout=1).output == 'req-4'
+
+    future = dispatcher.expect('req-6')
+    redis.rpush(get_redis_queue_name_by_id('req-6'), str(Response(id='req-6', output='late')))
+    response = dispatcher.wait('req-6', future, timeout=0.2)
+    assert response and response.output == 'late', 'The response was not read from the queue after the timeout'
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,36 @@
+import pytest
+
+from platypush.utils.template import Template
+
+
+def test_template_expansion():
+    """
+    Test the expansion of ``${...}`` expressions against a context.
+    """
+    context = {'output': {'values': [1, 2, 3]}, 'name': 'world', 'count': '2'}
+
+    assert Template.compile('${output}').render(context) == {'values': [1, 2, 3]}
+    assert Template.compile('Hello ${name}!').render(context) == 'Hello world!'
+    assert Template.compile('${output["values"][1] + count}').render(context) == 4
+    assert Template.compile('${[v * 2 for v in output["values"]]}').render(context) == [2, 4, 6]
+    assert Template.compile('\\${name}').render(context) == '\\${name}'
+    assert Template.compile('${unknown}').render(context) == '${unknown}'
+    assert Template.compile('42').render(context) == 42, 'JSON literals should be parsed'
+    assert Template.compile('true').render(context) is True
+    assert Template.compile('[1, 2]').render(context) == [1, 2]
+    assert Template.compile('Hello world').render(context) == 'Hello world'
+    assert Template.compile('nothing').render(context) == 'nothing'
+
+
+def test_template_cache():
+    """
+    Templates with expressions should be compiled only once.
+    """
+    assert Template.compile('${a} ${b}') is Template.compile('${a} ${b}')
+
+
+if __name__ == '__main__':
+    pytest.main()
+
+
+# vim:sw=4:ts=4:et: